@@ -0,0 +1,97 @@
+"""
+MASH Accounts
+=============
+Player lookup, password checks and character creation, shared by every
+front end (the Streamlit app, the telnet server, the JSON API).
+"""
+
+import hashlib
+from typing import Optional, Tuple
+from database import WorldDatabase, GameObject
+from mash_engine import STARTING_TOKENS
+
+START_ROOM = "#0"  # The Arrival is the first room if world is missing
+
+
+def hash_password(password: str) -> str:
+    """Simple password hashing. NOT secure for production!"""
+    return hashlib.sha256(password.encode()).hexdigest()[:16]
+
+
+def find_player(db: WorldDatabase, name: str) -> Optional[GameObject]:
+    """Find a player agent by name (case-insensitive)."""
+    db.wait_loaded()  # A player missing from a half-loaded world is not a new player
+    for obj in db.find_by_name(name):
+        if obj.type == 'agent' and not obj.autonomous:
+            return obj
+    return None
+
+
+def count_players(db: WorldDatabase) -> int:
+    """Count how many player characters exist (non-autonomous agents)."""
+    db.wait_loaded()
+    return len(db.query(type='agent', flag='!autonomous'))
+
+
+def check_login(db: WorldDatabase, name: str, password: str) -> Tuple[Optional[GameObject], str]:
+    """Returns (player, "") on success, or (None, reason)."""
+    if not name.strip():
+        return None, "Please enter your character name!"
+    if not password:
+        return None, "Please enter your password!"
+    player = find_player(db, name)
+    if not player:
+        return None, f"Character '{name}' not found. Create a new character?"
+    stored_hash = getattr(player, 'password_hash', None)
+    if not stored_hash:
+        return None, "This character has no password set. Contact admin."
+    if hash_password(password) != stored_hash:
+        return None, "Incorrect password!"
+    return player, ""
+
+
+def create_player(db: WorldDatabase, name: str, password: str, desc: str = "",
+                  start_room: str = START_ROOM) -> Tuple[Optional[GameObject], str]:
+    """
+    Validate and create a player character. The first player becomes a wizard;
+    everyone else starts with STARTING_TOKENS. Returns (player, "") or (None, reason).
+    """
+    name = name.strip()
+    if not name:
+        return None, "Please enter a character name!"
+    if len(name) < 2:
+        return None, "Character name must be at least 2 characters!"
+    if not password:
+        return None, "Please choose a password!"
+    if len(password) < 4:
+        return None, "Password must be at least 4 characters!"
+
+    db.wait_loaded()  # Before taking the lock: the loader needs it to finish
+    with db._lock:  # Two front ends must not create the same name at once
+        if find_player(db, name):
+            return None, f"Character '{name}' already exists! Choose another name."
+
+        # Check if this is the first player (gets wizard flag)
+        is_first_player = count_players(db) == 0
+
+        player = db.create_object(
+            'agent',
+            name,
+            desc=desc.strip() if desc.strip() else "A mysterious traveler.",
+            autonomous=False,
+            location=start_room
+        )
+
+        # Store password hash
+        player.password_hash = hash_password(password)
+
+        # Players own themselves
+        player.owner = player.dbref
+
+        # First player becomes wizard!
+        if is_first_player:
+            player.wizard = True
+        else:
+            # Non-wizards get starting tokens
+            player.tokens = STARTING_TOKENS
+    return player, ""
@@ -5,13 +5,95 @@ Handles communication with Google Generative AI (Gemini).
 Converts engine context into narrative "hallucinations" and agent actions.
 """
 
+import asyncio
 import os
 import json
 import re
-from typing import Dict, Any, List, Optional
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Callable
 from google import genai
 from datetime import datetime
-from dataclasses import asdict
+from dataclasses import asdict, dataclass, field
+
+AI_TIMEOUT = 60  # Seconds an async text call may take before it is cancelled
+IMAGE_TIMEOUT = 180  # Image generation is much slower
+
+
+@dataclass
+class AIRequest:
+    """
+    One model call, built once and run either way: `parse` turns the response
+    into the method's return value, `fail` turns an error into its fallback.
+    """
+    model: str
+    contents: Any
+    parse: Callable[[Any], Any]
+    fail: Callable[[Exception], Any]
+    config: Dict[str, Any] = field(default_factory=dict)
+
+
+class DirectiveFilter:
+    """
+    Passes streamed VR text through as it arrives, holding back only the
+    directives the engine strips from the finished text ([vr_desc ...],
+    [vr_title ...], [scene_change]) so they never flash on screen.
+    """
+    _DIRECTIVE = re.compile(r'\[(?:vr_desc|vr_title) [^\]]*\]|\[scene_change\]', re.IGNORECASE)
+    _HEADS = ('[vr_desc ', '[vr_title ', '[scene_change]')
+
+    def __init__(self):
+        self._held = ""
+
+    def feed(self, text: str) -> str:
+        """Returns the part of the text seen so far that is safe to show."""
+        self._held += text
+        out = []
+        while self._held:
+            i = self._held.find('[')
+            if i < 0:
+                out.append(self._held)
+                self._held = ""
+                break
+            out.append(self._held[:i])
+            self._held = self._held[i:]
+            m = self._DIRECTIVE.match(self._held)
+            if m:
+                self._held = self._held[m.end():]
+                continue
+            head = self._held.lower()
+            if ']' not in head and any(h.startswith(head) or head.startswith(h) for h in self._HEADS):
+                break  # Might still become a directive; wait for more text
+            out.append('[')
+            self._held = self._held[1:]
+        return "".join(out)
+
+    def flush(self) -> str:
+        held, self._held = self._held, ""
+        return held
+
+
+def _shielded(on_text: Callable[[str], None]) -> Callable[[str], None]:
+    """
+    on_text for one stream. A sink that raises (say, its client went away) is
+    dropped for the rest of the stream instead of failing the model call.
+    """
+    sink = [on_text]
+
+    def send(text: str) -> None:
+        if not text or sink[0] is None:
+            return
+        try:
+            sink[0](text)
+        except Exception as e:
+            print(f"[MASH] Stream sink failed, finishing without it: {e}")
+            sink[0] = None
+    return send
+
+
+def _log_response(label: str, text: str) -> None:
+    with open("llm_responses.log", "a", encoding="utf-8") as f:
+        f.write(f"\n[{datetime.now()}] {label}:\n{text}\n{'-'*40}")
+
 
 class AIEngine:
     def __init__(self, api_key: str = None, 
@@ -67,11 +149,106 @@ class AIEngine:
             "IMPORTANT: Use the character's name in narrative, not 'I'.\n"
         )
 
+    # ─────────────────────────────────────────────────────────────
+    # Calling the model
+    # ─────────────────────────────────────────────────────────────
+
+    def _call(self, request: AIRequest) -> Any:
+        """Run a request on the blocking client."""
+        try:
+            response = self.client.models.generate_content(
+                model=request.model,
+                contents=request.contents,
+                config=request.config or None
+            )
+            return request.parse(response)
+        except Exception as e:
+            return request.fail(e)
+
+    async def _acall(self, request: AIRequest, timeout: Optional[float] = AI_TIMEOUT) -> Any:
+        """
+        Run a request on the async client. A timeout cancels the call and
+        yields the method's usual fallback; cancelling the caller's task
+        cancels the call and propagates.
+        """
+        try:
+            response = await asyncio.wait_for(
+                self.client.aio.models.generate_content(
+                    model=request.model,
+                    contents=request.contents,
+                    config=request.config or None
+                ),
+                timeout
+            )
+            return request.parse(response)
+        except asyncio.TimeoutError:
+            return request.fail(TimeoutError(f"no response after {timeout}s"))
+        except Exception as e:
+            return request.fail(e)
+
+    def _stream(self, request: AIRequest, on_text: Callable[[str], None]) -> Any:
+        """
+        Like _call, but streams: visible text goes to on_text as it arrives,
+        and the finished text is parsed as usual (directives included).
+        """
+        shown = DirectiveFilter()
+        send = _shielded(on_text)
+        parts = []
+        try:
+            for chunk in self.client.models.generate_content_stream(
+                model=request.model,
+                contents=request.contents,
+                config=request.config or None
+            ):
+                text = chunk.text or ""
+                parts.append(text)
+                send(shown.feed(text))
+            send(shown.flush())
+            return request.parse(SimpleNamespace(text="".join(parts)))
+        except Exception as e:
+            return request.fail(e)
+
+    async def _astream(self, request: AIRequest, on_text: Callable[[str], None],
+                       timeout: Optional[float] = AI_TIMEOUT) -> Any:
+        """_stream on the async client; the timeout covers the whole stream."""
+        shown = DirectiveFilter()
+        send = _shielded(on_text)
+        parts = []
+
+        async def consume():
+            async for chunk in await self.client.aio.models.generate_content_stream(
+                model=request.model,
+                contents=request.contents,
+                config=request.config or None
+            ):
+                text = chunk.text or ""
+                parts.append(text)
+                send(shown.feed(text))
+
+        try:
+            await asyncio.wait_for(consume(), timeout)
+            send(shown.flush())
+            return request.parse(SimpleNamespace(text="".join(parts)))
+        except asyncio.TimeoutError:
+            return request.fail(TimeoutError(f"no response after {timeout}s"))
+        except Exception as e:
+            return request.fail(e)
+
+    # ─────────────────────────────────────────────────────────────
+    # Senses
+    # ─────────────────────────────────────────────────────────────
+
     def generate_hallucination(self, context: Dict[str, Any]) -> str:
         """
         Generate a sensory description based on MASH context.
         Used for look, smell, taste, touch, listen.
         """
+        return self._call(self._hallucination_request(context))
+
+    async def generate_hallucination_async(self, context: Dict[str, Any], timeout: Optional[float] = AI_TIMEOUT) -> str:
+        return await self._acall(self._hallucination_request(context), timeout)
+
+    def _hallucination_request(self, context: Dict[str, Any]) -> AIRequest:
         action = context.get('action', 'look')
         actor_name = context.get('actor', {}).get('name', 'Someone')
         target_name = context.get('target', {}).get('name', 'something')
@@ -97,11 +274,12 @@ class AIEngine:
         prompt.append(f"\nProvide the sensory reaction for '{action}':")
         prompt.append("\n**CRITICAL INSTRUCTION**: This is a description of a sensation. Return ONLY narrative text. Do NOT use bracketed commands like [pose] or [memo].")
 
-        try:
-            response = self.client.models.generate_content(model=self.model_name, contents=" ".join(prompt))
-            return self._sanitize_narrative(response.text.strip())
-        except Exception as e:
-            return f"The world flickers... (AI Error: {str(e)})"
+        return AIRequest(
+            model=self.model_name,
+            contents=" ".join(prompt),
+            parse=lambda response: self._sanitize_narrative(response.text.strip()),
+            fail=lambda e: f"The world flickers... (AI Error: {str(e)})"
+        )
 
     def _sanitize_narrative(self, text: str) -> str:
         """Remove any [bracketed] commands from purely narrative text."""
@@ -110,11 +288,22 @@ class AIEngine:
         clean = self.bracket_pattern.sub('', text)
         return " ".join(clean.split())
 
+    # ─────────────────────────────────────────────────────────────
+    # Robots and Smart Objects
+    # ─────────────────────────────────────────────────────────────
+
     def get_reactive_action(self, context: Dict[str, Any], last_action: str, search_mode: Optional[str] = None) -> str:
         """
         Produce a reaction to a specific player action.
         Used for robots or smart objects to 'respond' to what someone just did.
         """
+        return self._call(self._reactive_request(context, last_action, search_mode))
+
+    async def get_reactive_action_async(self, context: Dict[str, Any], last_action: str, search_mode: Optional[str] = None,
+                                        timeout: Optional[float] = AI_TIMEOUT) -> str:
+        return await self._acall(self._reactive_request(context, last_action, search_mode), timeout)
+
+    def _reactive_request(self, context: Dict[str, Any], last_action: str, search_mode: Optional[str]) -> AIRequest:
         robot_name = context.get('target', {}).get('name', 'Object')
         instruction = context.get('instruction', '') # Personality or trigger brief
         history = context.get('history', [])
@@ -180,30 +369,30 @@ class AIEngine:
             # The google-genai SDK expects a list of tool objects/dicts
             config['tools'] = [{'google_search': {}}]
 
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name, 
-                contents=" ".join(prompt),
-                config=config
-            )
-            
-            # --- DEBUG LOGGING ---
-            with open("llm_responses.log", "a", encoding="utf-8") as f:
-                f.write(f"\n[{datetime.now()}] REACTIVE ({robot_name}):\n{response.text}\n{'-'*40}")
-            # ---------------------
-            
+        def parse(response):
+            _log_response(f"REACTIVE ({robot_name})", response.text)  # Debug logging
             return response.text.strip()
-        except Exception as e:
+
+        def fail(e):
             # Explicit logging for the developer/user to see in the terminal
             print(f"[MASH] AI Reactive Error ({robot_name}): {str(e)}")
             return f"[idle] (AI Error: {str(e)})"
 
+        return AIRequest(self.model_name, " ".join(prompt), parse, fail, config)
+
     def get_atmospheric_flavor(self, context: Dict[str, Any], last_action: str, search_mode: Optional[str] = None) -> str:
         """
         Produce a purely atmospheric/narrative reaction for non-agent objects (ai_ok).
         NO commands allowed. Used for things like the Magic 8-Ball or Enchanted Mirrors.
         If search_mode='grounding', enables Google Search for fact-checking.
         """
+        return self._call(self._atmospheric_request(context, last_action, search_mode))
+
+    async def get_atmospheric_flavor_async(self, context: Dict[str, Any], last_action: str, search_mode: Optional[str] = None,
+                                           timeout: Optional[float] = AI_TIMEOUT) -> str:
+        return await self._acall(self._atmospheric_request(context, last_action, search_mode), timeout)
+
+    def _atmospheric_request(self, context: Dict[str, Any], last_action: str, search_mode: Optional[str]) -> AIRequest:
         obj_name = context.get('target', {}).get('name', 'Object')
         instruction = context.get('instruction', '') 
         history = context.get('history', [])
@@ -233,28 +422,28 @@ class AIEngine:
         if search_mode == 'grounding':
             config['tools'] = [{'google_search': {}}]
 
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name, 
-                contents=" ".join(prompt),
-                config=config
-            )
-            
-            # --- DEBUG LOGGING ---
-            with open("llm_responses.log", "a", encoding="utf-8") as f:
-                f.write(f"\n[{datetime.now()}] ATMOSPHERIC ({obj_name}) [search={search_mode}]:\n{response.text}\n{'-'*40}")
-            # ---------------------
-            
+        def parse(response):
+            _log_response(f"ATMOSPHERIC ({obj_name}) [search={search_mode}]", response.text)  # Debug logging
             return self._sanitize_narrative(response.text.strip())
-        except Exception as e:
+
+        def fail(e):
             print(f"[MASH] Object Atmospheric Error ({obj_name}): {str(e)}")
             return "" # Silence on error for atmosphere
 
+        return AIRequest(self.model_name, " ".join(prompt), parse, fail, config)
+
     def get_robot_tick(self, robot_context: Dict[str, Any], search_mode: Optional[str] = None) -> str:
         """
         Generate an autonomous action for a robot agent.
         Takes room history and personality (instruction).
         """
+        return self._call(self._tick_request(robot_context, search_mode))
+
+    async def get_robot_tick_async(self, robot_context: Dict[str, Any], search_mode: Optional[str] = None,
+                                   timeout: Optional[float] = AI_TIMEOUT) -> str:
+        return await self._acall(self._tick_request(robot_context, search_mode), timeout)
+
+    def _tick_request(self, robot_context: Dict[str, Any], search_mode: Optional[str]) -> AIRequest:
         robot_name = robot_context.get('target', {}).get('name', 'Robot')
         instruction = robot_context.get('instruction', '') # This is the robot's @desc/personality
         history = robot_context.get('history', [])
@@ -303,29 +492,32 @@ class AIEngine:
         if search_mode == 'grounding':
             config['tools'] = [{'google_search': {}}]
 
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name, 
-                contents=" ".join(prompt),
-                config=config
-            )
-            
-            # --- DEBUG LOGGING ---
-            with open("llm_responses.log", "a", encoding="utf-8") as f:
-                f.write(f"\n[{datetime.now()}] TICK ({robot_name}):\n{response.text}\n{'-'*40}")
-            # ---------------------
-
+        def parse(response):
+            _log_response(f"TICK ({robot_name})", response.text)  # Debug logging
             return response.text.strip()
-        except Exception as e:
+
+        def fail(e):
             # Explicit logging in the terminal
             print(f"[MASH] AI Tick Error ({robot_name}): {str(e)}")
             return f"**{robot_name}** pulses with a blue logic error. [pose freezes for a moment]"
 
+        return AIRequest(self.model_name, " ".join(prompt), parse, fail, config)
+
+    # ─────────────────────────────────────────────────────────────
+    # Images
+    # ─────────────────────────────────────────────────────────────
+
     def get_image_prompt(self, context: Dict[str, Any]) -> str:
         """
         The Visual Loom: Converts MASH state into a high-fidelity image prompt.
         Captures actors, dialogue bubbles, poses, and atmosphere.
         """
+        return self._call(self._image_prompt_request(context))
+
+    async def get_image_prompt_async(self, context: Dict[str, Any], timeout: Optional[float] = AI_TIMEOUT) -> str:
+        return await self._acall(self._image_prompt_request(context), timeout)
+
+    def _image_prompt_request(self, context: Dict[str, Any]) -> AIRequest:
         room = context.get('room', {})
         contents = context.get('contents', [])
         last_action = context.get('last_action', '')
@@ -353,38 +545,51 @@ class AIEngine:
             "Output only the final descriptive prompt for an image generator."
         )
 
-        try:
-            # Use the text model to 'bloom' the prompt for the image model
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            return response.text.strip()
-        except:
-            return f"A scene in {room.get('name')}, Lexideck style, cinematic lighting."
+        # Use the text model to 'bloom' the prompt for the image model
+        return AIRequest(
+            model=self.model_name,
+            contents=prompt,
+            parse=lambda response: response.text.strip(),
+            fail=lambda e: f"A scene in {room.get('name')}, Lexideck style, cinematic lighting."
+        )
 
     def generate_image(self, prompt: str) -> Optional[bytes]:
         """Generate an image using Nano Banana Pro (gemini-3-pro-image-preview)."""
-        try:
-            response = self.client.models.generate_content(
-                model=self.image_model,
-                contents=prompt
-            )
+        return self._call(self._image_request(prompt))
+
+    async def generate_image_async(self, prompt: str, timeout: Optional[float] = IMAGE_TIMEOUT) -> Optional[bytes]:
+        return await self._acall(self._image_request(prompt), timeout)
 
+    def _image_request(self, prompt: str) -> AIRequest:
+        def parse(response):
             # Extract the first image part from the response
             for part in response.candidates[0].content.parts:
                 if part.inline_data:
                     return part.inline_data.data
             return None
-        except Exception as e:
+
+        def fail(e):
             print(f"Image Generation Error: {e}")
             return None
 
+        return AIRequest(self.image_model, prompt, parse, fail)
+
+    # ─────────────────────────────────────────────────────────────
+    # Deep Research
+    # ─────────────────────────────────────────────────────────────
+
     def perform_deep_research(self, context: Dict[str, Any], topic: str, save_path: str) -> str:
         """
         Perform a deep, multi-step research task and save the result to a markdown file.
         Returns the final summary or error message.
         """
+        return self._call(self._research_request(context, topic, save_path))
+
+    async def perform_deep_research_async(self, context: Dict[str, Any], topic: str, save_path: str,
+                                          timeout: Optional[float] = None) -> str:
+        return await self._acall(self._research_request(context, topic, save_path), timeout)
+
+    def _research_request(self, context: Dict[str, Any], topic: str, save_path: str) -> AIRequest:
         actor_name = context.get('actor', {}).get('name', 'Researcher')
         
         # 1. System Prompt for Research
@@ -399,14 +604,7 @@ class AIEngine:
         # 2. User Prompt
         user_prompt = f"RESEARCH TOPIC: {topic}\nREQUESTED BY: {actor_name}\n\nPlease perform a deep dive on this topic. Structure the report with a Title, Executive Summary, Key Findings, and Technical Details."
         
-        try:
-            # 3. Call AI with Search Tool Enabled
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=[research_sys_prompt, user_prompt],
-                config={'tools': [{'google_search': {}}]}
-            )
-            
+        def parse(response):
             report_content = response.text.strip()
             
             # 4. Save to Artifact
@@ -419,14 +617,38 @@ class AIEngine:
             except Exception as e:
                 return f"Research Content Generated, but File Save Failed: {e}"
 
-        except Exception as e:
-            return f"Deep Research Failed: {e}"
+        # 3. Call AI with Search Tool Enabled
+        return AIRequest(
+            model=self.model_name,
+            contents=[research_sys_prompt, user_prompt],
+            parse=parse,
+            fail=lambda e: f"Deep Research Failed: {e}",
+            config={'tools': [{'google_search': {}}]}
+        )
+
+    # ─────────────────────────────────────────────────────────────
+    # VR
+    # ─────────────────────────────────────────────────────────────
 
-    def evolve_room(self, context: Dict[str, Any]) -> Optional[str]:
+    def evolve_room(self, context: Dict[str, Any],
+                    on_text: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
         The Architect: Evolves a VR Room's description based on user action.
         Returns the new description string, or None if generation fails.
+        With on_text, the scene is streamed to it as it is written.
         """
+        request = self._evolve_request(context)
+        return self._stream(request, on_text) if on_text else self._call(request)
+
+    async def evolve_room_async(self, context: Dict[str, Any],
+                                on_text: Optional[Callable[[str], None]] = None,
+                                timeout: Optional[float] = AI_TIMEOUT) -> Optional[str]:
+        request = self._evolve_request(context)
+        if on_text:
+            return await self._astream(request, on_text, timeout)
+        return await self._acall(request, timeout)
+
+    def _evolve_request(self, context: Dict[str, Any]) -> AIRequest:
         current_desc = context.get('current_desc', '')
         trigger = context.get('trigger', '')
         agent_name = context.get('agent_name', 'Visitor')
@@ -462,33 +684,40 @@ class AIEngine:
         messages.append(f"\nUSER ACTION ({agent_name}):\n{trigger}")
         messages.append("\nGENERATE NEW SCENE DESCRIPTION:")
         
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents="\n".join(messages)
-            )
-            
+        def parse(response):
             new_desc = response.text.strip()
             
             # Sanity check: If empty, fail to None
             if not new_desc: return None
             
-            # --- DEBUG LOGGING ---
-            with open("llm_responses.log", "a", encoding="utf-8") as f:
-                f.write(f"\n[{datetime.now()}] VR EVOLVE ({agent_name}):\nTRIG: {trigger}\nDESC: {new_desc}\n{'-'*40}")
-            # ---------------------
-            
+            _log_response(f"VR EVOLVE ({agent_name})", f"TRIG: {trigger}\nDESC: {new_desc}")  # Debug logging
             return new_desc
-            
-        except Exception as e:
+
+        def fail(e):
             print(f"[MASH] VR Evolution Error: {e}")
             return None
+
+        return AIRequest(self.model_name, "\n".join(messages), parse, fail)
     
-    def react_to_vr(self, context: Dict[str, Any]) -> Optional[str]:
+    def react_to_vr(self, context: Dict[str, Any],
+                    on_text: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
         The Dungeon Master: Reacts to user poses/says in VR with narrative flavor.
         Returns a narrative response, or None if generation fails.
+        With on_text, the reaction is streamed to it as it is written.
         """
+        request = self._vr_reaction_request(context)
+        return self._stream(request, on_text) if on_text else self._call(request)
+
+    async def react_to_vr_async(self, context: Dict[str, Any],
+                                on_text: Optional[Callable[[str], None]] = None,
+                                timeout: Optional[float] = AI_TIMEOUT) -> Optional[str]:
+        request = self._vr_reaction_request(context)
+        if on_text:
+            return await self._astream(request, on_text, timeout)
+        return await self._acall(request, timeout)
+
+    def _vr_reaction_request(self, context: Dict[str, Any]) -> AIRequest:
         current_desc = context.get('current_desc', '')
         user_action = context.get('user_action', '')
         agent_name = context.get('agent_name', 'Visitor')
@@ -520,24 +749,17 @@ class AIEngine:
         messages.append(f"\nUSER ACTION:\n{user_action}")
         messages.append("\nWORLD REACTION:")
         
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents="\n".join(messages)
-            )
-            
+        def parse(response):
             reaction = response.text.strip()
             
             if not reaction: return None
             
-            # --- DEBUG LOGGING ---
-            with open("llm_responses.log", "a", encoding="utf-8") as f:
-                f.write(f"\n[{datetime.now()}] VR REACT ({agent_name}):\nACTION: {user_action}\nREACT: {reaction}\n{'-'*40}")
-            # ---------------------
-            
+            _log_response(f"VR REACT ({agent_name})", f"ACTION: {user_action}\nREACT: {reaction}")  # Debug logging
             return reaction
-            
-        except Exception as e:
+
+        def fail(e):
             print(f"[MASH] VR Reaction Error: {e}")
             return None
 
+        return AIRequest(self.model_name, "\n".join(messages), parse, fail)
+
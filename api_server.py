@@ -0,0 +1,324 @@
+"""
+MASH JSON API Server
+====================
+A programmatic front door for bots and custom UIs: an ASGI (Starlette) app
+with one WebSocket per player session. Clients log in, submit commands
+(run through process_command) and receive a stream of events: room
+announcements as they happen and AI reactions from trigger_room_reactions.
+
+    python api_server.py [--port 8765] [--world world.json] [--telnet-port 7567]
+
+With --telnet-port the telnet server runs in the same process, sharing the
+one WorldDatabase.
+
+Protocol (JSON text frames). Client to server:
+    {"op": "login",   "name": ..., "password": ...}
+    {"op": "create",  "name": ..., "password": ..., "desc": ...}
+    {"op": "command", "text": "say hello", "id": 7, "react": true}
+    {"op": "ping"} / {"op": "quit"}
+Server to client, each with a "type":
+    welcome, result (echoes "id"), announce, reaction, pong, error
+    partial: VR text streamed while a command runs ("id", "text"), best effort
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from database import WorldDatabase, GameObject
+from mash_engine import MashEngine
+from accounts import check_login, create_player
+from telnet_server import (WORLD_FILE, IDLE_CHECK_INTERVAL, SAVE_INTERVAL, TelnetServer,
+                           open_world, load_ai_engine)
+
+
+# ─────────────────────────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────────────────────────
+
+DEFAULT_PORT = 8765
+OUTBOX_LIMIT = 256  # Events queued for one connection before its producers wait
+
+
+# ─────────────────────────────────────────────────────────────────
+# Sessions
+# ─────────────────────────────────────────────────────────────────
+
+class ApiSession:
+    """
+    One WebSocket connection. Everything it sends goes through a bounded
+    outbox drained by a single writer task, so a slow client only stalls
+    its own producers: its command loop stops reading, and announcements
+    wait in the room event log until there is room to pull them. Once a
+    send fails the session is closed and further events are dropped.
+    """
+
+    def __init__(self, api: 'MashApi', ws: WebSocket):
+        self.api = api
+        self.db = api.db
+        self.ws = ws
+        self.player: Optional[GameObject] = None
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=OUTBOX_LIMIT)
+        self._cursor = 0
+        self._woken = asyncio.Event()
+        self._reacting: Optional[asyncio.Task] = None
+        self.closed = False
+
+    async def run(self) -> None:
+        await self.ws.accept()
+        writer = asyncio.create_task(self._write_loop())
+        try:
+            player = await self._login()
+            if player:
+                await self._play(player)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            writer.cancel()
+            if self._reacting:
+                self._reacting.cancel()
+
+    async def emit(self, event: Dict[str, Any]) -> None:
+        if not self.closed:
+            await self.outbox.put(event)
+
+    def _offer(self, event: Dict[str, Any]) -> None:
+        """Queue an event only if there is room; streamed text is worth less than the result."""
+        if not self.closed and not self.outbox.full():
+            self.outbox.put_nowait(event)
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                event = await self.outbox.get()
+                # Result contexts can hold anything the engine put there
+                await self.ws.send_text(json.dumps(event, default=str))
+        except Exception as e:
+            # Client gone mid-command: stop taking events and end the session
+            self.closed = True
+            if not isinstance(e, WebSocketDisconnect):
+                print(f"[MASH] API send failed: {e}")
+            with contextlib.suppress(Exception):
+                await self.ws.close()
+        # Keep draining so producers already waiting on a full outbox get through
+        while True:
+            await self.outbox.get()
+
+    async def _receive(self) -> Optional[Dict[str, Any]]:
+        """Next request, {} for a malformed one, None once the client is gone."""
+        try:
+            data = await self.ws.receive_json()
+        except WebSocketDisconnect:
+            return None
+        except ValueError:
+            await self.emit({'type': 'error', 'message': "Expected a JSON object."})
+            return {}
+        if not isinstance(data, dict):
+            await self.emit({'type': 'error', 'message': "Expected a JSON object."})
+            return {}
+        return data
+
+    async def _login(self) -> Optional[GameObject]:
+        while True:
+            req = await self._receive()
+            if req is None or req.get('op') == 'quit':
+                return None
+            op = req.get('op')
+            name, password = str(req.get('name', "")), str(req.get('password', ""))
+            if op == 'login':
+                player, error = await self.api.call(check_login, self.db, name, password)
+            elif op == 'create':
+                player, error = await self.api.call(create_player, self.db, name, password,
+                                                    str(req.get('desc', "")))
+            elif op == 'ping':
+                await self.emit({'type': 'pong'})
+                continue
+            else:
+                await self.emit({'type': 'error', 'message': "Log in first: op 'login' or 'create'."})
+                continue
+            if error:
+                await self.emit({'type': 'error', 'message': error})
+                continue
+            if op == 'create':
+                await self.api.call(self.api.engine._announce_arrival, player.dbref, player.location, "has connected.")
+            await self.emit({'type': 'welcome', 'dbref': player.dbref, 'name': player.name,
+                             'wizard': bool(player.wizard), 'created': op == 'create'})
+            return player
+
+    async def _play(self, player: GameObject) -> None:
+        self.player = player
+        engine = self.api.engine
+        loop = asyncio.get_running_loop()
+        self._cursor = self.db.event_seq
+        token = self.db.add_listener(player.dbref, lambda: loop.call_soon_threadsafe(self._woken.set))
+        pusher = asyncio.create_task(self._push())
+        self.api.sessions.add(self)
+        try:
+            while True:
+                req = await self._receive()
+                if req is None or req.get('op') == 'quit':
+                    break
+                op = req.get('op')
+                if op == 'ping':
+                    await self.emit({'type': 'pong'})
+                elif op == 'command':
+                    await self._command(engine, str(req.get('text', "")).strip(), req)
+                elif req:
+                    await self.emit({'type': 'error', 'message': f"Unknown op '{op}'."})
+        finally:
+            self.api.sessions.discard(self)
+            self.db.remove_listener(token)
+            pusher.cancel()
+            with contextlib.suppress(Exception):
+                await self.ws.close()
+
+    async def _command(self, engine: MashEngine, text: str, req: Dict[str, Any]) -> None:
+        if not text:
+            await self.emit({'type': 'error', 'id': req.get('id'), 'message': "Empty command."})
+            return
+        loop = asyncio.get_running_loop()
+        partial = lambda chunk: loop.call_soon_threadsafe(
+            self._offer, {'type': 'partial', 'id': req.get('id'), 'text': chunk})
+        result = await self.api.call(engine.process_command, self.player.dbref, text, on_text=partial)
+        await self.emit({'type': 'result', 'id': req.get('id'), 'success': result.success,
+                         'message': result.message, 'context': result.context})
+        if result.success and engine.ai and req.get('react', True):
+            # One reaction round in flight per connection; the next command waits for it
+            if self._reacting:
+                await self._reacting
+            self._reacting = asyncio.create_task(self._react(engine, text, result.context or {}))
+
+    async def _react(self, engine: MashEngine, text: str, context: Dict[str, Any]) -> None:
+        """Same order as the app: departure reactions in the old room, then the current room."""
+        try:
+            player = self.db.get_agent(self.player.dbref)
+            if not player:
+                return
+            rounds = []
+            old_loc = (context.get('from_room') or {}).get('dbref')
+            if old_loc and old_loc != player.location:
+                rounds.append((old_loc, f"PRESENCE_DEPARTURE {player.name}"))
+            rounds.append((player.location, text))
+            for room, action in rounds:
+                reactions = await self.api.call(engine.trigger_room_reactions, room, player.dbref, action)
+                for r in reactions:
+                    if r.get('narrative') or r.get('intent_messages'):
+                        await self.emit({'type': 'reaction', 'room': room, **r})
+        except Exception as e:
+            await self.emit({'type': 'error', 'message': f"Reactions failed: {e}"})
+
+    async def _push(self) -> None:
+        """Forward announcements whenever the database wakes this session."""
+        while True:
+            await self._woken.wait()
+            self._woken.clear()
+            self._cursor, msgs = await self.api.call(self.db.read_messages, self.player.dbref, self._cursor)
+            for msg in msgs:
+                await self.emit({'type': 'announce', 'message': msg})
+
+
+# ─────────────────────────────────────────────────────────────────
+# Application
+# ─────────────────────────────────────────────────────────────────
+
+class MashApi:
+    """The ASGI app plus the world it serves. Engine calls run on a thread pool."""
+
+    def __init__(self, db: WorldDatabase, engine: MashEngine, workers: int = 32,
+                 save_path: Optional[Path] = None, telnet_port: Optional[int] = None):
+        self.db = db
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mash-api")
+        self.sessions: set = set()
+        self.save_path = save_path
+        self.telnet_port = telnet_port
+        self.app = Starlette(
+            routes=[
+                Route("/api/status", self.status),
+                WebSocketRoute("/ws", self.websocket),
+            ],
+            lifespan=self.lifespan,
+        )
+
+    async def call(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def status(self, request: Request) -> JSONResponse:
+        # presence.online() takes the world lock, so it runs on the pool like any engine call
+        online = [] if self.db.loading else await self.call(
+            lambda: [p.name for p in self.engine.presence.online()])
+        return JSONResponse({
+            'world': self.db.meta.get('name'),
+            'loading': self.db.loading,
+            'sessions': len(self.sessions),
+            'online': online,
+        })
+
+    async def websocket(self, ws: WebSocket) -> None:
+        await ApiSession(self, ws).run()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self, app: Starlette):
+        tasks = []
+        if self.telnet_port:
+            telnet = TelnetServer(self.db, self.engine)
+            telnet.executor = self.executor  # One pool for both front ends
+            listener = await telnet.start("0.0.0.0", self.telnet_port)
+            tasks.append(asyncio.create_task(listener.serve_forever()))
+        tasks.append(asyncio.create_task(self.autosave(SAVE_INTERVAL)))
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            print("[MASH] Saving world before shutdown")
+            await self.call(self.db.save_delta, self.save_path)
+
+    async def autosave(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.call(self.db.save_delta, self.save_path)
+            except Exception as e:
+                print(f"[MASH] Auto-save failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--world", type=Path, default=WORLD_FILE, help="world.json or a .mashb snapshot")
+    parser.add_argument("--sqlite", type=Path, default=None, help="Serve a SQLite world instead")
+    parser.add_argument("--telnet-port", type=int, default=None, help="Also serve telnet from this process")
+    parser.add_argument("--workers", type=int, default=32, help="Threads running engine commands")
+    parser.add_argument("--no-ai", action="store_true", help="Run without the Gemini AI layer")
+    parser.add_argument("--no-journal", action="store_true", help="Rely on periodic saves only")
+    args = parser.parse_args()
+
+    db = open_world(args.world, args.sqlite, journal=not args.no_journal)
+    engine = MashEngine(db, ai_engine=None if args.no_ai else load_ai_engine())
+    engine.start_idle_checks(IDLE_CHECK_INTERVAL, timeout_seconds=300)
+    api = MashApi(db, engine, workers=args.workers,
+                  save_path=None if args.sqlite else args.world, telnet_port=args.telnet_port)
+    try:
+        uvicorn.run(api.app, host=args.host, port=args.port)
+    finally:
+        engine.stop_idle_checks()
+        db.close_journal()
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,6 @@ Periodic auto-save every 30 minutes, plus manual @dump/@reload for wizards.
 
 import streamlit as st
 import os
-import hashlib
 import time
 import random
 import threading
@@ -19,7 +18,9 @@ import re
 from pathlib import Path
 from dotenv import load_dotenv
 from database import WorldDatabase
+from sqlite_database import SqliteWorldDatabase
 from mash_engine import MashEngine
+from accounts import check_login, create_player
 from ai_layer import AIEngine
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 from streamlit.runtime import get_instance
@@ -28,34 +29,144 @@ from streamlit.runtime import get_instance
 # Safe Synchronization (Multi-Player Support)
 # ─────────────────────────────────────────────────────────────────
 
+def pull_messages(player_ref: str) -> list:
+    """Announcements for this session's player since its cursor (advancing the cursor)."""
+    db = get_db()
+    since = st.session_state.get("event_cursor")
+    if since is None:
+        # A session only hears what happens after it starts listening
+        st.session_state.event_cursor = db.event_seq
+        return []
+    st.session_state.event_cursor, msgs = db.read_messages(player_ref, since)
+    return msgs
+
+
 def check_sync_buffer():
-    """Check and drain message buffer for the current player (Interaction/Poll)."""
+    """Move new room announcements for the current player into the chat (before it renders)."""
     if not st.session_state.get("authenticated") or not st.session_state.get("player_ref"):
         return
         
-    db = get_db()
-    player = db.get_agent(st.session_state.player_ref)
-    
-    # Check if there are new messages in the buffer
-    if player and hasattr(player, 'message_buffer') and player.message_buffer:
-        made_changes = False
-        for ann in player.message_buffer:
-            if not is_near_duplicate(ann, st.session_state.messages):
-                st.session_state.messages.append({"role": "assistant", "content": ann})
-                made_changes = True
-        
-        if made_changes:
-            # We clear the buffer in the central DB object. 
-            # The next save (either auto or manual) will persist this.
-            player.message_buffer = [] 
-            # Force a rerun of the UI (outside the fragment or via the main loop check)
-            st.rerun()
-
-@st.fragment(run_every="3s")
-def sync_poll_loop():
-    """Safe, legit polling to check for messages from other players."""
-    if st.session_state.get("authenticated"):
-        check_sync_buffer()
+    for ann in pull_messages(st.session_state.player_ref):
+        if not is_near_duplicate(ann, st.session_state.messages):
+            st.session_state.messages.append({"role": "assistant", "content": ann})
+
+
+FALLBACK_POLL = "10s"  # Picks up wakes SessionWaker could not deliver itself (see fallback_poll)
+
+
+def _session_manager():
+    """
+    Streamlit's session manager, which SessionWaker uses to rerun other
+    sessions. It is private API (written against streamlit 1.52, pinned in
+    requirements.txt), so a release without it gives None and sessions fall
+    back to a slow poll (see fallback_poll).
+    """
+    try:
+        mgr = get_instance()._session_mgr
+    except Exception:
+        return None
+    return mgr if hasattr(mgr, 'get_active_session_info') else None
+
+
+class SessionWaker:
+    """
+    Reruns a browser session when its player receives an announcement, so
+    idle sessions cost nothing instead of polling every few seconds. A wake
+    that arrives while the session's script is running is held and turned
+    into one rerun when the run ends (interrupting a command is not safe).
+    Without a working session manager to rerun through, wakes are only
+    held, for fallback_poll to pick up.
+    """
+
+    def __init__(self, db: WorldDatabase):
+        self.db = db
+        self.push = _session_manager() is not None
+        self._lock = threading.Lock()
+        self._sessions: dict = {}  # session_id -> {'agent', 'token', 'running', 'pending'}
+        if not self.push:
+            print(f"[MASH] Streamlit session manager not available; sessions poll every {FALLBACK_POLL}")
+
+    def watch(self, session_id: str, agent_ref: str) -> None:
+        """Listen for this session's player (switching listeners if the player changed)."""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state and state['agent'] == agent_ref:
+                return
+            if state:
+                self.db.remove_listener(state['token'])
+            token = self.db.add_listener(agent_ref, lambda: self._wake(session_id))
+            self._sessions[session_id] = {'agent': agent_ref, 'token': token, 'running': False, 'pending': False}
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            state = self._sessions.pop(session_id, None)
+        if state:
+            self.db.remove_listener(state['token'])
+
+    def begin(self, session_id: str) -> None:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state:
+                state['running'], state['pending'] = True, False
+
+    def end(self, session_id: str) -> bool:
+        """Mark the run finished. True if a wake arrived during it (the caller should rerun)."""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if not state:
+                return False
+            state['running'] = False
+            pending, state['pending'] = state['pending'], False
+            return pending
+
+    def _wake(self, session_id: str) -> None:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if not state:
+                return
+            if state['running'] or not self.push:
+                state['pending'] = True
+                return
+            # Mark it running now so a burst of announcements asks for one rerun
+            state['running'] = True
+        try:
+            info = _session_manager().get_active_session_info(session_id)
+            if info is None:
+                self.forget(session_id)  # Browser went away
+                return
+            info.session.request_rerun(None)
+        except Exception as e:
+            # Streamlit internals changed under us: hold wakes for fallback_poll from now on
+            print(f"[MASH] Can't rerun sessions on demand ({e}); polling every {FALLBACK_POLL} instead")
+            self.push = False
+            with self._lock:
+                state['pending'] = True
+
+
+@st.cache_resource
+def get_session_waker(_db):
+    """The waker shared by all sessions of this server."""
+    return SessionWaker(_db)
+
+
+@st.fragment(run_every=FALLBACK_POLL)
+def fallback_poll():
+    """
+    Rerun if SessionWaker is holding a wake for us. A fragment only runs
+    between full runs, so the session is idle here: this also closes out a
+    run that never reached the end of the script (st.stop(), an error), and
+    a wake that arrived during it still becomes a rerun.
+    """
+    if st.session_state.pop('_poll_inline', False):
+        return  # Called from the full run, which is still going
+    session_id = current_session_id()
+    if session_id and get_session_waker(get_db()).end(session_id):
+        st.rerun()
+
+
+def current_session_id() -> str | None:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
 
 def clean(s):
     """Clean string for comparison (remove icons, bolding, and whitespace)."""
@@ -76,6 +187,16 @@ def is_near_duplicate(msg, history, limit=5):
                 return True
     return False
 
+def live_writer(placeholder):
+    """on_text sink for engine.process_command: grows a chat bubble as text arrives."""
+    text = []
+    def write(chunk):
+        text.append(chunk)
+        with placeholder.container():
+            with st.chat_message("assistant"):
+                st.markdown("".join(text) + " ▌")
+    return write
+
 # Load environment variables from .env
 load_dotenv()
 
@@ -88,9 +209,19 @@ load_dotenv()
 ENGINE_VERSION = 61
 
 
-WORLD_FILE = Path(__file__).parent / "world.json"
+WORLD_FILES = {
+    "json": Path(__file__).parent / "world.json",     # Human-readable, diffable
+    "binary": Path(__file__).parent / "world.mashb",  # Compact, loads faster (see database.py)
+}
+SNAPSHOT_FORMAT = "json"  # Format of the live world file used by auto-save and checkpoints
+WORLD_FILE = WORLD_FILES[SNAPSHOT_FORMAT]
+SQLITE_FILE = Path(__file__).parent / "world.db"  # Used when DB_BACKEND = "sqlite"
+DB_BACKEND = "json"  # "json" (world.json + journal) or "sqlite" (see sqlite_database.py)
 START_ROOM = "#0"  # The Arrival is the first room if world is missing
 AUTO_SAVE_INTERVAL = 30 * 60  # 30 minutes in seconds
+JOURNAL_ENABLED = True  # Append mutations to world.json.journal instead of rewriting the world
+CHECKPOINT_INTERVAL = 10 * 60  # Compact the journal into a full snapshot every 10 minutes
+IDLE_CHECK_INTERVAL = 30  # Send idle robots home on this timer (seconds)
 
 
 # ─────────────────────────────────────────────────────────────────
@@ -185,11 +316,21 @@ def get_shared_database():
     Load and return the shared world database.
     This is a singleton shared across ALL user sessions.
     """
-    db = WorldDatabase()
-    if WORLD_FILE.exists():
-        db.load(WORLD_FILE)
-        print(f"[MASH] Loaded world: {db.meta.get('name')} ({len(db.objects)} objects)")
+    if DB_BACKEND == "sqlite":
+        db = SqliteWorldDatabase(SQLITE_FILE)
+        print(f"[MASH] Opened SQLite world: {db.meta.get('name')} ({SQLITE_FILE.name})")
+    elif any(path.exists() for path in WORLD_FILES.values()):
+        db = WorldDatabase()
+        # After a SNAPSHOT_FORMAT switch, start from the other format's file once
+        source = WORLD_FILE if WORLD_FILE.exists() else next(p for p in WORLD_FILES.values() if p.exists())
+        # Returns once the first room is live; the rest streams in behind it
+        db.load(source, background=True, verbose=True)
+        print(f"[MASH] Loading world: {db.meta.get('name')} (first room ready)")
+        if source != WORLD_FILE:
+            print(f"[MASH] Converting {source.name} -> {WORLD_FILE.name}")
+            db.save(WORLD_FILE)
     else:
+        db = WorldDatabase()
         print("[MASH] No world file found, starting with empty world")
         
     # --- MINIMAL STARTUP CHECK ---
@@ -202,6 +343,9 @@ def get_shared_database():
             desc="You stand in a shimmering void of potential. A new world begins here."
         )
         
+    if JOURNAL_ENABLED and DB_BACKEND == "json":
+        db.enable_journal(WORLD_FILE, checkpoint_interval=CHECKPOINT_INTERVAL)
+        
     return db
 
 
@@ -221,6 +365,7 @@ def get_shared_engine(_db, ai_version, _ai, research_path="research_artifacts",
     engine = MashEngine(_db, ai_engine=_ai)
     engine.research_path = research_path
     engine.snapshot_path = snapshot_path
+    engine.start_idle_checks(IDLE_CHECK_INTERVAL, timeout_seconds=300)
     return engine
 
 @st.cache_resource
@@ -280,6 +425,8 @@ def init_session_state():
         st.session_state.research_index = 0
     if "pending_chain" not in st.session_state:
         st.session_state.pending_chain = None
+    if "event_cursor" not in st.session_state:
+        st.session_state.event_cursor = None  # Last room event seen (see pull_messages)
     if "last_view" not in st.session_state:
         st.session_state.last_view = None
 
@@ -340,38 +487,24 @@ def parse_input_stream(text):
             
     return cmds
 
-def hash_password(password: str) -> str:
-    """Simple password hashing. NOT secure for production!"""
-    return hashlib.sha256(password.encode()).hexdigest()[:16]
-
 
-def find_player_by_name(name: str):
-    """Find a player agent by name (case-insensitive)."""
-    db = get_db()
-    name_lower = name.lower().strip()
-    for obj in db.objects.values():
-        if obj.type == 'agent' and not obj.autonomous:
-            if obj.name.lower() == name_lower:
-                return obj
-    return None
-
-
-def count_existing_players() -> int:
-    """Count how many player characters exist (non-autonomous agents)."""
-    db = get_db()
-    count = 0
-    for obj in db.objects.values():
-        if obj.type == 'agent' and not obj.autonomous:
-            count += 1
-    return count
-
-
-def save_world(announce: bool = False) -> str:
-    """Save the world state to disk."""
+def save_world(announce: bool = False, fmt: str | None = None, wait: bool = False) -> str:
+    """
+    Save the world state to disk (only objects changed since the last save).
+    Full snapshots are written by the database's background saver; wait=True
+    returns only once the save is durable (@dump), otherwise it returns at once.
+    With a `fmt` other than SNAPSHOT_FORMAT, also export a full copy in that format.
+    """
     db = get_db()
-    db.save(WORLD_FILE)
+    written = db.save_delta(WORLD_FILE, wait=wait)
     get_last_save_time()["timestamp"] = time.time()
-    msg = f"GAME: Database saved. ({len(db.objects)} objects)"
+    if wait:
+        msg = f"GAME: Database saved. ({written} changed of {len(db.objects)} objects)"
+    else:
+        msg = f"GAME: Database save started. ({written} changed of {len(db.objects)} objects)"
+    if fmt and fmt != SNAPSHOT_FORMAT:
+        db.export(WORLD_FILES[fmt])
+        msg += f" Exported a full copy to {WORLD_FILES[fmt].name}."
     if announce:
         print(f"[MASH] {msg}")
     return msg
@@ -388,16 +521,10 @@ def reload_world() -> str:
 
 
 def check_auto_save():
-    """Check if it's time for an auto-save and idle-check."""
+    """Check if it's time for an auto-save (idle robots are handled by the engine's timer)."""
     last_save = get_last_save_time()
     elapsed = time.time() - last_save["timestamp"]
     if elapsed >= AUTO_SAVE_INTERVAL:
-        # Also perform a quick idle check for autonomous agents
-        try:
-            get_engine().check_idle_agents(timeout_seconds=300)
-        except:
-            pass
-            
         save_world(announce=True)
         return True
     return False
@@ -431,13 +558,12 @@ def execute_sidebar_cmd(cmd_text):
             if result.message:
                 st.session_state.messages.append({"role": "assistant", "content": result.message})
     
-    # Process Message Buffer (for async events like auto-gaze)
+    # Pick up room announcements (for async events like auto-gaze)
     db = get_db()
     player = db.get_agent(player_ref)
-    if player and getattr(player, 'message_buffer', []):
-        for msg in player.message_buffer:
+    if player:
+        for msg in pull_messages(player_ref):
             st.session_state.messages.append({"role": "assistant", "content": msg})
-        player.message_buffer = []  # Clear buffer
     
     # Sync Reactions
     if result.success:
@@ -480,10 +606,13 @@ def handle_wizard_command(player_ref: str, cmd: str) -> str | None:
     """
     cmd_lower = cmd.lower().strip()
     
-    if cmd_lower == "@dump":
+    if cmd_lower == "@dump" or cmd_lower.startswith("@dump "):
         if not is_wizard(player_ref):
             return "Permission denied. Wizard powers required."
-        return save_world(announce=True)
+        fmt = cmd_lower[len("@dump"):].strip() or None
+        if fmt and fmt not in WORLD_FILES:
+            return f"Usage: @dump [{'|'.join(WORLD_FILES)}]"
+        return save_world(announce=True, fmt=fmt, wait=True)
     
     if cmd_lower == "@reload":
         if not is_wizard(player_ref):
@@ -509,7 +638,7 @@ def process_robot_ticks(player_ref: str):
     if not ai:
         return "AI Engine not available."
         
-    robots = [obj for obj in db.objects.values() if obj.type == 'agent' and getattr(obj, 'robot', False)]
+    robots = db.query(type='agent', flag='robot')
     if not robots:
         return "No robot agents found in the database."
         
@@ -563,37 +692,24 @@ def show_login_screen():
             connect_btn = st.form_submit_button("🔑 Connect", width="stretch")
             
             if connect_btn:
-                if not login_name.strip():
-                    st.error("Please enter your character name!")
-                elif not login_password:
-                    st.error("Please enter your password!")
+                player, error = check_login(get_db(), login_name, login_password)
+                if error:
+                    st.error(error)
                 else:
-                    # Look up player
-                    player = find_player_by_name(login_name)
+                    st.session_state.authenticated = True
+                    st.session_state.player_ref = player.dbref
+                    st.session_state.event_cursor = get_db().event_seq
                     
-                    if not player:
-                        st.error(f"Character '{login_name}' not found. Create a new character?")
-                    else:
-                        # Check password
-                        stored_hash = getattr(player, 'password_hash', None)
-                        if not stored_hash:
-                            st.error("This character has no password set. Contact admin.")
-                        elif hash_password(login_password) != stored_hash:
-                            st.error("Incorrect password!")
-                        else:
-                            st.session_state.authenticated = True
-                            st.session_state.player_ref = player.dbref
-                            
-                            # Initialize chat
-                            engine = get_engine()
-                            result = engine.process_command(player.dbref, "look")
-                            
-                            wiz_msg = " You have **Wizard** powers." if getattr(player, 'wizard', False) else ""
-                            st.session_state.messages = [
-                                {"role": "system", "content": f"Welcome back, **{player.name}**!{wiz_msg}"},
-                                {"role": "assistant", "content": result.message}
-                            ]
-                            st.rerun()
+                    # Initialize chat
+                    engine = get_engine()
+                    result = engine.process_command(player.dbref, "look")
+                    
+                    wiz_msg = " You have **Wizard** powers." if getattr(player, 'wizard', False) else ""
+                    st.session_state.messages = [
+                        {"role": "system", "content": f"Welcome back, **{player.name}**!{wiz_msg}"},
+                        {"role": "assistant", "content": result.message}
+                    ]
+                    st.rerun()
     
     # ─────────────────────────────────────────────────────────────
     # Create Character Tab
@@ -630,45 +746,16 @@ def show_login_screen():
             create_btn = st.form_submit_button("✨ Create & Enter", width="stretch")
             
             if create_btn:
-                # Validation
-                if not new_name.strip():
-                    st.error("Please enter a character name!")
-                elif len(new_name.strip()) < 2:
-                    st.error("Character name must be at least 2 characters!")
-                elif not new_password:
-                    st.error("Please choose a password!")
-                elif len(new_password) < 4:
-                    st.error("Password must be at least 4 characters!")
-                elif new_password != confirm_password:
+                # Validation (the rest happens in create_player)
+                player = None
+                if new_password != confirm_password:
                     st.error("Passwords don't match!")
-                elif find_player_by_name(new_name):
-                    st.error(f"Character '{new_name}' already exists! Choose another name.")
                 else:
-                    # Check if this is the first player (gets wizard flag)
-                    is_first_player = count_existing_players() == 0
-                    
-                    # Create new player
-                    db = get_db()
-                    player = db.create_object(
-                        'agent',
-                        new_name.strip(),
-                        desc=new_desc.strip() if new_desc.strip() else "A mysterious traveler.",
-                        autonomous=False,
-                        location=START_ROOM
-                    )
-                    
-                    # Store password hash
-                    player.password_hash = hash_password(new_password)
-                    
-                    # Players own themselves
-                    player.owner = player.dbref
-                    
-                    # First player becomes wizard!
-                    if is_first_player:
-                        player.wizard = True
-                    else:
-                        # Non-wizards get starting tokens
-                        player.tokens = 100
+                    player, error = create_player(get_db(), new_name, new_password, new_desc, start_room=START_ROOM)
+                    if error:
+                        st.error(error)
+                if player:
+                    is_first_player = player.wizard
                     
                     # Save world with new player
                     save_world()
@@ -676,6 +763,7 @@ def show_login_screen():
                     # Authenticate
                     st.session_state.authenticated = True
                     st.session_state.player_ref = player.dbref
+                    st.session_state.event_cursor = get_db().event_seq
                     
                     # Initialize chat with appropriate welcome
                     engine = get_engine()
@@ -702,12 +790,23 @@ def show_login_screen():
 # ─────────────────────────────────────────────────────────────────
 
 if not st.session_state.authenticated:
+    if current_session_id():
+        get_session_waker(get_db()).forget(current_session_id())
     show_login_screen()
     st.stop()
 
 # --- INSTANT SYNC HOOKS ---
-# (Background polling handled at the end of script for stability)
-check_sync_buffer() 
+# Announcements for this player wake the session (see SessionWaker); pick up
+# anything pending before the chat renders.
+_waker = get_session_waker(get_db())
+_session_id = current_session_id()
+if _session_id:
+    _waker.watch(_session_id, st.session_state.player_ref)
+    _waker.begin(_session_id)
+check_sync_buffer()
+if _session_id:
+    st.session_state._poll_inline = True
+    fallback_poll()
 
 
 # ─────────────────────────────────────────────────────────────────
@@ -739,10 +838,7 @@ def render_outfit_manager(player_ref: str, mode: str = "all"):
     if mode in ["all", "self"]:
         all_targets.append(player)
     if mode in ["all", "others"]:
-        for obj in db.objects.values():
-            if obj.type == 'agent' and obj.dbref != player_ref:
-                if getattr(obj, 'owner', '') == player_ref:
-                    all_targets.append(obj)
+        all_targets.extend(o for o in db.query(type='agent', owner=player_ref) if o.dbref != player_ref)
     
     if not all_targets:
         st.info("No targets available.")
@@ -867,7 +963,7 @@ def render_construction_menu(player_ref: str):
             exit_name = st.text_input("Exit Name", placeholder="north", key="link_exit_name")
             
             # Room Selection
-            owned_rooms = sorted([r for r in db.objects.values() if r.type == 'room' and r.owner == player_ref], key=lambda x: x.name)
+            owned_rooms = sorted(db.query(type='room', owner=player_ref), key=lambda x: x.name)
             if not owned_rooms:
                 st.warning("No owned rooms found to link to.")
             else:
@@ -1084,7 +1180,7 @@ def render_sidebar():
                             st.caption("No exits.")
                 elif btn.get('is_teleport'):
                     with st.popover(btn['label'], help="Wizard Teleport", use_container_width=True):
-                        owned = sorted([o for o in db.objects.values() if o.type == 'room' and o.owner == player.dbref], key=lambda x: x.name)
+                        owned = sorted(db.query(type='room', owner=player.dbref), key=lambda x: x.name)
                         if owned:
                             tp_cols = st.columns(2)
                             for i, r in enumerate(owned):
@@ -1176,7 +1272,7 @@ def render_sidebar():
             # Check for owned robots in the vicinity or generally?
             # render_outfit_manager(mode='others') checks ALL objects in DB for ownership.
             # So simple check: does player own ANY agents?
-            owned_agents = [o for o in db.objects.values() if o.type == 'agent' and o.dbref != player.dbref and getattr(o, 'owner', '') == player_ref]
+            owned_agents = [o for o in db.query(type='agent', owner=player_ref) if o.dbref != player.dbref]
             has_permission = is_wiz or bool(owned_agents)
             
             if has_permission:
@@ -1248,7 +1344,7 @@ def render_sidebar():
                 if st.button("🎨 Snapshot", help="Snapshot Scene (Async)", use_container_width=True):
                     execute_sidebar_cmd("@snapshot")
             with sys_r2_c2:
-                if st.button("🧹 Purge Buffers", help="Clear message buffers for all players", use_container_width=True):
+                if st.button("🧹 Purge Buffers", help="Clear the room event logs", use_container_width=True):
                     execute_sidebar_cmd("@purge_buffer")
 
             # Row 3: Reload | Dump (Tiled, Wizard Only)
@@ -1259,7 +1355,7 @@ def render_sidebar():
                     st.rerun()
             with sys_r3_c2:
                 if st.button("💾 Dump", help="Force save world state", use_container_width=True):
-                    save_world(announce=True)
+                    save_world(announce=True, wait=True)
                     st.rerun()
             
             st.divider()
@@ -1673,8 +1769,13 @@ if prompt := st.chat_input("Type a command..."):
         response_msg = handle_wizard_command(st.session_state.player_ref, cmd)
         
         if not response_msg:
-            # Process regular command
-            result = engine.process_command(st.session_state.player_ref, cmd)
+            # Process regular command (VR scenes render as they are written)
+            live = st.empty()
+            try:
+                result = engine.process_command(st.session_state.player_ref, cmd,
+                                                on_text=live_writer(live))
+            finally:
+                live.empty()
             response_msg = result.message
         else:
             # Fake a result object for wizard commands to simplify logic
@@ -1716,14 +1817,11 @@ if prompt := st.chat_input("Type a command..."):
                         if msg and not is_near_duplicate(msg, st.session_state.messages):
                             st.session_state.messages.append({"role": "assistant", "content": msg})
 
-        # Poll for any buffered announcements (including those from reactions)
+        # Pick up any new announcements (including those from reactions)
         if player:
-            if hasattr(player, 'message_buffer') and player.message_buffer:
-                for ann in player.message_buffer:
-                    if not is_near_duplicate(ann, st.session_state.messages):
-                        st.session_state.messages.append({"role": "assistant", "content": ann})
-                player.message_buffer = [] # Clear buffer
-                db.save(WORLD_FILE) # Persist the clear immediately
+            for ann in pull_messages(player.dbref):
+                if not is_near_duplicate(ann, st.session_state.messages):
+                    st.session_state.messages.append({"role": "assistant", "content": ann})
 
     
     # Check for auto-save after script
@@ -1735,11 +1833,9 @@ if prompt := st.chat_input("Type a command..."):
 # ─────────────────────────────────────────────────────────────────
 # 8. Background Synchronization
 # ─────────────────────────────────────────────────────────────────
-# Run the background polling loop at the very end of the script.
-# This ensures it's registered after all UI elements are rendered.
-with st.container():
-    sync_poll_loop()
-
-
-
-
+# Runs at the very end of the script: an announcement that arrived while this
+# run was in progress becomes one more rerun; otherwise the session stays idle
+# until SessionWaker wakes it. A run that stops early (st.stop(), an error)
+# never gets here; fallback_poll closes it out instead.
+if _session_id and _waker.end(_session_id):
+    st.rerun()
@@ -0,0 +1,105 @@
+"""
+MASH Session Sync Benchmark
+===========================
+Simulates connected sessions picking up room announcements, first by polling
+every few seconds (the old sync_poll_loop), then by waiting for a wake from
+WorldDatabase.add_listener. A talker says something in one room at a fixed
+rate while everyone else idles. Reports session wake-ups per second, CPU use
+and delivery latency for each mode.
+
+Each wake-up here is only the database read. In the app every wake-up is also
+a Streamlit script run, so the wake-up count is the number that matters.
+
+    python benchmarks/bench_idle_sync.py [--sessions 200] [--seconds 10]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import WorldDatabase
+
+
+def build_world(sessions: int, rooms: int):
+    db = WorldDatabase()
+    room_refs = [db.create_object('room', f"Room {i}").dbref for i in range(rooms)]
+    agents = [db.create_object('agent', f"Player {i}", location=room_refs[i % rooms]).dbref
+              for i in range(sessions)]
+    return db, room_refs, agents
+
+
+def run(mode: str, args) -> None:
+    db, rooms, agents = build_world(args.sessions, args.rooms)
+    stop = threading.Event()
+    wakeups, latencies = [0], []
+    lock = threading.Lock()
+
+    def deliver(agent: str, cursor: int) -> int:
+        cursor, msgs = db.read_messages(agent, cursor)
+        now = time.perf_counter()
+        with lock:
+            wakeups[0] += 1
+            latencies.extend(now - float(m.split()[-1]) for m in msgs)
+        return cursor
+
+    def poll_session(agent: str, offset: float) -> None:
+        cursor = db.event_seq
+        stop.wait(offset)
+        while not stop.wait(args.interval):
+            cursor = deliver(agent, cursor)
+
+    def push_session(agent: str) -> None:
+        cursor = db.event_seq
+        woken = threading.Event()
+        token = db.add_listener(agent, woken.set)
+        while not stop.is_set():
+            if woken.wait(0.5):
+                woken.clear()
+                cursor = deliver(agent, cursor)
+        db.remove_listener(token)
+
+    threads = []
+    for i, agent in enumerate(agents):
+        if mode == "poll":
+            target, targs = poll_session, (agent, args.interval * i / len(agents))
+        else:
+            target, targs = push_session, (agent,)
+        threads.append(threading.Thread(target=target, args=targs, daemon=True))
+    for t in threads:
+        t.start()
+
+    said = 0
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    while time.perf_counter() - start_wall < args.seconds:
+        db.room_announce(rooms[0], f"Talker says hello at {time.perf_counter()}")
+        said += 1
+        time.sleep(1.0 / args.say_rate)
+    wall, cpu = time.perf_counter() - start_wall, time.process_time() - start_cpu
+    stop.set()
+    for t in threads:
+        t.join()
+
+    avg = sum(latencies) / len(latencies) * 1000 if latencies else 0.0
+    print(f"{mode}: {wakeups[0] / wall:,.1f} wake-ups/sec, CPU {cpu / wall * 100:.1f}%, "
+          f"{len(latencies)} deliveries of {said} messages, avg latency {avg:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=3.0, help="Poll interval (seconds)")
+    parser.add_argument("--say-rate", type=float, default=1.0, help="Messages per second in the busy room")
+    args = parser.parse_args()
+
+    for mode in ("poll", "push"):
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
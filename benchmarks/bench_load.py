@@ -0,0 +1,66 @@
+"""
+MASH World Load Benchmark
+=========================
+Writes a synthetic world as JSON and as a binary snapshot, then loads it
+with the streaming loader. Reports objects/sec for a foreground load of each
+format at each worker count, and how soon a background load makes the first
+room queryable.
+
+    python benchmarks/bench_load.py [--objects 100000] [--workers 0 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import WorldDatabase, convert_world
+
+
+def build_world(path: str, objects: int) -> None:
+    db = WorldDatabase()
+    rooms = [db.create_object('room', f"Room {i}", desc="A plain room.").dbref for i in range(max(1, objects // 50))]
+    for i in range(objects - len(rooms)):
+        room = rooms[i % len(rooms)]
+        if i % 10 == 0:
+            db.create_object('exit', f"Passage {i}", source=room, destination=rooms[(i + 1) % len(rooms)])
+        else:
+            db.create_object('object', f"Widget {i}", location=room, desc="A widget.", attrs={'COLOR': 'red'})
+    db.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs='+', default=[0, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "world.json")
+        build_world(path, args.objects)
+        binary_path = os.path.join(tmp, "world.mashb")
+        convert_world(path, binary_path)
+        print(f"objects: {args.objects}, json: {os.path.getsize(path) / 1e6:.1f} MB, "
+              f"binary: {os.path.getsize(binary_path) / 1e6:.1f} MB")
+
+        for label, world in (("json", path), ("binary", binary_path)):
+            for workers in args.workers:
+                db = WorldDatabase()
+                db.load(world, workers=workers)
+                print(f"{label} workers={workers}: {db.load_stats['objects_per_sec']:,.0f} objects/sec")
+
+        db = WorldDatabase()
+        start = time.perf_counter()
+        db.load(path, background=True)
+        first = time.perf_counter() - start
+        assert db.get('#0') is not None
+        db.wait_loaded()
+        print(f"background: first room after {first * 1000:.1f} ms, "
+              f"fully loaded after {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+MASH Memory Benchmark
+=====================
+Builds a synthetic world and reports the per-object memory footprint.
+
+    python benchmarks/bench_memory.py [--objects 100000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import WorldDatabase
+
+# Rough mix of a lived-in world: mostly things and exits, fewer rooms and agents
+TYPE_MIX = (('room', 0.15), ('exit', 0.35), ('object', 0.40), ('agent', 0.10))
+
+
+def build_world(count: int) -> WorldDatabase:
+    db = WorldDatabase()
+    rooms = []
+    for obj_type, share in TYPE_MIX:
+        for i in range(int(count * share)):
+            if obj_type == 'room':
+                obj = db.create_object('room', f"Room {i}", desc="A plain room.")
+                rooms.append(obj.dbref)
+            elif obj_type == 'exit':
+                src, dst = rooms[i % len(rooms)], rooms[(i * 7) % len(rooms)]
+                obj = db.create_object('exit', f"Exit {i}", source=src, destination=dst)
+                db.get(src).exits.append(obj.dbref)
+            elif obj_type == 'object':
+                obj = db.create_object('object', f"Thing {i}", desc="Some object.", location=rooms[i % len(rooms)])
+                if i % 10 == 0:
+                    obj.attrs['NOTE'] = "a note"
+            else:
+                obj = db.create_object('agent', f"Agent {i}", location=rooms[i % len(rooms)],
+                                       tokens=100, home=rooms[0])
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=100_000)
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+    db = build_world(args.objects)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    count = len(db.objects)
+    print(f"objects:          {count}")
+    print(f"total traced:     {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)")
+    print(f"bytes per object: {current / count:.0f} (includes indices)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+MASH Save Stall Benchmark
+=========================
+Runs a full save of a synthetic world while another thread keeps editing
+objects, the way concurrent sessions do during an auto-save. Reports how
+long the save took and the worst time an edit waited on the database lock.
+
+    python benchmarks/bench_save_stall.py [--objects 100000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import WorldDatabase
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=100_000)
+    args = parser.parse_args()
+
+    db = WorldDatabase()
+    room = db.create_object('room', 'Plaza')
+    for i in range(args.objects):
+        db.create_object('object', f"Widget {i}", location=room.dbref, desc="A widget.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "world.json")
+        stalls = []
+        stop = threading.Event()
+
+        def edit():
+            target = db.get('#1')
+            while not stop.is_set():
+                start = time.perf_counter()
+                target.desc = f"Edited at {start}"
+                stalls.append(time.perf_counter() - start)
+                time.sleep(0.001)
+
+        for label in ("first save", "second save"):
+            stalls.clear()
+            stop.clear()
+            editor = threading.Thread(target=edit)
+            editor.start()
+            start = time.perf_counter()
+            db.save(path)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            editor.join()
+            print(f"{label}: {elapsed * 1000:.0f} ms, {len(stalls)} edits, "
+                  f"worst edit {max(stalls) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
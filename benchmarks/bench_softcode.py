@@ -0,0 +1,60 @@
+"""
+MASH Softcode Benchmark
+=======================
+Times `look` in a room whose name, description and contents use [func()]
+softcode, the path that evaluates every name on every look. With
+--no-cache each text is recompiled on every evaluation, which is close to
+what the old regex evaluator did.
+
+    python benchmarks/bench_softcode.py [--objects 30] [--looks 5000] [--no-cache]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import softcode
+from database import WorldDatabase
+from mash_engine import MashEngine
+
+
+def build(objects: int):
+    db = WorldDatabase()
+    room = db.create_object('room', 'The [pick(Neon|Velvet|Chrome)] Lounge',
+                            desc="Lights pulse [rand(9)] times a second. It is [time()]. "
+                                 "The jukebox plays track [add(mul(2,3),v(TRACK))].")
+    room.attrs['TRACK'] = "4"
+    for i in range(objects):
+        name = f"Widget {i}" if i % 2 else f"Glowing Orb [add({i},1)]"
+        db.create_object('object', name, location=room.dbref)
+    player = db.create_object('agent', 'Bench', location=room.dbref, autonomous=False)
+    return db, player
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=30)
+    parser.add_argument("--looks", type=int, default=5000)
+    parser.add_argument("--no-cache", action="store_true", help="Recompile softcode on every evaluation")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        softcode.compile_softcode = softcode.compile_softcode.__wrapped__
+    db, player = build(args.objects)
+    engine = MashEngine(db)
+
+    start = time.perf_counter()
+    for _ in range(args.looks):
+        engine.process_command(player.dbref, "look")
+    elapsed = time.perf_counter() - start
+
+    print(f"looks: {args.looks / elapsed:,.0f}/sec ({elapsed / args.looks * 1e6:.0f} µs each)")
+    if not args.no_cache:
+        print(f"compile cache: {softcode.compile_softcode.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+MASH Telnet Load Test
+=====================
+Simulates N concurrent players on the telnet server. Every client creates a
+character, then says something at a fixed rate and times each round trip
+(until its own "You say" echo comes back). Everyone else in the room gets
+each line pushed to them, so the count of pushed lines shows the fan-out
+throughput.
+
+Without --port an in-process server with a fresh in-memory world is started
+on a free port; with --port it drives an already running telnet_server.py.
+
+    python benchmarks/bench_telnet.py [--clients 100] [--seconds 10] [--rate 0.5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import WorldDatabase
+from mash_engine import MashEngine
+from telnet_server import TelnetServer
+
+
+def start_local_server() -> int:
+    """Run a throwaway server on its own event loop thread. Returns its port."""
+    db = WorldDatabase()
+    db.create_object('room', 'The Arrival', desc="A load-test void.")
+    server = TelnetServer(db, MashEngine(db))
+    ready = threading.Event()
+    port = []
+
+    async def run():
+        listener = await server.start("127.0.0.1", 0)
+        port.append(listener.sockets[0].getsockname()[1])
+        ready.set()
+        await listener.serve_forever()
+
+    threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+async def client(i: int, args, stats: dict, deadline: float) -> None:
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+
+    async def until(marker: str) -> None:
+        while True:
+            line = (await reader.readline()).decode('utf-8', 'replace')
+            if not line:
+                raise ConnectionError("server closed the connection")
+            if marker in line:
+                return
+            stats['pushed'] += 1
+
+    writer.write(f"create Load{os.getpid()}x{i} secret\r\n".encode())
+    await until("Welcome")
+    stats['connected'] += 1
+
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        token = f"ping {i}-{n}"
+        start = time.perf_counter()
+        writer.write(f"say {token}\r\n".encode())
+        await writer.drain()
+        await until(f'You say, "{token}"')
+        stats['latencies'].append(time.perf_counter() - start)
+        await asyncio.sleep(max(0.0, 1.0 / args.rate - (time.perf_counter() - start)))
+
+    writer.write(b"QUIT\r\n")
+    writer.close()
+
+
+async def run(args) -> None:
+    stats = {'connected': 0, 'pushed': 0, 'latencies': []}
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(*(client(i, args, stats, deadline) for i in range(args.clients)))
+    wall = time.perf_counter() - start
+
+    lat = sorted(stats['latencies'])
+    p50 = lat[len(lat) // 2] * 1000 if lat else 0.0
+    p95 = lat[int(len(lat) * 0.95)] * 1000 if lat else 0.0
+    print(f"clients: {stats['connected']}/{args.clients}, commands: {len(lat) / wall:,.0f}/sec, "
+          f"latency p50 {p50:.1f} ms, p95 {p95:.1f} ms, pushed lines: {stats['pushed'] / wall:,.0f}/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="Use a running server")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rate", type=float, default=0.5, help="Commands per second per client")
+    args = parser.parse_args()
+
+    if args.port is None:
+        args.port = start_local_server()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,77 +7,303 @@ All data is stored in a single JSON file.
 Credit: Inspired by TinyMUSH flat-file database architecture.
 """
 
+import fnmatch
+import heapq
+import itertools
 import json
+import marshal
 import os
+import re
+import struct
+import time
 import uuid
 import threading
 import tempfile
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List, Any, Callable
-from dataclasses import dataclass, field, asdict
+from bisect import bisect_left
+from typing import Optional, Dict, List, Any, Callable, Tuple, Union, NamedTuple, Pattern
 
 
-@dataclass
-class GameObject:
-    """Base class for all game objects."""
-    dbref: str
-    type: str
-    name: str
-    desc: str = ""
-    location: str = "" # Added base location field for consistency
+# ─────────────────────────────────────────────────────────────────
+# Change Tracking
+# ─────────────────────────────────────────────────────────────────
+# Containers handed out by an attached GameObject report in-place edits
+# (inventory.append, attrs[key] = ...) back to the owning database, the
+# same way plain field assignments do through GameObject.__setattr__.
+
+class TrackedList(list):
+    """List that reports in-place edits to the GameObject that owns it."""
+    __slots__ = ('_owner', '_field')
+
+    def __init__(self, iterable=(), owner=None, field_name=None):
+        super().__init__(iterable)
+        self._owner = owner
+        self._field = field_name
+
+    def _changing(self):
+        owner = self._owner
+        if owner is not None and owner._db is not None:
+            owner._db._object_changing(owner)
+
+    def _changed(self, edit: Optional[tuple] = None):
+        owner = self._owner
+        if owner is not None and owner._db is not None:
+            owner._db._object_changed(owner, self._field, self, edit)
+
+
+class TrackedDict(dict):
+    """Dict that reports in-place edits to the GameObject that owns it."""
+    __slots__ = ('_owner', '_field')
+
+    def __init__(self, iterable=(), owner=None, field_name=None):
+        super().__init__(iterable)
+        self._owner = owner
+        self._field = field_name
+
+    _changing = TrackedList._changing
+    _changed = TrackedList._changed
+
+
+def _tracked(base, name, edit=None):
+    """Wrap a mutating method; `edit` names the op it journals (else the whole container)."""
+    method = getattr(base, name)
+    def wrapper(self, *args, **kwargs):
+        self._changing()
+        result = method(self, *args, **kwargs)
+        self._changed((edit, args[0]) if edit and args else None)
+        return result
+    wrapper.__name__ = name
+    return wrapper
+
+# Edits the journal records as one element or key (see WorldDatabase._object_changed)
+_LIST_EDITS = {'append': 'add', 'remove': 'rem'}
+_DICT_EDITS = {'__setitem__': 'put', 'setdefault': 'put', '__delitem__': 'pop', 'pop': 'pop'}
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort', 'reverse',
+              '__setitem__', '__delitem__', '__iadd__', '__imul__'):
+    setattr(TrackedList, _name, _tracked(list, _name, _LIST_EDITS.get(_name)))
+for _name in ('__setitem__', '__delitem__', 'pop', 'popitem', 'clear', 'update', 'setdefault', '__ior__'):
+    setattr(TrackedDict, _name, _tracked(dict, _name, _DICT_EDITS.get(_name)))
+
+
+# ─────────────────────────────────────────────────────────────────
+# Game Objects
+# ─────────────────────────────────────────────────────────────────
+# Every persistent field with its default, in save order. `list`/`dict`
+# defaults are factories, materialized on first access.
+
+FIELD_DEFAULTS: Dict[str, Any] = {
+    'type': "",
+    'name': "",
+    'desc': "",
+    'location': "",  # Added base location field for consistency
     
     # Room-specific
-    exits: List[str] = field(default_factory=list)
-    contents: List[str] = field(default_factory=list)
+    'exits': list,
+    'contents': list,
     
     # Exit-specific
-    aliases: List[str] = field(default_factory=list)
-    source: str = ""
-    destination: str = ""
+    'aliases': list,
+    'source': "",
+    'destination': "",
     
     # Agent-specific
-    autonomous: bool = False # Restored for consistency
-    robot: bool = False
-    search_ok: bool = False # AI grounding via Google Search
-    summon_ok: bool = False # Allow being summoned
-    home: str = "" # Re-standardized as str
-    last_interaction: float = 0.0 # Interaction tracking for auto-home
-    inventory: List[str] = field(default_factory=list)
-    password_hash: str = ""
-    wizard: bool = False
-    tokens: int = 0
-    message_buffer: List[str] = field(default_factory=list) # Async message queue
+    'autonomous': False,  # Restored for consistency
+    'robot': False,
+    'search_ok': False,  # AI grounding via Google Search
+    'summon_ok': False,  # Allow being summoned
+    'home': "",  # Re-standardized as str
+    'last_interaction': 0.0,  # Interaction tracking for auto-home
+    'inventory': list,
+    'password_hash': "",
+    'wizard': False,
+    'tokens': 0,
     
     # Object ownership and permissions
-    owner: str = ""
-    lock: str = ""
+    'owner': "",
+    'lock': "",
     
     # Sensory
-    olfactory: str = ""
-    flavor: str = ""
-    tactile: str = ""
-    auditory: str = ""
+    'olfactory': "",
+    'flavor': "",
+    'tactile': "",
+    'auditory': "",
     
     # AI Reactions
-    adesc: str = ""
-    asmell: str = ""
-    ataste: str = ""
-    atouch: str = ""
-    alisten: str = ""
-    memo: str = ""
-    status: str = "" # UPSUM / Narrative Goals
-    listening: bool = False
+    'adesc': "",
+    'asmell': "",
+    'ataste': "",
+    'atouch': "",
+    'alisten': "",
+    'memo': "",
+    'status': "",  # UPSUM / Narrative Goals
+    'listening': False,
     
     # Custom
-    attrs: Dict[str, str] = field(default_factory=dict)
+    'attrs': dict,
     
     # Flags
-    enter_ok: bool = False
-    ai_ok: bool = False
-    sneaky: bool = False
-    vehicle_type: str = ""  # e.g., "boat", "aircraft", "mech"
-    vr_ok: bool = False  # Enable Subjective VR Reality for rooms
+    'enter_ok': False,
+    'ai_ok': False,
+    'sneaky': False,
+    'vehicle_type': "",  # e.g., "boat", "aircraft", "mech"
+    'vr_ok': False,  # Enable Subjective VR Reality for rooms
+}
+
+# Boolean fields, each kept in a query index (see WorldDatabase.query)
+FLAG_FIELDS = tuple(name for name, default in FIELD_DEFAULTS.items() if default is False)
+
+# Fields every object keeps in a slot; the rest live in the sparse `_extra`
+# dict unless the object's type lists them in TYPE_SLOTS.
+CORE_SLOTS = ('dbref', 'type', 'name', 'desc', 'location', 'owner', 'attrs')
+TYPE_SLOTS = {
+    'room': ('exits', 'vr_ok'),
+    'exit': ('source', 'destination', 'aliases', 'lock'),
+    'agent': ('inventory', 'home', 'last_interaction', 'tokens', 'password_hash',
+              'wizard', 'autonomous', 'robot'),
+    'object': ('home', 'lock', 'listening'),
+}
+
+_MISSING = object()
+
+
+def _containers(fields: tuple) -> tuple:
+    """The fields among `fields` whose values are lists or dicts."""
+    return tuple(name for name in fields if callable(FIELD_DEFAULTS.get(name)))
+
 
+def _flags(fields: tuple) -> tuple:
+    """The boolean flags among `fields`."""
+    return tuple(name for name in fields if name in FLAG_FIELDS)
+
+
+def _in_save_order(fields: tuple) -> tuple:
+    """The persistent fields among `fields`, in FIELD_DEFAULTS order."""
+    return tuple(name for name in FIELD_DEFAULTS if name in fields)
+
+
+class GameObject:
+    """
+    Base class for all game objects.
+    
+    Constructing a GameObject returns the compact subclass for its type.
+    Unset fields cost nothing: reads fall back to FIELD_DEFAULTS, and
+    mutable defaults are created on first access.
+    """
+    __slots__ = CORE_SLOTS + ('_extra', '_db', '__weakref__')
+    _slot_fields = frozenset(CORE_SLOTS)
+    _container_slots = _containers(CORE_SLOTS)
+    _flag_slots = _flags(CORE_SLOTS)
+    _save_order = _in_save_order(CORE_SLOTS)
+    
+    def __new__(cls, dbref: str = "", type: str = "", name: str = "", **kwargs):
+        if cls is GameObject:
+            cls = _TYPE_CLASSES.get(type, GameObject)
+        return object.__new__(cls)
+    
+    def __init__(self, dbref: str, type: str, name: str, **kwargs):
+        object.__setattr__(self, '_db', None)  # Owning database, set on adoption
+        object.__setattr__(self, '_extra', None)
+        object.__setattr__(self, 'dbref', dbref)
+        object.__setattr__(self, 'type', type)
+        object.__setattr__(self, 'name', name)
+        for key, value in kwargs.items():
+            if key not in FIELD_DEFAULTS:
+                raise TypeError(f"GameObject got an unexpected field '{key}'")
+            self._store(key, value)
+    
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(dbref={self.dbref!r}, type={self.type!r}, name={self.name!r})"
+    
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for unset slots and overflow fields
+        if name[0] == '_':
+            raise AttributeError(name)
+        extra = self._extra
+        if extra is not None and name in extra:
+            return extra[name]
+        default = FIELD_DEFAULTS.get(name, _MISSING)
+        if default is _MISSING:
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+        if callable(default):
+            # Materialize so in-place edits (inventory.append) stick
+            value = default()
+            if self._db is not None:
+                value = _track(value, self, name)
+            self._store(name, value)
+            return value
+        return default
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name[0] == '_':
+            object.__setattr__(self, name, value)
+            return
+        db = self._db
+        if db is None:
+            self._store(name, value)
+            return
+        db._object_changing(self)
+        old = self._peek(name)
+        self._store(name, _track(value, self, name))
+        db._object_changed(self, name, old)
+    
+    def _peek(self, name: str) -> Any:
+        """Current value of a field without materializing defaults."""
+        if name in self._slot_fields:
+            try:
+                return object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        elif self._extra is not None and name in self._extra:
+            return self._extra[name]
+        default = FIELD_DEFAULTS.get(name)
+        return None if callable(default) else default
+    
+    def _store(self, name: str, value: Any) -> None:
+        if name in self._slot_fields:
+            object.__setattr__(self, name, value)
+            return
+        extra = self._extra
+        default = FIELD_DEFAULTS.get(name, _MISSING)
+        if not callable(default) and value == default:
+            if extra is not None:
+                extra.pop(name, None)  # Back to default: keep the overflow sparse
+            return
+        if extra is None:
+            extra = {}
+            object.__setattr__(self, '_extra', extra)
+        extra[name] = value
+    
+    def _attach(self, db: Optional['WorldDatabase']) -> None:
+        """Bind to (or release from) a database so that edits are reported to it."""
+        if db is not None:
+            for name in self._container_slots:
+                try:
+                    value = object.__getattribute__(self, name)
+                except AttributeError:
+                    continue  # Unset slot: nothing to wrap yet
+                if type(value) is list or type(value) is dict:
+                    object.__setattr__(self, name, _track(value, self, name))
+            if self._extra:
+                for name, value in self._extra.items():
+                    self._extra[name] = _track(value, self, name)
+        object.__setattr__(self, '_db', db)
+    
+    def _flags_on(self) -> List[str]:
+        """Names of the flags that are set, without materializing defaults."""
+        on = []
+        for name in self._flag_slots:
+            try:
+                if object.__getattribute__(self, name):
+                    on.append(name)
+            except AttributeError:
+                pass  # Unset slot: flag is off
+        if self._extra:
+            on.extend(name for name, value in self._extra.items() if value and name in FLAG_FIELDS)
+        return on
     
     def inventory_objects(self, db: 'WorldDatabase') -> List['GameObject']:
         """Helper to get actual objects from inventory dbrefs."""
@@ -88,13 +314,881 @@ class GameObject:
                 items.append(obj)
         return items
 
+    @classmethod
+    def from_dict(cls, dbref: str, data: Dict[str, Any]) -> 'GameObject':
+        """Rebuild from to_dict() output, skipping stale fields (like removed 'research_ok')."""
+        obj = GameObject(dbref, data.get('type', ""), data.get('name', ""))
+        for key, value in data.items():
+            if key in FIELD_DEFAULTS:
+                obj._store(key, value)
+        return obj
+
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary, excluding empty fields."""
-        data = asdict(self)
-        # Remove dbref from dict (it's the key, not a value)
-        del data['dbref']
-        # Remove empty fields for cleaner JSON
-        return {k: v for k, v in data.items() if v or k == 'type'}
+        """Convert to dictionary, excluding empty fields (dbref is the key, not a value)."""
+        data = {}
+        extra = self._extra
+        # Only slots and the overflow can hold non-defaults; walk them in save order
+        for name in (FIELD_DEFAULTS if extra else self._save_order):
+            if name in self._slot_fields:
+                try:
+                    value = object.__getattribute__(self, name)
+                except AttributeError:
+                    continue
+            else:
+                value = extra.get(name)
+            if value or name == 'type':
+                if isinstance(value, list):
+                    value = list(value)
+                elif isinstance(value, dict):
+                    value = dict(value)
+                data[name] = value
+        return data
+
+
+class RoomObject(GameObject):
+    __slots__ = TYPE_SLOTS['room']
+    _slot_fields = frozenset(CORE_SLOTS + TYPE_SLOTS['room'])
+    _container_slots = _containers(CORE_SLOTS + TYPE_SLOTS['room'])
+    _flag_slots = _flags(CORE_SLOTS + TYPE_SLOTS['room'])
+    _save_order = _in_save_order(CORE_SLOTS + TYPE_SLOTS['room'])
+
+
+class ExitObject(GameObject):
+    __slots__ = TYPE_SLOTS['exit']
+    _slot_fields = frozenset(CORE_SLOTS + TYPE_SLOTS['exit'])
+    _container_slots = _containers(CORE_SLOTS + TYPE_SLOTS['exit'])
+    _flag_slots = _flags(CORE_SLOTS + TYPE_SLOTS['exit'])
+    _save_order = _in_save_order(CORE_SLOTS + TYPE_SLOTS['exit'])
+
+
+class AgentObject(GameObject):
+    __slots__ = TYPE_SLOTS['agent']
+    _slot_fields = frozenset(CORE_SLOTS + TYPE_SLOTS['agent'])
+    _container_slots = _containers(CORE_SLOTS + TYPE_SLOTS['agent'])
+    _flag_slots = _flags(CORE_SLOTS + TYPE_SLOTS['agent'])
+    _save_order = _in_save_order(CORE_SLOTS + TYPE_SLOTS['agent'])
+
+
+class ThingObject(GameObject):
+    __slots__ = TYPE_SLOTS['object']
+    _slot_fields = frozenset(CORE_SLOTS + TYPE_SLOTS['object'])
+    _container_slots = _containers(CORE_SLOTS + TYPE_SLOTS['object'])
+    _flag_slots = _flags(CORE_SLOTS + TYPE_SLOTS['object'])
+    _save_order = _in_save_order(CORE_SLOTS + TYPE_SLOTS['object'])
+
+
+_TYPE_CLASSES = {'room': RoomObject, 'exit': ExitObject, 'agent': AgentObject, 'object': ThingObject}
+
+
+def _track(value: Any, owner: GameObject, name: str) -> Any:
+    """Wrap a plain list/dict so in-place edits are reported to its owner."""
+    if type(value) is list:
+        return TrackedList(value, owner, name)
+    if type(value) is dict:
+        return TrackedDict(value, owner, name)
+    return value
+
+
+# ─────────────────────────────────────────────────────────────────
+# DBRef Allocation
+# ─────────────────────────────────────────────────────────────────
+
+class DbrefAllocator:
+    """
+    Hands out dbref numbers: the lowest recycled id first, otherwise the next
+    fresh one. Recycled ids sit in a min-heap with a membership set, so
+    allocate/release are O(log n) instead of sorting a list on every create.
+    """
+
+    def __init__(self, next_id: int = 0, free: Optional[List[int]] = None):
+        self.next_id = next_id
+        self._free = set(free or ())
+        self._heap = sorted(self._free)
+
+    def allocate(self, in_use: Callable[[int], bool]) -> int:
+        """Return an id that `in_use` says is not taken."""
+        while self._heap:
+            dbid = heapq.heappop(self._heap)
+            if dbid not in self._free:
+                continue  # Stale heap entry (claimed by claim())
+            self._free.discard(dbid)
+            if not in_use(dbid):  # Zombie prevention: a recycled id may have been reused
+                return dbid
+        # Time travel prevention: skip ids that already exist
+        while in_use(self.next_id):
+            self.next_id += 1
+        dbid = self.next_id
+        self.next_id += 1
+        return dbid
+
+    def release(self, dbid: int) -> None:
+        if dbid not in self._free:
+            self._free.add(dbid)
+            heapq.heappush(self._heap, dbid)
+
+    def claim(self, dbid: int) -> None:
+        """Mark an id as used without allocating it (journal replay)."""
+        self._free.discard(dbid)
+        self.next_id = max(self.next_id, dbid + 1)
+
+    @property
+    def free(self) -> List[int]:
+        return sorted(self._free)
+
+    def state(self) -> Dict[str, Any]:
+        return {'next': self.next_id, 'free': self.free}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'DbrefAllocator':
+        return cls(state.get('next', 0), state.get('free', []))
+
+
+# ─────────────────────────────────────────────────────────────────
+# Exit Lookup
+# ─────────────────────────────────────────────────────────────────
+
+class ExitTable:
+    """
+    Per-room exit lookup: exact names and aliases in dicts, names in a
+    sorted list for prefix search. Built lazily, dropped on any change.
+    """
+    __slots__ = ('refs', 'lnames', 'names', 'aliases', 'prefixes', 'alias_prefixes')
+
+    def __init__(self, exits: List[GameObject]):
+        self.refs: List[str] = [e.dbref for e in exits]
+        self.lnames: List[str] = [e.name.lower() for e in exits]
+        self.names: Dict[str, str] = {}
+        self.aliases: Dict[str, str] = {}
+        alias_prefixes = []
+        for order, (e, lname) in enumerate(zip(exits, self.lnames)):
+            self.names.setdefault(lname, e.dbref)
+            for alias in e.aliases:
+                alias = str(alias).lower()
+                self.aliases.setdefault(alias, e.dbref)
+                alias_prefixes.append((alias, order))
+        self.prefixes = sorted((lname, order) for order, lname in enumerate(self.lnames))
+        self.alias_prefixes = sorted(alias_prefixes)
+
+    def find(self, target: str) -> Optional[str]:
+        """Resolve by exact name, then alias, then prefix, then substring (room order breaks ties)."""
+        ref = self.names.get(target) or self.aliases.get(target)
+        if ref:
+            return ref
+        order = self._first_prefix(self.prefixes, target)
+        if order is not None:
+            return self.refs[order]
+        return self._first_substring(target)
+
+    def match(self, target: str) -> Optional[str]:
+        """Partial match for object matching: name or alias prefix, then name substring."""
+        orders = [o for o in (self._first_prefix(self.prefixes, target),
+                              self._first_prefix(self.alias_prefixes, target)) if o is not None]
+        if orders:
+            return self.refs[min(orders)]
+        return self._first_substring(target)
+
+    @staticmethod
+    def _first_prefix(entries: List[tuple], target: str) -> Optional[int]:
+        """Lowest room order among sorted (name, order) entries starting with target."""
+        best = None
+        for name, order in entries[bisect_left(entries, (target,)):]:
+            if not name.startswith(target):
+                break
+            if best is None or order < best:
+                best = order
+        return best
+
+    def _first_substring(self, target: str) -> Optional[str]:
+        for ref, lname in zip(self.refs, self.lnames):
+            if target in lname:
+                return ref
+        return None
+
+
+# ─────────────────────────────────────────────────────────────────
+# Trigger Lookup
+# ─────────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=1024)
+def _capture_regex(pattern: str) -> Optional[Pattern]:
+    """A (lowercased) glob with each * and ? as a capture group, for %0-%9."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '*':
+            while i < n and pattern[i] == '*':
+                i += 1
+            out.append('(.*?)')
+        elif c == '?':
+            out.append('(.)')
+        elif c == '[':
+            # Bracket sets are found the way fnmatch finds them
+            j = i
+            if j < n and pattern[j] == '!': j += 1
+            if j < n and pattern[j] == ']': j += 1
+            j = pattern.find(']', j)
+            if j < 0:
+                out.append('\\[')
+                continue
+            chars = pattern[i:j].replace('\\', '\\\\').replace('[', '\\[')
+            i = j + 1
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            elif chars.startswith('^'):
+                chars = '\\' + chars
+            out.append(f'[{chars}]')
+        else:
+            out.append(re.escape(c))
+    try:
+        return re.compile(''.join(out) + r'\Z', re.S | re.I)
+    except re.error:
+        return None
+
+
+class Trigger(NamedTuple):
+    obj: str  # dbref of the listening object that owns the attribute
+    pattern: str  # Glob as written, before lowercasing
+    action: str
+    regex: Pattern  # The lowercased glob, compiled
+
+    def captures(self, text: str) -> List[str]:
+        """What each * and ? in the pattern matched in `text`, in order (TinyMUSH's %0-%9)."""
+        capture_re = _capture_regex(self.pattern.lower())
+        m = capture_re.match(text) if capture_re else None
+        return list(m.groups()) if m else []
+
+
+class TriggerTable:
+    """
+    Per-location $-command and ^-listen patterns of every listening object
+    there (the location itself first, then its contents, attributes in
+    order). Each kind is also joined into one alternation, so a single
+    match says whether anything fires and which trigger comes first.
+    Built lazily, dropped on any change.
+    """
+    __slots__ = ('commands', 'listens', '_command_re', '_listen_re')
+
+    def __init__(self, objects: List[Optional[GameObject]]):
+        self.commands: List[Trigger] = []
+        self.listens: List[Trigger] = []
+        for obj in objects:
+            if not obj or not getattr(obj, 'listening', False):
+                continue
+            for attr_val in obj.attrs.values():
+                if not isinstance(attr_val, str) or ':' not in attr_val:
+                    continue
+                if attr_val.startswith('$'):
+                    kind = self.commands
+                elif attr_val.startswith('^'):
+                    kind = self.listens
+                else:
+                    continue
+                pattern, action = attr_val[1:].split(':', 1)
+                # Same glob rules as fnmatch, case-insensitive by lowercasing both sides
+                kind.append(Trigger(obj.dbref, pattern, action, re.compile(fnmatch.translate(pattern.lower()))))
+        self._command_re = self._combine(self.commands)
+        self._listen_re = self._combine(self.listens)
+
+    @staticmethod
+    def _combine(triggers: List[Trigger]) -> Optional[Pattern]:
+        if not triggers:
+            return None
+        # Alternatives are tried in order, so the first to match is the first trigger
+        return re.compile("|".join(f"(?P<t{i}>{t.regex.pattern})" for i, t in enumerate(triggers)))
+
+    def first_command(self, text: str) -> Optional[Trigger]:
+        """The first $-trigger matching `text` (already lowercased)."""
+        m = self._command_re.match(text) if self._command_re else None
+        return self.commands[int(m.lastgroup[1:])] if m else None
+
+    def listeners(self, text: str) -> List[Trigger]:
+        """Every ^-trigger matching `text` (already lowercased), in order."""
+        m = self._listen_re.match(text) if self._listen_re else None
+        if not m:
+            return []
+        first = int(m.lastgroup[1:])
+        return [self.listens[first]] + [t for t in self.listens[first + 1:] if t.regex.match(text)]
+
+
+# ─────────────────────────────────────────────────────────────────
+# Partial Name Lookup
+# ─────────────────────────────────────────────────────────────────
+
+GRAM_INDEX_MIN = 32  # Locations smaller than this are simply scanned
+
+
+class NgramIndex:
+    """
+    Bigram/trigram index over the names of everything in one location,
+    so substring matches in crowded rooms only verify a few candidates.
+    Arrival order is tracked to pick the same winner a scan would.
+    """
+    __slots__ = ('names', 'order', 'grams', 'next_order')
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}  # dbref -> lowercased name
+        self.order: Dict[str, int] = {}  # dbref -> arrival order
+        self.grams: Dict[str, set] = {}  # 2/3-gram -> dbrefs
+        self.next_order = 0
+
+    @staticmethod
+    def _grams(lname: str) -> set:
+        return {lname[i:i + n] for n in (2, 3) for i in range(len(lname) - n + 1)}
+
+    def add(self, dbref: str, lname: str) -> None:
+        if dbref in self.names:
+            self.remove(dbref)
+        self.names[dbref] = lname
+        self.order[dbref] = self.next_order
+        self.next_order += 1
+        for gram in self._grams(lname):
+            self.grams.setdefault(gram, set()).add(dbref)
+
+    def rename(self, dbref: str, lname: str) -> None:
+        """Change a name in place, keeping its arrival order."""
+        order = self.order.get(dbref)
+        self.add(dbref, lname)
+        if order is not None:
+            self.order[dbref] = order
+
+    def remove(self, dbref: str) -> None:
+        lname = self.names.pop(dbref, None)
+        self.order.pop(dbref, None)
+        if lname is None:
+            return
+        for gram in self._grams(lname):
+            refs = self.grams.get(gram)
+            if refs:
+                refs.discard(dbref)
+                if not refs:
+                    del self.grams[gram]
+
+    def search(self, text: str) -> Optional[str]:
+        """Earliest-arrived dbref whose name contains text."""
+        if len(text) < 2:
+            matches = [ref for ref, lname in self.names.items() if text in lname]
+        else:
+            n = min(len(text), 3)
+            postings = [self.grams.get(text[i:i + n]) for i in range(len(text) - n + 1)]
+            if not all(postings):
+                return None
+            candidates = set.intersection(*sorted(postings, key=len))
+            matches = [ref for ref in candidates if text in self.names[ref]]
+        return min(matches, key=self.order.__getitem__) if matches else None
+
+
+# ─────────────────────────────────────────────────────────────────
+# Room Events
+# ─────────────────────────────────────────────────────────────────
+
+ROOM_EVENT_CAPACITY = 50  # Announcements kept per room
+AGENT_TRAIL_LENGTH = 16  # Recent rooms remembered per agent
+
+
+class RoomEventLog:
+    """
+    Recent announcements in one bounded ring buffer per room, stamped with a
+    global sequence number. Posting is O(1) however crowded the room is;
+    readers keep their own cursor and pull what they have not seen yet.
+    Each agent's trail of (room, arrived, left) seqs decides which events
+    reached it, so moving rooms neither loses nor back-fills messages.
+    Nothing here is persisted.
+    """
+
+    def __init__(self, capacity: int = ROOM_EVENT_CAPACITY, trail_length: int = AGENT_TRAIL_LENGTH):
+        self.seq = 0
+        self.capacity = capacity
+        self.trail_length = trail_length
+        self._rooms: Dict[str, deque] = {}  # room -> deque of (seq, message, exclude)
+        self._trails: Dict[str, deque] = {}  # agent -> deque of [room, arrived, left or None]
+
+    def post(self, room: str, message: str, exclude: Optional[str] = None) -> int:
+        self.seq += 1
+        ring = self._rooms.get(room)
+        if ring is None:
+            ring = self._rooms[room] = deque(maxlen=self.capacity)
+        ring.append((self.seq, message, exclude))
+        return self.seq
+
+    def moved(self, agent: str, old: str, new: str) -> None:
+        trail = self._trails.get(agent)
+        if trail is None:
+            trail = self._trails[agent] = deque(maxlen=self.trail_length)
+            trail.append([old, 0, None])
+        trail[-1][2] = self.seq
+        trail.append([new, self.seq, None])
+
+    def read(self, agent: str, location: str, since: int) -> List[str]:
+        """Messages that reached `agent` after seq `since`, oldest first."""
+        events = []
+        for room, arrived, left in self._trails.get(agent) or ((location, 0, None),):
+            if left is not None and left <= since:
+                continue
+            ring = self._rooms.get(room)
+            if not ring:
+                continue
+            floor = max(arrived, since)
+            for seq, message, exclude in reversed(ring):
+                if seq <= floor:
+                    break
+                if (left is None or seq <= left) and exclude != agent:
+                    events.append((seq, message))
+        events.sort(key=lambda event: event[0])
+        return [message for _, message in events]
+
+    def recent(self, room: str, since: int = 0) -> List[str]:
+        return [message for seq, message, _ in self._rooms.get(room, ()) if seq > since]
+
+    def forget(self, dbref: str) -> None:
+        """Drop a destroyed room's buffer or agent's trail."""
+        self._rooms.pop(dbref, None)
+        self._trails.pop(dbref, None)
+
+    def clear(self) -> int:
+        """Empty every room buffer (cursors stay valid). Returns the number of rooms cleared."""
+        count = len(self._rooms)
+        self._rooms.clear()
+        self._trails.clear()
+        return count
+
+
+# ─────────────────────────────────────────────────────────────────
+# Streaming World Reader
+# ─────────────────────────────────────────────────────────────────
+# The world file is one JSON document whose "objects" member dwarfs the
+# rest. JsonStream walks it a value at a time (each object is decoded by
+# the C scanner via raw_decode), so load() never holds the whole parse tree.
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class JsonStream:
+    """Incremental reader over the members of a JSON object in a text file."""
+
+    def __init__(self, f, chunk_size: int = 1 << 20):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Read another chunk, dropping what has been consumed. False at EOF."""
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Malformed world file: expected {char!r}, found {found[:1]!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self._buf) and not self._eof and self._fill():
+                continue  # A number at the end of the chunk may be cut short
+            self._pos = end
+            return value
+
+    def keys(self):
+        """Yield each member name of the next object; the caller must read its value."""
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            if self._peek() == '}':
+                self._pos += 1
+                return
+            self._expect(',')
+
+    def items(self):
+        """Yield (name, value) for each member of the next object."""
+        for key in self.keys():
+            yield key, self.value()
+
+
+def _fold_tail(data: Optional[Dict[str, Any]], ops: list) -> Optional[Dict[str, Any]]:
+    """
+    Apply delta/journal ops to a saved object: a dict replaces it, None deletes
+    it, (field, value) sets, and (edit, field, key_or_item) edits a container.
+    """
+    for op in ops:
+        if op is None or type(op) is dict:
+            data = op
+        elif data is None:
+            continue
+        elif len(op) == 2:
+            data[op[0]] = op[1]
+        else:
+            edit, name, arg = op[0], op[1], op[2]
+            if edit == 'put':
+                if not isinstance(data.get(name), dict):
+                    data[name] = {}
+                data[name][arg] = op[3]
+            elif edit == 'pop':
+                if isinstance(data.get(name), dict):
+                    data[name].pop(arg, None)
+            elif edit == 'add':
+                if not isinstance(data.get(name), list):
+                    data[name] = []
+                data[name].append(arg)
+            elif edit == 'rem':
+                if isinstance(data.get(name), list) and arg in data[name]:
+                    data[name].remove(arg)
+    return data
+
+
+def _build_objects(batch: List[tuple], tail: Dict[str, list]) -> List[GameObject]:
+    """Construct GameObjects for (dbref, data) pairs, folding in their tail ops."""
+    objs = []
+    for dbref, data in batch:
+        ops = tail.pop(dbref, None)
+        if ops:
+            data = _fold_tail(data, ops)
+        if data is not None:
+            objs.append(GameObject.from_dict(dbref, data))
+    return objs
+
+
+class JsonWorldReader:
+    """Reads world.json as a header dict followed by batches of (dbref, data)."""
+
+    def __init__(self, f, batch_size: int):
+        self._stream = JsonStream(f)
+        self._batch_size = batch_size
+        self._has_objects = False
+
+    def read_header(self) -> Dict[str, Any]:
+        """Every member before "objects" (all of them, for the files save() writes)."""
+        header = {}
+        for key in self._stream.keys():
+            if key == 'objects':
+                self._has_objects = True
+                break
+            header[key] = self._stream.value()
+        return header
+
+    def batches(self):
+        """Yield lists of (dbref, data); the first is cut right after the first room."""
+        if not self._has_objects:
+            return
+        batch, first = [], True
+        for dbref, data in self._stream.items():
+            batch.append((dbref, data))
+            if len(batch) >= self._batch_size or (first and data.get('type') == 'room'):
+                yield batch
+                batch, first = [], False
+        yield batch
+
+    build = staticmethod(_build_objects)
+
+
+# ─────────────────────────────────────────────────────────────────
+# Binary Snapshots
+# ─────────────────────────────────────────────────────────────────
+# A compact checkpoint format for large worlds ("world.mashb"):
+#
+#   magic b"MASHWLD\0", u16 schema version, u8 marshal version
+#   then records of   u32 payload length, u8 kind, payload (marshal)
+#     H  header   {meta, journal_seq, snapshot_id, fields, columns}
+#     S  strings  new entries for the intern table (types and names)
+#     O  objects  [(dbref, type_id, name_id, values, extra), ...]
+#     E  end      object count; a file without it is truncated
+#
+# `values` holds the object's slot fields in the order `columns[type]`
+# lists them (None = default), so matching schemas restore straight
+# into slots. `extra` carries the sparse overflow fields.
+
+BINARY_MAGIC = b"MASHWLD\0"
+BINARY_VERSION = 1
+BINARY_SUFFIX = ".mashb"
+_BINARY_PREAMBLE = struct.Struct('<8sHB')
+_RECORD = struct.Struct('<IB')
+_OBJECTS_PER_RECORD = 1024
+
+
+def _row_columns(type_slots: tuple) -> tuple:
+    """Slot fields a row stores, in slot order (dbref/type/name are stored separately)."""
+    return tuple(name for name in CORE_SLOTS + type_slots if name not in ('dbref', 'type', 'name'))
+
+
+_ROW_COLUMNS = {obj_type: _row_columns(slots) for obj_type, slots in TYPE_SLOTS.items()}
+_ROW_COLUMNS['*'] = _row_columns(())  # Any other type
+
+
+def is_binary_world(path) -> bool:
+    """True if the file at `path` starts with the binary snapshot magic."""
+    with open(path, 'rb') as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def write_binary_world(f, header: Dict[str, Any], items) -> int:
+    """Write a binary snapshot of (dbref, to_dict() data) items to binary file `f`."""
+    def record(kind: bytes, value: Any) -> None:
+        payload = marshal.dumps(value)
+        f.write(_RECORD.pack(len(payload), kind[0]))
+        f.write(payload)
+
+    f.write(_BINARY_PREAMBLE.pack(BINARY_MAGIC, BINARY_VERSION, marshal.version))
+    record(b'H', {**header, 'fields': list(FIELD_DEFAULTS), 'columns': _ROW_COLUMNS})
+
+    interned: Dict[str, int] = {}
+    new_strings: List[str] = []
+    rows: List[tuple] = []
+    count, first_room = 0, True
+
+    def intern(text: str) -> int:
+        index = interned.get(text)
+        if index is None:
+            index = interned[text] = len(interned)
+            new_strings.append(text)
+        return index
+
+    def flush() -> None:
+        if new_strings:
+            record(b'S', new_strings)
+            new_strings.clear()
+        record(b'O', rows)
+        rows.clear()
+
+    for dbref, data in items:
+        obj_type = data.get('type', "")
+        columns = _ROW_COLUMNS.get(obj_type) or _ROW_COLUMNS['*']
+        values = tuple(data.get(name) for name in columns)
+        extra = {k: v for k, v in data.items() if k not in columns and k != 'type' and k != 'name'}
+        rows.append((dbref, intern(obj_type), intern(data.get('name', "")), values, extra or None))
+        count += 1
+        # Like world.json, end the first record at the first room so it goes live early
+        if len(rows) >= _OBJECTS_PER_RECORD or (first_room and obj_type == 'room'):
+            flush()
+            first_room = False
+    flush()
+    record(b'E', count)
+    return count
+
+
+class BinaryWorldReader:
+    """Reads a binary snapshot as a header dict followed by batches of rows."""
+
+    def __init__(self, f, batch_size: int):
+        self._file = f
+        self._batch_size = batch_size
+        self._strings: List[str] = []
+        magic, version, marshal_version = _BINARY_PREAMBLE.unpack(f.read(_BINARY_PREAMBLE.size))
+        if magic != BINARY_MAGIC:
+            raise ValueError("Not a MASH binary world file")
+        if version > BINARY_VERSION or marshal_version > marshal.version:
+            raise ValueError(f"Binary world schema v{version} (marshal v{marshal_version}) is newer "
+                             f"than this MASH supports; convert it to JSON with a newer version")
+
+    def _records(self):
+        while True:
+            head = self._file.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                raise ValueError("Truncated binary world file")
+            length, kind = _RECORD.unpack(head)
+            payload = self._file.read(length)
+            if len(payload) < length:
+                raise ValueError("Truncated binary world file")
+            yield chr(kind), marshal.loads(payload)
+
+    def read_header(self) -> Dict[str, Any]:
+        self._iter = self._records()
+        kind, header = next(self._iter)
+        if kind != 'H':
+            raise ValueError("Binary world file has no header")
+        # Rows restore straight into slots only when their layout still matches
+        fields_ok = set(header.pop('fields')) <= FIELD_DEFAULTS.keys()
+        self._columns = header.pop('columns')
+        self._fast = {obj_type: fields_ok and tuple(columns) == _ROW_COLUMNS.get(obj_type)
+                      for obj_type, columns in self._columns.items()}
+        return header
+
+    def batches(self):
+        batch, first = [], True
+        for kind, value in self._iter:
+            if kind == 'S':
+                self._strings.extend(value)
+            elif kind == 'O':
+                batch.extend(value)
+                if first or len(batch) >= self._batch_size:
+                    yield batch
+                    batch, first = [], False
+            elif kind == 'E':
+                yield batch
+                return
+
+    def _row_dict(self, layout: str, obj_type: str, name: str, values: tuple,
+                  extra: Optional[dict]) -> Dict[str, Any]:
+        data = {'type': obj_type, 'name': name}
+        columns = self._columns[layout]
+        data.update((k, v) for k, v in zip(columns, values) if v is not None)
+        if extra:
+            data.update(extra)
+        return data
+
+    def build(self, rows: List[tuple], tail: Dict[str, list]) -> List[GameObject]:
+        """Construct GameObjects from rows, folding in their tail ops."""
+        objs = []
+        strings, fast = self._strings, self._fast
+        new, setslot = object.__new__, object.__setattr__
+        for dbref, type_id, name_id, values, extra in rows:
+            obj_type, name = strings[type_id], strings[name_id]
+            ops = tail.pop(dbref, None) if tail else None
+            layout = obj_type if obj_type in _TYPE_CLASSES else '*'
+            if ops or not fast.get(layout):
+                data = self._row_dict(layout, obj_type, name, values, extra)
+                if ops:
+                    data = _fold_tail(data, ops)
+                if data is not None:
+                    objs.append(GameObject.from_dict(dbref, data))
+                continue
+            obj = new(_TYPE_CLASSES.get(obj_type, GameObject))
+            setslot(obj, '_db', None)
+            setslot(obj, '_extra', extra)
+            setslot(obj, 'dbref', dbref)
+            setslot(obj, 'type', obj_type)
+            setslot(obj, 'name', name)
+            for column, value in zip(_ROW_COLUMNS[layout], values):
+                if value is not None:
+                    setslot(obj, column, value)
+            objs.append(obj)
+        return objs
+
+
+def _write_json_world(f, header: Dict[str, Any], items) -> None:
+    """Write (dbref, to_dict() data) items as world.json, laid out as json.dump(indent=2) would."""
+    f.write('{')
+    for key, value in header.items():
+        f.write(f'\n  {json.dumps(key)}: ' + json.dumps(value, indent=2).replace('\n', '\n  ') + ',')
+    f.write('\n  "objects": {')
+    sep = '\n    '
+    for dbref, data in items:
+        f.write(f'{sep}{json.dumps(dbref)}: ' + json.dumps(data, indent=2).replace('\n', '\n    '))
+        sep = ',\n    '
+    f.write('\n  }\n}' if sep != '\n    ' else '}\n}')
+
+
+def _write_snapshot(path: str, header: Dict[str, Any], items, binary: Optional[bool]) -> None:
+    """Atomically write a snapshot of (dbref, to_dict() data) items, binary for ".mashb" paths unless told."""
+    if binary is None:
+        binary = path.endswith(BINARY_SUFFIX)
+        
+    # Atomic Write Strategy (Temp file + fsync + Rename)
+    # This prevents corruption if the process crashes mid-save.
+    temp_path = path + ".tmp"
+    try:
+        if binary:
+            with open(temp_path, 'wb') as f:
+                write_binary_world(f, header, items)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                _write_json_world(f, header, items)
+                f.flush()
+                os.fsync(f.fileno())
+        # Atomic swap!
+        os.replace(temp_path, path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            try: os.remove(temp_path)
+            except: pass
+        raise e
+
+
+class _LockDepth(threading.local):
+    depth = 0
+
+
+class WorldLock:
+    """
+    The database's re-entrant lock, counting how deep each thread holds it
+    so that callers can ask whether they are inside it (see held).
+    """
+    __slots__ = ('_lock', '_local')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._local = _LockDepth()
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._local.depth += 1
+
+    def __exit__(self, *exc):
+        self._local.depth -= 1
+        self._lock.release()
+
+    def held(self) -> bool:
+        """True if the calling thread holds the lock."""
+        return self._local.depth > 0
+
+
+class SnapshotCapture:
+    """
+    The world as it was at one moment, copied on write: objects are read
+    live as the snapshot is written, and an object about to change (or be
+    destroyed) before it is written keeps its old to_dict() here first. So
+    taking a snapshot costs a list of dbrefs, and memory only grows with the
+    objects edited while it is being written. Guarded by the database lock.
+    """
+    __slots__ = ('db', 'header', 'refs', 'waiting', 'kept')
+
+    def __init__(self, db: 'WorldDatabase', header: Dict[str, Any]):
+        self.db = db
+        self.header = header
+        self.refs = list(db.objects)
+        self.waiting = set(self.refs)  # Not written yet
+        self.kept: Dict[str, Dict[str, Any]] = {}  # dbref -> to_dict() from before it changed
+
+    def keep(self, obj: 'GameObject') -> None:
+        if obj.dbref in self.waiting:
+            self.waiting.discard(obj.dbref)
+            self.kept[obj.dbref] = obj.to_dict()
+
+    def items(self, chunk: int = 2000):
+        """Yield (dbref, data) in objects order, taking the lock a chunk at a time."""
+        for start in range(0, len(self.refs), chunk):
+            batch = []
+            with self.db._lock:
+                for dbref in self.refs[start:start + chunk]:
+                    data = self.kept.pop(dbref, None)
+                    if data is None and dbref in self.waiting:
+                        self.waiting.discard(dbref)
+                        obj = self.db.objects.get(dbref)
+                        data = obj.to_dict() if obj is not None else None
+                    if data is not None:
+                        batch.append((dbref, data))
+            yield from batch
 
 
 class WorldDatabase:
@@ -106,19 +1200,58 @@ class WorldDatabase:
     """
     
     def __init__(self):
-        self._lock = threading.RLock() # Thread-safety for multi-player/concurrent access
+        self._lock = WorldLock() # Thread-safety for multi-player/concurrent access
         self.instance_id = str(uuid.uuid4())
         self.objects: Dict[str, GameObject] = {}
         self.meta: Dict[str, Any] = {"version": "1.0", "name": "Unnamed World"}
-        self.next_dbref: int = 0
+        self.allocator = DbrefAllocator()  # Persisted as meta["allocator"]
         self.on_announce: Optional[Callable[[str, str], None]] = None  # Callback for sync hooks
+        self._listeners: Dict[str, Dict[int, Callable[[], None]]] = {}  # agent -> {token: wake callback}
+        self._listener_agents: Dict[int, str] = {}  # token -> agent
+        self._listener_tokens = itertools.count(1)
         
         # Indices for O(1) performance
-        self._name_index: Dict[str, str] = {}  # name.lower() -> dbref
-        self._type_index: Dict[str, List[str]] = {}  # type -> [dbrefs]
-        self._location_index: Dict[str, List[str]] = {}  # location_dbref -> [content_dbrefs]
-        self._room_announcements: Dict[str, List[str]] = {} # room -> [messages]
-        self.free_dbrefs: List[int] = [] # Pool of recycled DBRef IDs
+        self._name_index: Dict[str, Dict[str, None]] = {}  # name.lower() -> ordered set of dbrefs
+        self._type_index: Dict[str, Dict[str, None]] = {}  # type -> ordered set of dbrefs
+        self._location_index: Dict[str, Dict[str, None]] = {}  # location -> ordered set of contents
+        self._owner_index: Dict[str, Dict[str, None]] = {}  # owner -> ordered set of owned dbrefs
+        self._flag_index: Dict[str, Dict[str, None]] = {}  # flag -> ordered set of dbrefs with it set
+        self.events = RoomEventLog()  # Transient announcements, read with per-session cursors
+        self._exits_by_source: Dict[str, Dict[str, None]] = {}  # room -> ordered set of exit dbrefs
+        self._exit_tables: Dict[str, ExitTable] = {}  # room -> lazily built exit lookup
+        self._exit_rooms: Dict[str, set] = {}  # exit -> rooms whose ExitTable includes it
+        self._gram_indices: Dict[str, NgramIndex] = {}  # crowded location -> partial-name index
+        self._trigger_tables: Dict[str, TriggerTable] = {}  # location -> lazily built $/^ patterns
+        
+        # Write-ahead journal (see enable_journal)
+        self.journal_seq: int = 0  # Sequence number of the last journaled mutation
+        self._checkpoint_seq: int = 0  # journal_seq covered by the last full snapshot
+        self._journal_base: Optional[str] = None  # World file the journal belongs to
+        self._journal_file = None
+        self._checkpoint_thread: Optional[threading.Thread] = None
+        self._checkpoint_stop = threading.Event()
+        
+        # Dirty tracking for incremental saves (see save_delta)
+        self._dirty: set = set()  # dbrefs changed since the last save/save_delta
+        self._deleted: set = set()  # dbrefs destroyed since the last save/save_delta
+        self._snapshot_id: str = ""  # Identifies the snapshot a delta sidecar applies to
+        self._delta_count: int = 0  # Delta records appended since the last full snapshot
+        
+        # Background saves (see save)
+        self._save_cond = threading.Condition()  # Guards the fields below; never taken before _lock
+        self._save_requests: Dict[str, tuple] = {}  # path -> (binary, tickets of waiting callers)
+        self._save_ticket: int = 0  # Requests made so far
+        self._save_done: int = 0  # Requests covered by finished saves
+        self._save_errors: Dict[int, Exception] = {}  # ticket -> why its path failed to save
+        self._saver_thread: Optional[threading.Thread] = None
+        self._captures: List[SnapshotCapture] = []  # Snapshots being written (see SnapshotCapture)
+        
+        # Streaming load (see load)
+        self._loaded = threading.Event()  # Clear while a load is in progress
+        self._loaded.set()
+        self._load_error: Optional[BaseException] = None
+        self._pending: Dict[str, GameObject] = {}  # Loaded but not yet visible in self.objects
+        self.load_stats: Dict[str, float] = {}  # objects, seconds, objects_per_sec of the last load
         with self._lock:
             self.rebuild_indices()
     
@@ -127,73 +1260,706 @@ class WorldDatabase:
         self._name_index.clear()
         self._type_index.clear()
         self._location_index.clear()
+        self._owner_index.clear()
+        self._flag_index.clear()
+        self._exits_by_source.clear()
+        self._exit_tables.clear()
+        self._exit_rooms.clear()
+        self._gram_indices.clear()
+        self._trigger_tables.clear()
         
         for dbref, obj in self.objects.items():
-            # Name index (note: non-unique names will overwrite, that's okay for lookup priority)
-            self._name_index[obj.name.lower()] = dbref
-            
-            # Type index
-            if obj.type not in self._type_index:
-                self._type_index[obj.type] = []
-            self._type_index[obj.type].append(dbref)
+            self._index_object(dbref, obj)
+    
+    def _index_object(self, dbref: str, obj: GameObject) -> None:
+        """Add one object to the indices (caller holds the lock)."""
+        # Name index (multi-valued: duplicate names are common)
+        self._name_index.setdefault(obj.name.lower(), {})[dbref] = None
+        
+        # Type index
+        self._type_index.setdefault(obj.type, {})[dbref] = None
+        
+        # Location index (for room contents)
+        if obj.location:
+            self._location_index.setdefault(obj.location, {})[dbref] = None
+        
+        # Owner and flag indices (for query)
+        if obj.owner:
+            self._owner_index.setdefault(obj.owner, {})[dbref] = None
+        for flag in obj._flags_on():
+            self._flag_index.setdefault(flag, {})[dbref] = None
+        
+        # Exit source index
+        if obj.type == 'exit' and obj.source:
+            self._exits_by_source.setdefault(obj.source, {})[dbref] = None
+    
+    def _reindex(self, obj: GameObject, field_name: str, old: Any) -> None:
+        """Keep the in-memory indices in step with a field change (caller holds the lock)."""
+        dbref = obj.dbref
+        if field_name == 'name':
+            self._unindex_name(dbref, old or "")
+            self._name_index.setdefault(obj.name.lower(), {})[dbref] = None
+            grams = self._gram_indices.get(obj.location)
+            if grams is not None:
+                grams.rename(dbref, obj.name.lower())
+        elif field_name == 'location' and old != obj.location:
+            self._unindex_location(dbref, old)
+            if obj.location:
+                self._location_index.setdefault(obj.location, {})[dbref] = None
+            if old in self._gram_indices:
+                self._gram_indices[old].remove(dbref)
+            if obj.location in self._gram_indices:
+                self._gram_indices[obj.location].add(dbref, obj.name.lower())
+        elif field_name == 'owner' and old != obj.owner:
+            self._unindex_owner(dbref, old)
+            if obj.owner:
+                self._owner_index.setdefault(obj.owner, {})[dbref] = None
+        elif field_name == 'type' and old != obj.type:
+            self._unindex_type(dbref, old)
+            self._type_index.setdefault(obj.type, {})[dbref] = None
+        elif field_name in FLAG_FIELDS:
+            if getattr(obj, field_name):
+                self._flag_index.setdefault(field_name, {})[dbref] = None
+            elif field_name in self._flag_index:
+                self._flag_index[field_name].pop(dbref, None)
             
-            # Location index (for room contents)
-            loc = getattr(obj, 'location', None)
-            if loc:
-                if loc not in self._location_index:
-                    self._location_index[loc] = []
-                self._location_index[loc].append(dbref)
+        if obj.type == 'exit':
+            if field_name == 'source':
+                if old and dbref in self._exits_by_source.get(old, ()):
+                    del self._exits_by_source[old][dbref]
+                    self._exit_tables.pop(old, None)
+                if obj.source:
+                    self._exits_by_source.setdefault(obj.source, {})[dbref] = None
+            if field_name in ('name', 'aliases', 'source'):
+                self._invalidate_exit(obj)
+        elif field_name == 'exits':
+            self._exit_tables.pop(dbref, None)
+    
+    def _unindex_type(self, dbref: str, obj_type: str) -> None:
+        refs = self._type_index.get(obj_type)
+        if refs is not None:
+            refs.pop(dbref, None)
+    
+    def _unindex_location(self, dbref: str, loc: Optional[str]) -> None:
+        contents = self._location_index.get(loc)
+        if contents is not None:
+            contents.pop(dbref, None)
+            if not contents:
+                del self._location_index[loc]
+    
+    def _unindex_owner(self, dbref: str, owner: Optional[str]) -> None:
+        refs = self._owner_index.get(owner)
+        if refs is not None:
+            refs.pop(dbref, None)
+            if not refs:
+                del self._owner_index[owner]
+    
+    def _unindex_flags(self, dbref: str) -> None:
+        for refs in self._flag_index.values():
+            refs.pop(dbref, None)
+    
+    def _unindex_name(self, dbref: str, name: str) -> None:
+        refs = self._name_index.get(name.lower())
+        if refs is not None:
+            refs.pop(dbref, None)
+            if not refs:
+                del self._name_index[name.lower()]
+    
+    def _invalidate_exit(self, exit_obj: GameObject) -> None:
+        """Drop every cached ExitTable that includes (or should include) this exit."""
+        for room_ref in self._exit_rooms.pop(exit_obj.dbref, ()):
+            self._exit_tables.pop(room_ref, None)
+        if exit_obj.source:
+            self._exit_tables.pop(exit_obj.source, None)
+    
+    def _exit_table(self, room: GameObject) -> ExitTable:
+        """The room's exits (own list first, then exits naming it as source) as an ExitTable."""
+        table = self._exit_tables.get(room.dbref)
+        if table is None:
+            refs = {}
+            for ref in room.exits:
+                refs[ref if ref.startswith('#') else f"#{ref}"] = None
+            refs.update(self._exits_by_source.get(room.dbref, {}))
+            exits = []
+            for ref in refs:
+                e = self.objects.get(ref)
+                if e and e.type == 'exit':
+                    exits.append(e)
+                    self._exit_rooms.setdefault(ref, set()).add(room.dbref)
+            table = self._exit_tables[room.dbref] = ExitTable(exits)
+        return table
+    
+    def _invalidate_triggers(self, obj: GameObject, old_location: Optional[str] = None) -> None:
+        """Drop the TriggerTables that may list this object (caller holds the lock)."""
+        self._trigger_tables.pop(obj.dbref, None)
+        self._trigger_tables.pop(obj.location, None)
+        if old_location:
+            self._trigger_tables.pop(old_location, None)
+    
+    def trigger_table(self, location: str) -> TriggerTable:
+        """The $-command and ^-listen triggers of the location and everything in it."""
+        with self._lock:
+            table = self._trigger_tables.get(location)
+            if table is None:
+                table = TriggerTable([self.objects.get(location)] + self.get_room_contents(location))
+                self._trigger_tables[location] = table
+            return table
+    
+    # ─────────────────────────────────────────────────────────────
+    # DBRef Allocator State
+    # ─────────────────────────────────────────────────────────────
+    
+    @property
+    def next_dbref(self) -> int:
+        return self.allocator.next_id
+    
+    @next_dbref.setter
+    def next_dbref(self, value: int) -> None:
+        self.allocator.next_id = value
+    
+    @property
+    def free_dbrefs(self) -> List[int]:
+        """Recycled ids, lowest first (a copy; use the allocator to change it)."""
+        return self.allocator.free
+    
+    @free_dbrefs.setter
+    def free_dbrefs(self, value: List[int]) -> None:
+        self.allocator = DbrefAllocator(self.allocator.next_id, value)
+    
+    def _meta_for_save(self) -> Dict[str, Any]:
+        return {**self.meta, 'allocator': self.allocator.state()}
+    
+    def _restore_meta(self, meta: Dict[str, Any], legacy_next: int = 1, legacy_free: Optional[List[int]] = None) -> None:
+        """Adopt saved meta; worlds from before meta["allocator"] keep top-level keys."""
+        self.meta = dict(meta)
+        state = self.meta.pop('allocator', None)
+        if state is None:
+            state = {'next': legacy_next, 'free': legacy_free or []}
+        self.allocator = DbrefAllocator.from_state(state)
     
     # ─────────────────────────────────────────────────────────────
     # File I/O
     # ─────────────────────────────────────────────────────────────
         
-    def load(self, path: str):
-        """Load the world from a JSON file."""
+    def load(self, path: str, background: bool = False, workers: int = 0,
+             batch_size: int = 5000, binary: Optional[bool] = None, verbose: bool = False) -> None:
+        """
+        Stream the world in from a JSON or binary snapshot (detected from the
+        file unless `binary` says which to expect), indexing each object as it
+        is parsed and folding in any delta/journal tail on the way.
+        
+        The first room goes live as soon as it is read; everything else becomes
+        visible together when the stream ends. With background=True this returns
+        at that first point and the rest loads on a daemon thread (wait_loaded()
+        blocks until it is done). `workers` > 1 constructs objects in parallel
+        chunks of each batch. verbose=True prints the load rate and how many
+        journal entries were replayed (load_stats keeps the rate either way).
+        """
         if not os.path.exists(path):
             return
-            
+        if binary is None:
+            binary = is_binary_world(path)
+        elif binary != is_binary_world(path):
+            raise ValueError(f"{path} is not a {'binary' if binary else 'JSON'} world file")
+        self.wait_loaded()
+        self.wait_saved()
+        
         with self._lock:
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.meta = data.get("meta", self.meta)
-                self.next_dbref = data.get("next_dbref", 1)
-                self.free_dbrefs = data.get('free_dbrefs', []) # Retained from original
-                
-                # Get valid fields for GameObject
-                valid_fields = set(GameObject.__dataclass_fields__.keys())
+            if self._journal_file is not None:
+                self._journal_file.flush()
+            for obj in self.objects.values():
+                obj._attach(None)  # Stale references must not journal into the new world
+            self.objects = {}
+            self._pending = {}
+            self._dirty.clear()
+            self._deleted.clear()
+            self.rebuild_indices()
+            self._load_error = None
+            self._loaded.clear()
+            
+        first_room = threading.Event()
+        args = (path, binary, workers, batch_size, first_room, verbose)
+        if not background:
+            self._stream_load(*args)
+            return
+        
+        threading.Thread(target=self._background_load, args=args,
+                         name="mash-loader", daemon=True).start()
+        first_room.wait()
+        if self._load_error is not None and not self.objects:
+            self.wait_loaded()  # Failed before anything went live: surface it here
+    
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        """Block until a background load has finished. Raises if that load failed."""
+        done = self._loaded.wait(timeout)
+        if self._load_error is not None:
+            raise RuntimeError(f"World load failed: {self._load_error}") from self._load_error
+        return done
+    
+    @property
+    def loading(self) -> bool:
+        return not self._loaded.is_set()
+    
+    def load_binary(self, path: str, **kwargs) -> None:
+        """load() that insists on a binary snapshot."""
+        self.load(path, binary=True, **kwargs)
+    
+    def _stream_load(self, path: str, binary: bool, workers: int, batch_size: int,
+                     first_room: threading.Event, verbose: bool) -> None:
+        started = time.perf_counter()
+        live: List[str] = []  # Objects published early, straight into self.objects
+        pool = ThreadPoolExecutor(workers, thread_name_prefix="mash-load") if workers > 1 else None
+        
+        def publish(batch: List[tuple], build: Callable) -> None:
+            if pool is not None and len(batch) >= 2 * workers:
+                step = -(-len(batch) // workers)
+                chunks = pool.map(build, [batch[i:i + step] for i in range(0, len(batch), step)],
+                                  [tail] * workers)
+                objs = [obj for chunk in chunks for obj in chunk]
+            else:
+                objs = build(batch, tail)
+            with self._lock:
+                target = self._pending if first_room.is_set() else self.objects
+                for obj in objs:
+                    obj._attach(self)
+                    target[obj.dbref] = obj
+                    self._index_object(obj.dbref, obj)
+                if not first_room.is_set():
+                    live.extend(obj.dbref for obj in objs)
+                    first_room.set()
+        
+        try:
+            if binary:
+                f = open(path, 'rb')
+                reader = BinaryWorldReader(f, batch_size)
+            else:
+                f = open(path, 'r', encoding='utf-8')
+                reader = JsonWorldReader(f, batch_size)
+            with f:
+                tail = self._read_tail(path, reader.read_header(), verbose)
+                for batch in reader.batches():
+                    publish(batch, reader.build)
+            
+            # Whatever is left of the tail was created after the snapshot
+            publish([(dbref, None) for dbref in list(tail)], _build_objects)
+            
+            with self._lock:
+                # Early objects keep their place; objects created during the load go last
+                objects = {ref: self.objects[ref] for ref in live if ref in self.objects}
+                objects.update(self._pending)
+                objects.update(self.objects)
+                self.objects = objects
+                self._pending = {}
+                self._exit_tables.clear()  # May have been built while exits were still pending
+                self._exit_rooms.clear()
+                self._gram_indices.clear()
+                self._trigger_tables.clear()
                 
-                self.objects = {}
-                for dbref, obj_data in data["objects"].items():
-                    # Filter out stale fields (like removed 'research_ok')
-                    filtered_data = {k: v for k, v in obj_data.items() if k in valid_fields}
-                    self.objects[dbref] = GameObject(dbref=dbref, **filtered_data)
+            seconds = time.perf_counter() - started
+            self.load_stats = {'objects': len(objects), 'seconds': seconds,
+                               'objects_per_sec': len(objects) / seconds if seconds else 0.0}
+            if verbose:
+                print(f"[MASH] Streamed {len(objects)} objects in {seconds:.2f}s "
+                      f"({self.load_stats['objects_per_sec']:,.0f} objects/sec)")
+        except BaseException as e:
+            self._load_error = e  # save() refuses to overwrite the file with a partial world
+            raise
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            first_room.set()
+            self._loaded.set()
+    
+    def _background_load(self, *args) -> None:
+        try:
+            self._stream_load(*args)
+        except Exception as e:
+            print(f"[MASH] World load failed: {e}")
+    
+    def _read_tail(self, path: str, header: Dict[str, Any], verbose: bool) -> Dict[str, list]:
+        """
+        Adopt the snapshot header, then gather the delta and journal entries
+        written since that snapshot as per-dbref ops for _fold_tail.
+        """
+        with self._lock:
+            self._restore_meta(header.get('meta', self.meta),
+                               header.get('next_dbref', 1), header.get('free_dbrefs', []))
+            self.journal_seq = self._checkpoint_seq = header.get('journal_seq', 0)
+            self._snapshot_id = header.get('snapshot_id', "")
+            self._delta_count = 0
+            tail: Dict[str, list] = {}
+            
+            delta_path = str(path) + ".delta"
+            if os.path.exists(delta_path):
+                self._read_deltas(delta_path, tail)
+            
+            # "<world>.journal.1" holds entries moved aside by a save that never finished
+            replayed = 0
+            for journal_path in (str(path) + ".journal.1", str(path) + ".journal"):
+                if os.path.exists(journal_path):
+                    replayed += self._read_journal(journal_path, tail)
+            if replayed and verbose:
+                print(f"[MASH] Replayed {replayed} journal entries after checkpoint {self._checkpoint_seq}")
+            return tail
+    
+    def save(self, path: Path, binary: Optional[bool] = None, wait: bool = True) -> None:
+        """
+        Save world to a file atomically. Doubles as the journal checkpoint.
+        Writes the binary format for ".mashb" paths (or binary=True), else JSON.
+        
+        Only the snapshot is taken under the lock; encoding, fsync and rename
+        happen on the background saver thread. Requests that arrive while a
+        save is in flight are coalesced into one follow-up save. wait=False
+        returns immediately; wait=True blocks until the world is durable.
+        """
+        if wait and self._lock.held():
+            raise RuntimeError("save(wait=True) while holding the database lock would deadlock the saver")
+        self.wait_loaded()  # Never snapshot a half-loaded world
+        path = os.path.abspath(str(path))
+        with self._save_cond:
+            self._save_ticket += 1
+            ticket = self._save_ticket
+            waiting = self._save_requests.get(path, (None, []))[1]
+            self._save_requests[path] = (binary, waiting + [ticket] if wait else waiting)
+            if self._saver_thread is None:
+                self._saver_thread = threading.Thread(target=self._saver_loop, name="mash-saver", daemon=True)
+                self._saver_thread.start()
+            self._save_cond.notify_all()
+            if not wait:
+                return
+            while self._save_done < ticket:
+                self._save_cond.wait()
+            error = self._save_errors.pop(ticket, None)
+            if error is not None:
+                raise error
+    
+    def save_binary(self, path: Path, wait: bool = True) -> None:
+        """save() in the binary snapshot format, whatever the file is called."""
+        self.save(path, binary=True, wait=wait)
+    
+    def wait_saved(self) -> None:
+        """Block until every requested save has finished."""
+        with self._save_cond:
+            while self._save_done < self._save_ticket:
+                self._save_cond.wait()
+    
+    def _save_in_flight(self) -> bool:
+        with self._save_cond:
+            return self._save_done < self._save_ticket
+    
+    def _saver_loop(self) -> None:
+        while True:
+            with self._save_cond:
+                while not self._save_requests:
+                    self._save_cond.wait()
+                requests, self._save_requests = self._save_requests, {}
+                ticket = self._save_ticket  # Everything requested so far is covered by this round
+            errors = {}
+            for path, (binary, waiting) in requests.items():
+                try:
+                    self._save_now(path, binary)
+                except Exception as e:
+                    print(f"[MASH] Save to {path} failed: {e}")
+                    errors.update(dict.fromkeys(waiting, e))
+            with self._save_cond:
+                self._save_done = ticket
+                self._save_errors.update(errors)
+                self._save_cond.notify_all()
+    
+    def _save_now(self, path: str, binary: Optional[bool]) -> None:
+        """Snapshot under the lock, then write without it (saver thread only)."""
+        rotated = None
+        with self._lock:
+            snapshot_id = uuid.uuid4().hex
+            capture = self._capture(snapshot_id)
+            header = capture.header
+            # Changes from here on belong to the next save. save_delta() defers to
+            # a full save while this one is in flight, so no delta is written
+            # against a snapshot that is not on disk yet.
+            self._snapshot_id = snapshot_id
+            dirty, deleted = self._dirty, self._deleted
+            self._dirty, self._deleted = set(), set()
+            self._delta_count = 0
+            if self._journal_file is not None and path == self._journal_base:
+                rotated = self._rotate_journal()
+        try:
+            _write_snapshot(path, header, capture.items(), binary)
+        except Exception:
+            with self._lock:
+                if self._snapshot_id == snapshot_id:
+                    self._snapshot_id = ""  # Forces the next save_delta to write a full snapshot
+                # Still unsaved; whatever happened to an object since the capture wins
+                restored_dirty = dirty - self._deleted
+                self._deleted |= deleted - self._dirty
+                self._dirty |= restored_dirty
+            raise
+        finally:
+            self._release(capture)
+        
+        # The snapshot supersedes any delta sidecar written against the previous
+        # one, and the journal entries moved aside before it was taken.
+        # A crash before these removals is harmless: load() skips entries <= journal_seq.
+        delta_path = path + ".delta"
+        if os.path.exists(delta_path):
+            os.remove(delta_path)
+        if rotated:
+            os.remove(rotated)
+            with self._lock:
+                self._checkpoint_seq = max(self._checkpoint_seq, header['journal_seq'])
+    
+    def _capture(self, snapshot_id: str) -> SnapshotCapture:
+        """Start a copy-on-write snapshot of the world (caller holds the lock; see _release)."""
+        header = {
+            'meta': self._meta_for_save(),
+            'journal_seq': self.journal_seq,
+            'snapshot_id': snapshot_id,
+        }
+        capture = SnapshotCapture(self, header)
+        self._captures.append(capture)
+        return capture
+    
+    def _release(self, capture: SnapshotCapture) -> None:
+        with self._lock:
+            self._captures.remove(capture)
+    
+    def _object_changing(self, obj: GameObject) -> None:
+        """Called by attached GameObjects just before a field set or container edit."""
+        if self._captures:
+            with self._lock:
+                for capture in self._captures:
+                    capture.keep(obj)
+    
+    def _rotate_journal(self) -> str:
+        """Move the live journal aside for the snapshot being taken and start a fresh one."""
+        journal_path = self._journal_base + ".journal"
+        rotated = journal_path + ".1"
+        self._journal_file.close()
+        if os.path.exists(rotated):
+            # Left by a failed save: its entries are older, so keep them in front
+            with open(rotated, 'a', encoding='utf-8') as dst, open(journal_path, 'r', encoding='utf-8') as src:
+                dst.write(src.read())
+        else:
+            os.replace(journal_path, rotated)
+        self._journal_file = open(journal_path, 'w', encoding='utf-8')
+        return rotated
+    
+    def export(self, path: Path, binary: Optional[bool] = None) -> None:
+        """
+        Write a full copy of the world (e.g. human-readable JSON for diffing and
+        backups) without touching the save/delta/journal state of the live file.
+        """
+        path = os.path.abspath(str(path))
+        if path == self._journal_base:
+            raise ValueError("Use save() for the live world file; export() is for copies")
+        self.wait_loaded()
+        with self._lock:
+            capture = self._capture(uuid.uuid4().hex)
+        try:
+            _write_snapshot(path, capture.header, capture.items(), binary)
+        finally:
+            self._release(capture)
+        # Sidecars left next to `path` describe whatever it held before
+        for sidecar in (path + ".journal", path + ".journal.1", path + ".delta"):
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+    
+    def save_delta(self, path: Path, compact_after: int = 48, wait: bool = True) -> int:
+        """
+        Append only the objects changed since the last save to "<path>.delta".
+        Falls back to a full snapshot (see save) when none exists yet, while one
+        is in flight, or after `compact_after` deltas. Returns the number of
+        records written (for a full snapshot, the object count).
+        """
+        self.wait_loaded()
+        with self._lock:
+            full = (not os.path.exists(path) or not self._snapshot_id
+                    or self._delta_count >= compact_after or self._save_in_flight())
+            if not full:
+                if not self._dirty and not self._deleted:
+                    return 0
                     
-            self.rebuild_indices()
+                record = {
+                    'base': self._snapshot_id,
+                    'allocator': self.allocator.state(),
+                    'journal_seq': self.journal_seq,
+                    'deleted': sorted(self._deleted),
+                    'objects': {ref: self.objects[ref].to_dict() for ref in self._dirty if ref in self.objects}
+                }
+                with open(str(path) + ".delta", 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, separators=(',', ':')) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                    
+                written = len(record['objects']) + len(record['deleted'])
+                self._dirty.clear()
+                self._deleted.clear()
+                self._delta_count += 1
+                return written
+            count = len(self.objects)
+        self.save(path, wait=wait)  # Outside the lock: the saver thread needs it
+        return count
     
-    def save(self, path: Path) -> None:
-        """Save world to JSON file atomically."""
+    def _read_deltas(self, delta_path: str, tail: Dict[str, list]) -> None:
+        """Collect delta records written against the loaded snapshot, in order."""
+        with open(delta_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn tail from a crash mid-write
+                if rec.get('base') != self._snapshot_id:
+                    continue  # Left over from an older snapshot
+                for dbref in rec.get('deleted', []):
+                    tail.setdefault(dbref, []).append(None)
+                for dbref, obj_data in rec.get('objects', {}).items():
+                    tail.setdefault(dbref, []).append(obj_data)
+                if 'allocator' in rec:
+                    self.allocator = DbrefAllocator.from_state(rec['allocator'])
+                self.journal_seq = max(self.journal_seq, rec.get('journal_seq', 0))
+                self._delta_count += 1
+    
+    # ─────────────────────────────────────────────────────────────
+    # Journal (Write-Ahead Log)
+    # ─────────────────────────────────────────────────────────────
+    # Each mutation is appended to "<world>.journal" as one compact JSON line:
+    #   {"s": seq, "o": "new", "r": dbref, "d": {...}}   create_object
+    #   {"s": seq, "o": "del", "r": dbref}               destroy_object
+    #   {"s": seq, "o": "set", "r": dbref, "f": field, "v": value}
+    #   {"s": seq, "o": "put", "r": dbref, "f": field, "k": key, "v": value}   attrs[key] = value
+    #   {"s": seq, "o": "pop", "r": dbref, "f": field, "k": key}               del attrs[key]
+    #   {"s": seq, "o": "add" | "rem", "r": dbref, "f": field, "v": item}      list append/remove
+    # The snapshot records the journal_seq it covers, so load() only replays the tail.
+    
+    def enable_journal(self, path: Path, checkpoint_interval: float = 600.0) -> None:
+        """
+        Switch to journaled persistence for the world file at `path`.
+        A background thread compacts the journal into a full snapshot
+        every `checkpoint_interval` seconds (0 disables the thread).
+        """
+        base = os.path.abspath(str(path))
+        if self._journal_base == base:
+            return
+        self.close_journal()
+        if not os.path.exists(base):
+            self.save(base)
         with self._lock:
-            data = {
-                'meta': self.meta,
-                'next_dbref': self.next_dbref,
-                'free_dbrefs': self.free_dbrefs,
-                'objects': {dbref: obj.to_dict() for dbref, obj in self.objects.items()}
-            }
+            self._journal_base = base
+            self._journal_file = open(base + ".journal", 'a', encoding='utf-8')
             
-            # Atomic Write Strategy (Temp file + Rename)
-            # This prevents corruption if the process crashes mid-save.
-            temp_path = str(path) + ".tmp"
+        if checkpoint_interval:
+            self._checkpoint_stop.clear()
+            self._checkpoint_thread = threading.Thread(
+                target=self._checkpoint_loop, args=(checkpoint_interval,),
+                name="mash-checkpoint", daemon=True)
+            self._checkpoint_thread.start()
+    
+    def close_journal(self) -> None:
+        """Stop the checkpoint thread and close the journal (entries stay on disk)."""
+        self._checkpoint_stop.set()
+        thread, self._checkpoint_thread = self._checkpoint_thread, None
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        with self._lock:
+            if self._journal_file is not None:
+                self._journal_file.flush()
+                self._journal_file.close()
+            self._journal_file = None
+            self._journal_base = None
+    
+    def commit(self, path: Optional[Path] = None) -> None:
+        """
+        Make recent mutations durable. With a journal this is a cheap append-only
+        flush; otherwise it falls back to a full save to `path` (if given).
+        """
+        with self._lock:
+            if self._journal_file is not None:
+                self._journal_file.flush()
+                os.fsync(self._journal_file.fileno())
+                return
+        if path is not None:
+            self.save(path)
+    
+    def checkpoint(self) -> bool:
+        """Compact the journal into a full snapshot. Returns False if nothing was pending."""
+        with self._lock:
+            base = self._journal_base
+            if not base or self.journal_seq == self._checkpoint_seq:
+                return False
+        self.save(base)
+        return True
+    
+    def _checkpoint_loop(self, interval: float) -> None:
+        while not self._checkpoint_stop.wait(interval):
             try:
-                with open(temp_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2)
-                # Atomic swap!
-                os.replace(temp_path, path)
+                self.checkpoint()
             except Exception as e:
-                if os.path.exists(temp_path):
-                    try: os.remove(temp_path)
-                    except: pass
-                raise e
+                print(f"[MASH] Checkpoint failed: {e}")
+    
+    def _journal_write(self, record: Dict[str, Any]) -> None:
+        """Append one record to the journal (caller holds the lock)."""
+        self.journal_seq += 1
+        line = json.dumps({'s': self.journal_seq, **record}, separators=(',', ':'))
+        self._journal_file.write(line + "\n")
+    
+    def _object_changed(self, obj: GameObject, field_name: str, old: Any,
+                        edit: Optional[tuple] = None) -> None:
+        """
+        Called by attached GameObjects on every field set or container edit.
+        edit is (op, key_or_item) for the container edits the journal records on their own.
+        """
+        with self._lock:
+            self._dirty.add(obj.dbref)
+            self._reindex(obj, field_name, old)
+            if field_name in ('attrs', 'listening', 'location'):
+                self._invalidate_triggers(obj, old if field_name == 'location' else None)
+            if field_name == 'location' and obj.type == 'agent' and old != obj.location:
+                self.events.moved(obj.dbref, old or "", obj.location)
+            if self._journal_file is not None:
+                self._journal_write(self._journal_record(obj, field_name, edit))
+    
+    @staticmethod
+    def _journal_record(obj: GameObject, field_name: str, edit: Optional[tuple]) -> Dict[str, Any]:
+        value = getattr(obj, field_name)
+        if edit is not None:
+            op, arg = edit
+            if op in ('add', 'rem'):
+                return {'o': op, 'r': obj.dbref, 'f': field_name, 'v': arg}
+            if type(arg) is str:  # JSON object keys; anything else journals the whole dict
+                if op == 'put' and arg in value:
+                    return {'o': 'put', 'r': obj.dbref, 'f': field_name, 'k': arg, 'v': value[arg]}
+                if op == 'pop':
+                    return {'o': 'pop', 'r': obj.dbref, 'f': field_name, 'k': arg}
+        return {'o': 'set', 'r': obj.dbref, 'f': field_name, 'v': value}
+    
+    def _read_journal(self, journal_path: str, tail: Dict[str, list]) -> int:
+        """Collect journal entries newer than the loaded snapshot. Returns the count."""
+        applied = 0
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn tail from a crash mid-write; everything before it is good
+                if rec.get('s', 0) <= self.journal_seq:
+                    continue
+                op, dbref = rec.get('o'), rec.get('r')
+                if op == 'set':
+                    tail.setdefault(dbref, []).append((rec.get('f'), rec.get('v')))
+                elif op in ('put', 'pop'):
+                    tail.setdefault(dbref, []).append((op, rec.get('f'), rec.get('k'), rec.get('v')))
+                elif op in ('add', 'rem'):
+                    tail.setdefault(dbref, []).append((op, rec.get('f'), rec.get('v')))
+                elif op == 'new':
+                    tail.setdefault(dbref, []).append(rec.get('d', {}))
+                    if dbref[1:].isdigit():
+                        self.allocator.claim(int(dbref[1:]))
+                elif op == 'del':
+                    tail.setdefault(dbref, []).append(None)
+                    if dbref[1:].isdigit():
+                        self.allocator.release(int(dbref[1:]))
+                self.journal_seq = rec['s']
+                applied += 1
+        return applied
     
     # ─────────────────────────────────────────────────────────────
     # Object Retrieval
@@ -236,9 +2002,43 @@ class WorldDatabase:
     def get_room_contents(self, room_ref: str) -> List[GameObject]:
         """Get all agents/objects in a room using the location index."""
         with self._lock:
-            dbrefs = self._location_index.get(room_ref, [])
+            dbrefs = self._location_index.get(room_ref, ())
             return [self.objects[ref] for ref in dbrefs if ref in self.objects]
     
+    def query(self, type: Optional[str] = None, owner: Optional[str] = None,
+              flag: Union[str, List[str], None] = None) -> List[GameObject]:
+        """
+        All objects matching every given criterion, from the type/owner/flag indices.
+        `flag` is one flag name or a list of them; prefix a name with '!' to require
+        it unset. Results follow the order of the narrowest index involved.
+        """
+        flags = [flag] if isinstance(flag, str) else list(flag or ())
+        with self._lock:
+            wanted, unwanted = [], []
+            if type is not None:
+                wanted.append(self._type_index.get(type) or ())
+            if owner is not None:
+                wanted.append(self._owner_index.get(owner) or ())
+            for name in flags:
+                negate = name.startswith('!')
+                name = name.lstrip('!')
+                if name not in FLAG_FIELDS:
+                    raise ValueError(f"Unknown flag '{name}'")
+                (unwanted if negate else wanted).append(self._flag_index.get(name) or ())
+            if not wanted:
+                wanted.append(self.objects)
+            wanted.sort(key=len)
+            # Walk the smallest set; probe the others (lists come from SQL views)
+            rest = [refs if isinstance(refs, dict) else set(refs) for refs in wanted[1:] + unwanted]
+            keep, drop = rest[:len(wanted) - 1], rest[len(wanted) - 1:]
+            results = []
+            for ref in wanted[0]:
+                if all(ref in refs for refs in keep) and not any(ref in refs for refs in drop):
+                    obj = self.objects.get(ref)
+                    if obj is not None:
+                        results.append(obj)
+            return results
+    
     def get_autonomous_agents(self, room_ref: str) -> List[GameObject]:
         """Get all autonomous agents in a room."""
         with self._lock:
@@ -249,68 +2049,42 @@ class WorldDatabase:
     # ─────────────────────────────────────────────────────────────
     
     def move_agent(self, agent_ref: str, destination_ref: str) -> bool:
-        """Move an object/agent to a new location. Maintains location index."""
+        """
+        Move an object/agent to a new location.
+        The location index follows through the change hook (O(1) either way).
+        """
         with self._lock:
             obj = self.get(agent_ref)
             dest = self.get(destination_ref)
             if not obj or not dest:
                 return False
-                
-            old_loc = obj.location
             obj.location = destination_ref
-            
-            # Update location index
-            if old_loc in self._location_index:
-                if agent_ref in self._location_index[old_loc]:
-                    self._location_index[old_loc].remove(agent_ref)
-                    
-            if destination_ref not in self._location_index:
-                self._location_index[destination_ref] = []
-            self._location_index[destination_ref].append(agent_ref)
-            
             return True
     
     def create_object(self, obj_type: str, name: str, **kwargs) -> GameObject:
         """Create a new object and return it. Maintains indices and recycles IDs."""
         with self._lock:
-            # 1. Try recycling first, but verify the ID is actually free
-            while self.free_dbrefs:
-                self.free_dbrefs.sort()
-                candidate_id = self.free_dbrefs.pop(0)
-                candidate_ref = f"#{candidate_id}"
-                
-                # CRITICAL SAFETY CHECK: Zombie Prevention
-                if candidate_ref not in self.objects:
-                    dbid = candidate_id
-                    break
-                else:
-                    # If it WAS in objects, it wasn't actually free. Skip it.
-                    pass
-            else:
-                # 2. No free IDs (or all were zombies), use next_dbref
-                # CRITICAL SAFETY CHECK: Time Travel Prevention
-                # Loop until we find a dbref that does NOT exist
-                while f"#{self.next_dbref}" in self.objects:
-                    self.next_dbref += 1
-                
-                dbid = self.next_dbref
-                self.next_dbref += 1
-                
+            # Lowest recycled id first, else a fresh one; either way verified unused
+            dbid = self.allocator.allocate(lambda n: f"#{n}" in self.objects or f"#{n}" in self._pending)
             dbref = f"#{dbid}"
             obj = GameObject(dbref=dbref, type=obj_type, name=name, **kwargs)
             self.objects[dbref] = obj
+            obj._attach(self)
+            self._dirty.add(dbref)
+            self._deleted.discard(dbref)
+            if self._journal_file is not None:
+                self._journal_write({'o': 'new', 'r': dbref, 'd': obj.to_dict()})
             
             # Update indices
-            self._name_index[name.lower()] = dbref
-            if obj_type not in self._type_index:
-                self._type_index[obj_type] = []
-            self._type_index[obj_type].append(dbref)
+            self._index_object(dbref, obj)
             
-            loc = kwargs.get('location')
-            if loc:
-                if loc not in self._location_index:
-                    self._location_index[loc] = []
-                self._location_index[loc].append(dbref)
+            loc = obj.location
+            if loc in self._gram_indices:
+                self._gram_indices[loc].add(dbref, name.lower())
+                
+            if obj_type == 'exit' and obj.source:
+                self._exit_tables.pop(obj.source, None)
+            self._invalidate_triggers(obj)
                 
             return obj
 
@@ -319,118 +2093,193 @@ class WorldDatabase:
         Permanently delete an object from the world.
         Returns True if successful.
         """
-        if dbref not in self.objects:
-            return False
+        with self._lock:
+            if dbref not in self.objects:
+                return False
             
-        obj = self.objects[dbref]
+            obj = self.objects[dbref]
+            self._object_changing(obj)
         
-        # 1. Clean up from indices
-        name_lower = obj.name.lower()
-        if self._name_index.get(name_lower) == dbref:
-            del self._name_index[name_lower]
+            # 1. Clean up from indices
+            self._unindex_name(dbref, obj.name)
             
-        if obj.type in self._type_index and dbref in self._type_index[obj.type]:
-            self._type_index[obj.type].remove(dbref)
+            self._unindex_type(dbref, obj.type)
+            self._unindex_owner(dbref, obj.owner)
+            self._unindex_flags(dbref)
             
-        loc = getattr(obj, 'location', None)
-        if loc in self._location_index and dbref in self._location_index[loc]:
-            self._location_index[loc].remove(dbref)
+            loc = obj.location
+            self._unindex_location(dbref, loc)
+            if loc in self._gram_indices:
+                self._gram_indices[loc].remove(dbref)
+            self._gram_indices.pop(dbref, None)
             
-        # 2. Recycle the ID
-        try:
-            dbid = int(dbref[1:])
-            if dbid not in self.free_dbrefs:
-                self.free_dbrefs.append(dbid)
-        except ValueError:
-            pass # Non-standard dbref, skip recycling
+            if obj.type == 'exit':
+                self._exits_by_source.get(obj.source, {}).pop(dbref, None)
+                self._invalidate_exit(obj)
+            self._exit_tables.pop(dbref, None)
+            self._invalidate_triggers(obj)
             
-        # 3. Finally remove from main store
-        del self.objects[dbref]
-        return True
+            # 2. Recycle the ID
+            try:
+                self.allocator.release(int(dbref[1:]))
+            except ValueError:
+                pass # Non-standard dbref, skip recycling
+            
+            # 3. Finally remove from main store
+            del self.objects[dbref]
+            obj._attach(None)
+            self._dirty.discard(dbref)
+            self._deleted.add(dbref)
+            self.events.forget(dbref)
+            if self._journal_file is not None:
+                self._journal_write({'o': 'del', 'r': dbref})
+            return True
     
     # ─────────────────────────────────────────────────────────────
     # Utility
     # ─────────────────────────────────────────────────────────────
     
     def find_exit_by_name(self, room_ref: str, exit_name: str) -> Optional[GameObject]:
-        """Find an exit in a room by name, alias, or unique prefix."""
+        """
+        Find an exit in a room by name, alias, or unique prefix (substring as a last resort).
+        Covers the room's own exit list and any exit that claims the room as its source.
+        """
         if not room_ref or not exit_name: return None
         
         # Robust normalization
         if not str(room_ref).startswith('#'): room_ref = f"#{room_ref}"
         
-        room = self.get(room_ref)
-        if not room: return None
-        
-        target = exit_name.lower().strip()
-        
-        # Iterate over exits directly to be safe
-        for ref in room.exits:
-            if not ref.startswith('#'): ref = f"#{ref}"
-            e = self.get(ref)
-            if not e or e.type != 'exit': continue
-            
-            # 1. Exact Name
-            if e.name.lower() == target:
-                return e
-                
-            # 2. Aliases (List)
-            if hasattr(e, 'aliases') and e.aliases:
-                if any(str(alias).lower() == target for alias in e.aliases):
-                    return e
-                    
-            # 3. Prefix
-            if e.name.lower().startswith(target):
-                return e
+        with self._lock:
+            room = self.objects.get(room_ref)
+            if not room: return None
+            ref = self._exit_table(room).find(exit_name.lower().strip())
+            return self.objects.get(ref) if ref else None
 
-            # 4. Substring (Relaxed)
-            if target in e.name.lower():
-                return e
-        
-        # --- GLOBAL FAIL-SAFE ---
-        # If the local list missed it, hunt for any exit that claims this room as its source.
-        for obj in self.objects.values():
-            if obj.type == 'exit' and obj.source == room_ref:
-                if obj.name.lower() == target: return obj
-                if hasattr(obj, 'aliases') and obj.aliases:
-                    if any(str(a).lower() == target for a in obj.aliases): return obj
-                if obj.name.lower().startswith(target): return obj
-                if target in obj.name.lower(): return obj
-                
-        return None
+    def match_exit(self, room_ref: str, text: str) -> Optional[GameObject]:
+        """Partial exit match for object matching: name/alias prefix, then name substring."""
+        with self._lock:
+            room = self.objects.get(room_ref)
+            if not room or not text: return None
+            ref = self._exit_table(room).match(text.lower().strip())
+            return self.objects.get(ref) if ref else None
+
+    def find_by_name(self, name: str, location: Optional[str] = None) -> List[GameObject]:
+        """All objects with this exact (case-insensitive) name, optionally only those at `location`."""
+        with self._lock:
+            refs = self._name_index.get(name.lower().strip(), ())
+            objs = [self.objects[ref] for ref in refs if ref in self.objects]
+            if location is not None:
+                objs = [o for o in objs if o.location == location]
+            return objs
+
+    def match_name(self, location: str, text: str) -> Optional[GameObject]:
+        """First object (in arrival order) at `location` whose name contains `text`."""
+        text = text.lower().strip()
+        if not location or not text:
+            return None
+        with self._lock:
+            grams = self._gram_indices.get(location)
+            if grams is None:
+                contents = self._location_index.get(location, ())
+                if len(contents) < GRAM_INDEX_MIN:
+                    for ref in contents:
+                        obj = self.objects.get(ref)
+                        if obj and text in obj.name.lower():
+                            return obj
+                    return None
+                # Crowded location: build its index once, then keep it current
+                grams = self._gram_indices[location] = NgramIndex()
+                for ref in contents:
+                    if ref in self.objects:
+                        grams.add(ref, self.objects[ref].name.lower())
+            ref = grams.search(text)
+            return self.objects.get(ref) if ref else None
 
     # ─────────────────────────────────────────────────────────────
     # Announcement Logic
     # ─────────────────────────────────────────────────────────────
 
     def room_announce(self, room_ref: str, message: str, exclude: Optional[str] = None) -> None:
-        """Log an announcement to a room and broadcast to occupants."""
-        with self._lock:
-            # 1. Log for triggers (Legacy/AI)
-            if room_ref not in self._room_announcements:
-                self._room_announcements[room_ref] = []
-            self._room_announcements[room_ref].append(message)
-            # Cap at 20 messages per room
-            if len(self._room_announcements[room_ref]) > 20:
-                self._room_announcements[room_ref].pop(0)
-                
-            # 2. Broadcast to occupants
-            contents = self.get_room_contents(room_ref)
-            for obj in contents:
-                if obj.type == 'agent' and obj.dbref != exclude:
-                    if not hasattr(obj, 'message_buffer'):
-                        obj.message_buffer = []
-                    obj.message_buffer.append(message)
-                    
-            # 3. Trigger external sync hook (if registered)
+        """Post an announcement to a room's event log; occupants pick it up with read_messages."""
+        with self._lock:
+            self.events.post(room_ref, message, exclude)
+            wake = self._listeners_in(room_ref, exclude) if self._listeners else ()
+            
+            # Trigger external sync hook (if registered)
             if self.on_announce:
                 self.on_announce(room_ref, message)
+        
+        # Outside the lock: a listener may take its own locks
+        for callback in wake:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[MASH] Announcement listener failed: {e}")
 
-    def get_room_announcements(self, room_ref: str) -> List[str]:
-        """Retrieve recent announcements for a room and clear them."""
-        msgs = self._room_announcements.get(room_ref, [])
-        self._room_announcements[room_ref] = []
-        return msgs
+    def add_listener(self, agent_ref: str, wake: Callable[[], None]) -> int:
+        """
+        Call `wake()` whenever an announcement reaches this agent, so a session can
+        read_messages() instead of polling. `wake` must not block. Returns a token
+        for remove_listener.
+        """
+        with self._lock:
+            token = next(self._listener_tokens)
+            self._listeners.setdefault(agent_ref, {})[token] = wake
+            self._listener_agents[token] = agent_ref
+            return token
+
+    def remove_listener(self, token: int) -> None:
+        with self._lock:
+            agent_ref = self._listener_agents.pop(token, None)
+            callbacks = self._listeners.get(agent_ref)
+            if callbacks is not None:
+                callbacks.pop(token, None)
+                if not callbacks:
+                    del self._listeners[agent_ref]
+
+    def _listeners_in(self, room_ref: str, exclude: Optional[str]) -> List[Callable[[], None]]:
+        """Wake callbacks of listening agents in a room (caller holds the lock)."""
+        contents = self._location_index.get(room_ref) or ()
+        if len(self._listeners) <= len(contents):
+            agents = [ref for ref in self._listeners
+                      if ref in self.objects and self.objects[ref].location == room_ref]
+        else:
+            agents = [ref for ref in contents if ref in self._listeners]
+        return [callback for ref in agents if ref != exclude
+                for callback in self._listeners[ref].values()]
+
+    @property
+    def event_seq(self) -> int:
+        """Sequence number of the latest announcement (a fresh session's starting cursor)."""
+        return self.events.seq
+
+    def read_messages(self, agent_ref: str, since: int) -> Tuple[int, List[str]]:
+        """
+        Announcements that reached an agent after cursor `since`.
+        Returns (new cursor, messages oldest first).
+        """
+        with self._lock:
+            agent = self.objects.get(agent_ref)
+            if agent is None:
+                return self.events.seq, []
+            return self.events.seq, self.events.read(agent_ref, agent.location, since)
+
+    def get_room_announcements(self, room_ref: str, since: int = 0) -> List[str]:
+        """Recent announcements for a room (those after `since`), oldest first."""
+        with self._lock:
+            return self.events.recent(room_ref, since)
+
+
+def convert_world(source: Path, dest: Path, binary: Optional[bool] = None) -> int:
+    """
+    Convert a world file between JSON and binary (including any delta/journal
+    tail of the source). The format of `dest` follows its extension unless
+    `binary` is given. Returns the number of objects written.
+    """
+    db = WorldDatabase()
+    db.load(source)
+    db.export(dest, binary)
+    return len(db.objects)
 
 
 # ─────────────────────────────────────────────────────────────────
@@ -438,6 +2287,14 @@ class WorldDatabase:
 # ─────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) == 3:
+        # python database.py world.json world.mashb (or the other way round)
+        count = convert_world(Path(sys.argv[1]), Path(sys.argv[2]))
+        print(f"[MASH] Converted {count} objects: {sys.argv[1]} -> {sys.argv[2]}")
+        sys.exit(0)
+    
     db = WorldDatabase()
     
     # Create a simple test world
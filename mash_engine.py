@@ -7,15 +7,22 @@ This is the 'dumb orchestrator' - it parses commands, updates state,
 and calls out to the AI layer for descriptions and NPC actions.
 """
 
+import contextvars
+import heapq
+import itertools
 import random
 import json
 import re
 import threading
+import time
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
-from typing import Optional, Callable, Dict, List, Any
+from typing import Optional, Callable, Dict, List, Any, NamedTuple, Tuple
 from dataclasses import dataclass, field, asdict
 from database import WorldDatabase, GameObject
+import softcode
 
 
 # ─────────────────────────────────────────────────────────────────
@@ -38,6 +45,20 @@ TOKEN_DROP_TIERS = [
 
 STARTING_TOKENS = 100  # New players start with tokens to build
 
+ONLINE_WINDOW = 300  # Players count as online for 5 minutes after their last command
+IDLE_RECHECK = 60  # Idle robots that can't go home yet are looked at again after this long
+
+REACTION_WORKERS = 8  # AI reaction calls in flight at once, across all rooms
+REACTION_TIMEOUT = 30  # Seconds a room waits for its slowest reaction before giving up on it
+
+QUEUE_QUOTA = 100  # Commands one object may have queued at once; going over halts it as a runaway
+QUEUE_TICK_BUDGET = 50  # Most queued commands run per tick; the rest wait for the next tick
+QUEUE_TICK = 0.1  # Seconds between ticks while the queue is backed up
+
+CHAIN_MAX_DEPTH = 20  # Commands deep a softcode chain may go before the circuit breaker trips
+CHAIN_MAX_COMMANDS = 200  # Commands one player command may set off in total
+CHAIN_TRIP_LOG = 100  # Tripped chains kept for @breaker
+
 
 @dataclass
 class CommandResult:
@@ -49,6 +70,315 @@ class CommandResult:
     context: Optional[Dict] = None
 
 
+# ─────────────────────────────────────────────────────────────────
+# Presence
+# ─────────────────────────────────────────────────────────────────
+
+class PresenceTracker:
+    """
+    Who is online and which robots have gone idle, kept current by touch()
+    instead of rescanning every agent's last_interaction. Players sit in a
+    recency-ordered dict (oldest first), robots in a min-heap of idle-since
+    times, so listing costs O(online) and idle checks O(expired).
+    """
+
+    def __init__(self, db: WorldDatabase, window: float = ONLINE_WINDOW):
+        self.db = db
+        self.window = window
+        self._lock = threading.Lock()
+        self._players: Dict[str, float] = {}  # player dbref -> last interaction, oldest first
+        self._robots: Dict[str, float] = {}  # robot dbref -> idle-since key of its live heap entry
+        self._heap: List[tuple] = []  # (idle since, robot dbref); entries not matching _robots are stale
+        self._seeded = False
+
+    def _seed(self) -> None:
+        """Pick up last_interaction for agents already in the world (once, after loading)."""
+        if self._seeded:
+            return
+        self.db.wait_loaded()
+        agents = self.db.query(type='agent')
+        with self._lock:
+            if self._seeded:
+                return
+            for agent in agents:
+                if agent.dbref not in self._players and agent.dbref not in self._robots:
+                    self._record(agent.dbref, agent.autonomous, agent.last_interaction)
+            self._players = dict(sorted(self._players.items(), key=lambda item: item[1]))
+            self._seeded = True
+
+    def _record(self, dbref: str, robot: bool, when: float) -> None:
+        """Caller holds the lock."""
+        if robot:
+            self._players.pop(dbref, None)
+            self._robots[dbref] = when
+            heapq.heappush(self._heap, (when, dbref))
+        else:
+            self._robots.pop(dbref, None)
+            self._players.pop(dbref, None)  # Re-insert at the recent end
+            self._players[dbref] = when
+
+    def touch(self, agent: GameObject, now: Optional[float] = None) -> None:
+        """Record an interaction by this agent."""
+        with self._lock:
+            self._record(agent.dbref, agent.autonomous, time.time() if now is None else now)
+
+    def is_online(self, agent: GameObject, now: Optional[float] = None) -> bool:
+        """True if this player has interacted within the window (robots are always present)."""
+        if agent.autonomous:
+            return True
+        last = self._players.get(agent.dbref)
+        if last is None:
+            last = agent.last_interaction  # Not seen since startup
+        return ((time.time() if now is None else now) - last) <= self.window
+
+    def online(self, now: Optional[float] = None) -> List[GameObject]:
+        """Players active within the window, most recent first."""
+        self._seed()
+        now = time.time() if now is None else now
+        with self._lock:
+            # Expired players are at the old end; drop them for good
+            for dbref, last in list(self._players.items()):
+                if now - last <= self.window:
+                    break
+                del self._players[dbref]
+            refs = list(reversed(self._players))
+        players = []
+        for ref in refs:
+            obj = self.db.get(ref)
+            if obj and obj.type == 'agent' and not obj.autonomous:
+                players.append(obj)
+        return players
+
+    def idle_robots(self, timeout: float, now: Optional[float] = None) -> List[GameObject]:
+        """
+        Pop every robot idle for longer than `timeout`. Each one leaves the
+        tracker until it is touched or deferred again.
+        """
+        self._seed()
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            while self._heap and now - self._heap[0][0] > timeout:
+                since, dbref = heapq.heappop(self._heap)
+                if self._robots.get(dbref) == since:
+                    del self._robots[dbref]
+                    expired.append(dbref)
+        robots = []
+        for ref in expired:
+            obj = self.db.get(ref)
+            if obj and obj.type == 'agent' and obj.autonomous:
+                robots.append(obj)
+        return robots
+
+    def defer(self, robot: GameObject, timeout: float, delay: float = IDLE_RECHECK,
+              now: Optional[float] = None) -> None:
+        """Put an idle robot back so idle_robots() offers it again after `delay` seconds."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if robot.dbref not in self._robots:
+                self._record(robot.dbref, True, now - timeout + delay)
+
+
+# ─────────────────────────────────────────────────────────────────
+# Command Chains
+# ─────────────────────────────────────────────────────────────────
+
+class CommandChain:
+    """Everything set off, directly or not, by one externally initiated command."""
+    __slots__ = ('id', 'origin', 'command', 'derived', 'aborted')
+
+    def __init__(self, chain_id: int, origin: str, command: str):
+        self.id = chain_id
+        self.origin = origin
+        self.command = command
+        self.derived = 0  # Commands run on behalf of this chain so far
+        self.aborted = False
+
+
+class ChainLink(NamedTuple):
+    """Where a running command sits in its chain."""
+    chain: CommandChain
+    depth: int
+    path: Tuple[Tuple[str, str], ...]  # (executor, command) from the origin down to this command
+
+
+@dataclass
+class ChainTrip:
+    """A chain the circuit breaker stopped."""
+    chain: int
+    origin: str
+    command: str  # What started the chain
+    executor: str  # Who tried to run the command that tripped it
+    reason: str
+    objects: List[str]  # Objects on the path that got it there
+    when: float
+
+
+# The chain of the command running in this thread (or queue entry); None outside any command
+_CHAIN: contextvars.ContextVar = contextvars.ContextVar('mash_chain', default=None)
+
+# (agent_ref, sink) receiving the running command's VR text as it is written (see process_command)
+_STREAM: contextvars.ContextVar = contextvars.ContextVar('mash_stream', default=None)
+
+# Who set off the running command (its trigger_ref: %# and %n, @wait's enactor); None if its executor did
+_TRIGGER: contextvars.ContextVar = contextvars.ContextVar('mash_trigger', default=None)
+
+
+class CircuitBreaker:
+    """
+    Stops softcode loops and trigger storms. Every command a player (or
+    robot, or timer) initiates starts a chain; commands it sets off run one
+    level deeper in the same chain. A chain is aborted when a command would
+    repeat one of its own ancestors (a cycle), go deeper than `max_depth`,
+    or take the chain past `max_commands` in total.
+    """
+
+    def __init__(self, max_depth: int = CHAIN_MAX_DEPTH, max_commands: int = CHAIN_MAX_COMMANDS,
+                 keep: int = CHAIN_TRIP_LOG):
+        self.max_depth = max_depth
+        self.max_commands = max_commands
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.trips: deque = deque(maxlen=keep)  # Most recent ChainTrips, oldest first
+        self.offenders: Dict[str, int] = {}  # object dbref -> chains it helped trip
+
+    def enter(self, executor: str, command: str, parent: Optional[ChainLink]) -> Tuple[Optional[ChainLink], Optional[str]]:
+        """
+        Place a command in its chain. Returns (link, None) if it may run,
+        (None, reason) if it trips the breaker, and (None, None) if its chain
+        was already aborted.
+        """
+        step = (executor, command)
+        if parent is None:
+            return ChainLink(CommandChain(next(self._ids), executor, command), 0, (step,)), None
+
+        chain = parent.chain
+        with self._lock:
+            if chain.aborted:
+                return None, None
+            chain.derived += 1
+            if step in parent.path:
+                reason = f"cycle: `{command[:60]}` ran again inside its own chain"
+            elif parent.depth >= self.max_depth:
+                reason = f"chain went deeper than {self.max_depth} commands"
+            elif chain.derived > self.max_commands:
+                reason = f"chain set off more than {self.max_commands} commands"
+            else:
+                return ChainLink(chain, parent.depth + 1, parent.path + (step,)), None
+
+            chain.aborted = True
+            objects = list(dict.fromkeys(ref for ref, _ in parent.path[1:] + (step,) if ref != chain.origin))
+            for ref in objects:
+                self.offenders[ref] = self.offenders.get(ref, 0) + 1
+            self.trips.append(ChainTrip(chain.id, chain.origin, chain.command, executor, reason, objects, time.time()))
+        return None, reason
+
+
+# ─────────────────────────────────────────────────────────────────
+# Command Queue
+# ─────────────────────────────────────────────────────────────────
+
+@dataclass
+class QueueEntry:
+    """One deferred command. `due` is 0 for commands that run on the next tick."""
+    pid: int
+    executor: str  # Object that runs the command
+    command: str
+    enactor: Optional[str]  # Who set it off (%n, %#)
+    due: float = 0.0
+    link: Optional[ChainLink] = None  # Chain of the command that queued it
+
+
+class CommandQueue:
+    """
+    Deferred softcode commands, after TinyMUSH's queue: a FIFO of commands
+    to run on the next tick plus a heap of @wait entries by due time. Each
+    take() hands out at most `budget` commands, so one chatty object can't
+    stall everyone else. An object with `quota` commands already queued is
+    treated as a runaway and halted.
+    """
+
+    def __init__(self, quota: int = QUEUE_QUOTA, budget: int = QUEUE_TICK_BUDGET):
+        self.quota = quota
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._pids = itertools.count(1)
+        self._entries: Dict[int, QueueEntry] = {}  # pid -> live entry, in queue order
+        self._counts: Dict[str, int] = {}  # executor -> live entries
+        self._ready: deque = deque()  # pids to run; halted pids are skipped
+        self._waiting: List[tuple] = []  # (due, pid) heap; halted pids are skipped
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, executor: str, command: str, enactor: Optional[str] = None,
+            delay: float = 0.0, link: Optional[ChainLink] = None,
+            now: Optional[float] = None) -> Optional[int]:
+        """Queue a command and return its pid, or None if `executor` was over quota (and is now halted)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._counts.get(executor, 0) >= self.quota:
+                self._halt(lambda e: e.executor == executor)
+                return None
+            entry = QueueEntry(next(self._pids), executor, command, enactor, now + delay if delay > 0 else 0.0, link)
+            self._entries[entry.pid] = entry
+            self._counts[executor] = self._counts.get(executor, 0) + 1
+            if entry.due:
+                heapq.heappush(self._waiting, (entry.due, entry.pid))
+            else:
+                self._ready.append(entry.pid)
+            return entry.pid
+
+    def take(self, now: Optional[float] = None) -> List[QueueEntry]:
+        """Remove and return up to `budget` commands that are due, oldest first."""
+        now = time.time() if now is None else now
+        batch = []
+        with self._lock:
+            while self._waiting and self._waiting[0][0] <= now:
+                self._ready.append(heapq.heappop(self._waiting)[1])
+            while self._ready and len(batch) < self.budget:
+                entry = self._entries.pop(self._ready.popleft(), None)
+                if entry:
+                    self._uncount(entry.executor)
+                    batch.append(entry)
+        return batch
+
+    def next_delay(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until something is due: 0 if commands are ready, None if the queue is empty."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if any(pid in self._entries for pid in self._ready):
+                return 0.0
+            while self._waiting and self._waiting[0][1] not in self._entries:
+                heapq.heappop(self._waiting)
+            return max(0.0, self._waiting[0][0] - now) if self._waiting else None
+
+    def halt(self, match: Callable[[QueueEntry], bool]) -> int:
+        """Drop every queued command `match` accepts. Returns how many were dropped."""
+        with self._lock:
+            return self._halt(match)
+
+    def entries(self) -> List[QueueEntry]:
+        """Snapshot of queued commands in pid order."""
+        with self._lock:
+            return list(self._entries.values())
+
+    def _halt(self, match: Callable[[QueueEntry], bool]) -> int:
+        doomed = [e for e in self._entries.values() if match(e)]
+        for entry in doomed:
+            del self._entries[entry.pid]
+            self._uncount(entry.executor)
+        return len(doomed)
+
+    def _uncount(self, executor: str) -> None:
+        left = self._counts.get(executor, 0) - 1
+        if left > 0:
+            self._counts[executor] = left
+        else:
+            self._counts.pop(executor, None)
+
+
+
 class MashEngine:
     """
     The MASH game engine - a dumb orchestrator.
@@ -84,6 +414,21 @@ class MashEngine:
         self.current_snapshot_job: Optional[Dict[str, Any]] = None # {actor, prompt, status, start_time}
         self.snapshot_path = "snapshots"
         
+        # Presence (see PresenceTracker)
+        self.presence = PresenceTracker(db)
+        self._idle_stop = threading.Event()
+        self._idle_thread: Optional[threading.Thread] = None
+
+        # Room reactions ask every smart object at once (see trigger_room_reactions)
+        self._reaction_pool = ThreadPoolExecutor(max_workers=REACTION_WORKERS, thread_name_prefix="mash-react")
+
+        # Softcode-triggered and @wait commands (see CommandQueue)
+        self.queue = CommandQueue()
+        self.breaker = CircuitBreaker()
+        self._queue_wake = threading.Event()
+        self._queue_stop = threading.Event()
+        self._queue_thread: Optional[threading.Thread] = None
+        
         self._register_builtins()
     
     def _register_builtins(self):
@@ -175,7 +520,7 @@ class MashEngine:
             category='Senses', usage='@mind <target>', help='Silent Divinity: Read the persistent facts and current intent of an agent (Wizard only).')
         self.register_command('@purge_buffers', self._cmd_purge_buffers,
             aliases=['@purge_buffer'],
-            category='Senses', help='Wizard only: Clear all agent message buffers to stop ghost echoes.')
+            category='Senses', help='Wizard only: Clear all room event logs to stop ghost echoes.')
         
         # AI Reaction Triggers
         self.register_command('@adesc', self._cmd_set_adesc,
@@ -249,6 +594,16 @@ class MashEngine:
             category='System', usage='help [command]', help='Show help')
         self.register_command('@who', self._cmd_who,
             category='System', help='List all players online')
+        self.register_command('@wait', self._cmd_wait,
+            category='System', usage='@wait <seconds>=<command>', help='Run a command later, from the queue')
+        self.register_command('@ps', self._cmd_ps,
+            category='System', help='List queued commands for you and your objects (wizards see all)')
+        self.register_command('@halt', self._cmd_halt,
+            category='System', usage='@halt [<object>]', help="Clear queued commands for you and your objects, or one object's")
+        self.register_command('@halt/all', self._cmd_halt_all,
+            category='System', help='Clear the whole command queue (wizard)')
+        self.register_command('@breaker', self._cmd_breaker,
+            category='System', help='Report softcode loops and trigger storms the circuit breaker stopped (wizard)')
         
         # Math Commands
         self.register_command('@add', self._cmd_math_add,
@@ -302,6 +657,9 @@ class MashEngine:
         self.register_placeholder('%!', "Actor's Name (the person speaking)")
         self.register_placeholder('%l', "Location Name")
         self.register_placeholder('%#', "Trigger's DBRef")
+        self.register_placeholder('%0', "First wildcard match of a $ or ^ pattern (%1-%9 for the rest)")
+        self.register_placeholder('%r', "Newline")
+        self.register_placeholder('%t', "Tab")
     
     def register_command(self, name: str, handler: Callable, 
                          aliases: List[str] = None, category: str = 'Other',
@@ -448,45 +806,31 @@ class MashEngine:
         if target.startswith('#'):
             return self.db.get(target)
             
-        # 3. Exact Name Match (Priority using index)
-        exact_match_ref = self.db._name_index.get(target)
-        if exact_match_ref:
-            obj = self.db.get(exact_match_ref)
-            if obj:
-                # Security/Context check: Is it in the room, in inventory, or an exit?
-                in_room = obj.dbref in [o.dbref for o in self.db.get_room_contents(agent.location)]
-                is_exit = obj.type == 'exit' and obj.source == agent.location
-                in_inv = obj.dbref in agent.inventory
-                
-                if in_room or is_exit or in_inv:
-                    return obj
-
-        # Fallback to manual scans for aliases and partial matches
-        room_contents = self.db.get_room_contents(agent.location)
-        room_exits = self.db.get_room_exits(agent.location)
+        # 3. Exact Name Match: room contents, then exits, then inventory
+        in_room = self.db.find_by_name(target, location=agent.location)
+        if in_room:
+            return in_room[0]
+        exit_obj = self.db.find_exit_by_name(agent.location, target)
+        if exit_obj and exit_obj.name.lower() == target:
+            return exit_obj
+        inventory = [self.db.get(ref) for ref in agent.inventory]
+        for item in inventory:
+            if item and item.name.lower() == target:
+                return item
 
         # 4. Partial Name Match (Substring for objects, Prefix for exits)
-        # Check room contents
-        for obj in room_contents:
-            if target in obj.name.lower():
-                return obj
+        # Check room contents (n-gram index in crowded rooms)
+        obj = self.db.match_name(agent.location, target)
+        if obj:
+            return obj
                 
-        # Check exits (prefix match is better for movement/navigation)
-        for exit_obj in room_exits:
-            if exit_obj.name.lower().startswith(target):
-                return exit_obj
-            for alias in exit_obj.aliases:
-                if alias.lower().startswith(target):
-                    return exit_obj
-        
-        # Check exits again (substring match for "latter part" typing)
-        for exit_obj in room_exits:
-            if target in exit_obj.name.lower():
-                return exit_obj
+        # Check exits (prefix match is better for movement/navigation, then substring)
+        exit_obj = self.db.match_exit(agent.location, target)
+        if exit_obj:
+            return exit_obj
                     
         # Check inventory
-        for item_ref in agent.inventory:
-            item = self.db.get(item_ref)
+        for item in inventory:
             if item and target in item.name.lower():
                 return item
                 
@@ -548,21 +892,64 @@ class MashEngine:
     # ─────────────────────────────────────────────────────────────
     # Main Entry Point
     # ─────────────────────────────────────────────────────────────
-    
-    def process_command(self, agent_ref: str, raw_input: str, trigger_ref: str = None) -> CommandResult:
+
+    def process_command(self, agent_ref: str, raw_input: str, trigger_ref: str = None,
+                        on_text: Optional[Callable[[str], None]] = None,
+                        chain: Optional[ChainLink] = None) -> CommandResult:
         """
         Process a command from an agent.
         
         trigger_ref: The dbref of the agent who triggered this (optional).
+        on_text: Receives this agent's VR scenes and Dungeon Master replies as
+        they are written; the CommandResult still carries the finished text.
+        chain: The chain a queued command joins (see run_queue).
         Returns a CommandResult with the output message and context for AI.
+        Commands run inside another command join its chain (see CircuitBreaker).
+        Each command not run from inside another one ends with one db.commit().
         """
+        outermost = _CHAIN.get() is None
+        parent = chain if outermost else _CHAIN.get()
+        link, tripped = self.breaker.enter(agent_ref, raw_input.strip(), parent)
+        if link is None:
+            if not tripped:
+                return CommandResult(False, "")  # Its chain was already stopped
+            stopped = parent.chain
+            self.queue.halt(lambda e: e.link is not None and e.link.chain is stopped)
+            print(f"[MASH] Circuit breaker: chain {stopped.id} from {stopped.origin} "
+                  f"(`{stopped.command[:60]}`) stopped at {agent_ref}: {tripped}")
+            return CommandResult(False, f"⚡ Circuit breaker: {tripped}. The chain was stopped.")
+
+        token = _CHAIN.set(link)
+        trigger = _TRIGGER.set(trigger_ref)
+        stream = _STREAM.set((agent_ref, on_text)) if on_text else None
+        try:
+            return self._run_command(agent_ref, raw_input, trigger_ref)
+        finally:
+            if stream:
+                _STREAM.reset(stream)
+            _TRIGGER.reset(trigger)
+            _CHAIN.reset(token)
+            if outermost:
+                self._commit()
+
+    @staticmethod
+    def _stream_sink(agent_ref: str) -> Optional[Callable[[str], None]]:
+        """The on_text sink of the command being run, if it was issued by this agent."""
+        stream = _STREAM.get()
+        return stream[1] if stream and stream[0] == agent_ref else None
+
+    def _commit(self) -> None:
+        """Make the changes of the command that just finished durable (journal fsync, SQLite commit)."""
+        try:
+            self.db.commit()
+        except Exception as e:
+            print(f"[MASH] Commit failed: {e}")
+
+    def _run_command(self, agent_ref: str, raw_input: str, trigger_ref: str = None) -> CommandResult:
         raw_input = raw_input.strip()
         if not raw_input:
             return CommandResult(False, "")
             
-        # Store trigger_ref for placeholder evaluation during this command
-        self._current_trigger = trigger_ref
-        
         # Pre-fetch agent to avoid UnboundLocalError later
         agent = self.db.get_agent(agent_ref)
         
@@ -617,9 +1004,16 @@ class MashEngine:
                             }
                             
                             # Using a dedicated AI method for this "World Weaving"
-                            new_desc = self.ai.evolve_room(context)
+                            new_desc = self.ai.evolve_room(context, on_text=self._stream_sink(agent_ref))
                             
                             if new_desc:
+                                # Capture any embedded [vr_desc] / [vr_title] commands, then strip
+                                # them so the result matches what was streamed
+                                self.capture_robot_intent(agent_ref, new_desc)
+                                new_desc = re.sub(r'\[vr_desc [^\]]+\]', '', new_desc)
+                                new_desc = re.sub(r'\[vr_title [^\]]+\]', '', new_desc)
+                                new_desc = re.sub(r'\[scene_change\]', '', new_desc, flags=re.IGNORECASE).strip()
+
                                 # 3. Save subjective state (Shadow DOM)
                                 loc.attrs[vr_key] = new_desc
                                 
@@ -667,7 +1061,7 @@ class MashEngine:
                         'vr_intent': vr_intent
                     }
                     
-                    new_desc = self.ai.evolve_room(context)
+                    new_desc = self.ai.evolve_room(context, on_text=self._stream_sink(agent_ref))
                     if new_desc:
                         # Capture any embedded [vr_desc] commands from AI
                         self.capture_robot_intent(agent_ref, new_desc)
@@ -701,7 +1095,8 @@ class MashEngine:
                         'vr_intent': vr_intent
                     }
                     
-                    reaction = self.ai.react_to_vr(reaction_context)
+                    sink = self._stream_sink(agent_ref)
+                    reaction = self.ai.react_to_vr(reaction_context, on_text=sink)
                     if reaction:
                         # Check for [scene_change] signal - DM wants Architect to rebuild
                         if '[scene_change]' in reaction.lower():
@@ -713,7 +1108,8 @@ class MashEngine:
                                 'vr_memo': vr_memo,
                                 'vr_intent': vr_intent
                             }
-                            new_desc = self.ai.evolve_room(evolve_context)
+                            if sink: sink("\n\n---\n\n")
+                            new_desc = self.ai.evolve_room(evolve_context, on_text=sink)
                             if new_desc:
                                 # Capture any embedded commands from Architect
                                 self.capture_robot_intent(agent_ref, new_desc)
@@ -782,225 +1178,147 @@ class MashEngine:
         agent = self.db.get_agent(agent_ref)
         if not agent: return None
         
-        # Collect all objects in the vicinity
-        loc_contents = self.db.get_room_contents(agent.location)
-        # Include the room itself, the player, and items in the room
-        candidates = [self.db.get(agent.location)] + loc_contents
+        # The room itself, the player, and items in the room, precompiled (see TriggerTable)
+        # Glob matching is case-insensitive; the first match in room order wins
+        trigger = self.db.trigger_table(agent.location).first_command(raw_input.lower())
+        if not trigger:
+            return None
         
-        import fnmatch
+        # Wildcard extraction: %0-%9 are what each wildcard matched (the whole input if there are none)
+        captures = trigger.captures(raw_input) or [raw_input]
         
-        for obj in candidates:
-            if not obj or not getattr(obj, 'listening', False):
-                continue
-            
-            for attr_name, attr_val in obj.attrs.items():
-                if attr_val.startswith('$') and ':' in attr_val:
-                    pattern, action = attr_val[1:].split(':', 1)
-                    # Use fnmatch for case-insensitive glob matching
-                    if fnmatch.fnmatch(raw_input.lower(), pattern.lower()):
-                        # Wildcard extraction (simple version)
-                        # We try to map words to %0..%9
-                        words = raw_input.split()
-                        pat_words = pattern.split()
-                        
-                        # Wildcard extraction: %0 is everything after the pattern prefix
-                        expanded_action = action
-                        if '*' in pattern:
-                            expanded_action = expanded_action.replace('%0', raw_input)
-                        
-                        # Process the action through placeholders
-                        # Executor is the object (obj), Trigger is the player (agent_ref)
-                        final_action = self._substitute_placeholders(obj.dbref, expanded_action, agent_ref)
-                        # Execute!
-                        return self.process_command(obj.dbref, final_action, agent_ref)
-        
-        return None
+        # Process the action through placeholders
+        # Executor is the object (obj), Trigger is the player (agent_ref)
+        final_action = self._substitute_placeholders(trigger.obj, trigger.action, agent_ref, captures)
+        # Execute!
+        return self.process_command(trigger.obj, final_action, agent_ref)
 
     def _trigger_listen_patterns(self, agent_ref: str, text: str):
         """Broadcast text to all listening objects in the room for ^pattern:action matches."""
         agent = self.db.get(agent_ref)
         if not agent or not agent.location: return
         
-        loc_contents = self.db.get_room_contents(agent.location)
-        candidates = [self.db.get(agent.location)] + loc_contents
-        
-        import fnmatch
-        
-        for obj in candidates:
-            if not obj or not getattr(obj, 'listening', False):
-                continue
-                
-            for attr_name, attr_val in obj.attrs.items():
-                if attr_val.startswith('^') and ':' in attr_val:
-                    pattern, action = attr_val[1:].split(':', 1)
-                    if fnmatch.fnmatch(text.lower(), pattern.lower()):
-                        # Expand %0 as the full text heard
-                        expanded_action = action.replace('%0', text)
-                        # Executor is the object (obj), Trigger is the player (agent_ref)
-                        final_action = self._substitute_placeholders(obj.dbref, expanded_action, agent_ref)
-                        # Execute in background
-                        self.process_command(obj.dbref, final_action, agent_ref)
+        # Which triggers fire is decided up front, from one match pass (see TriggerTable)
+        for trigger in self.db.trigger_table(agent.location).listeners(text.lower()):
+            # %0-%9 are what each wildcard matched (the full text heard if there are none)
+            captures = trigger.captures(text) or [text]
+            # Executor is the object (obj), Trigger is the player (agent_ref)
+            final_action = self._substitute_placeholders(trigger.obj, trigger.action, agent_ref, captures)
+            # Runs from the queue, after the speaker's own command
+            self.queue_command(trigger.obj, final_action, agent_ref)
         
     def _evaluate_functions(self, agent_ref: str, text: str, context_ref: str = None) -> str:
         """
         Evaluate MUSH-style functions [func(args)].
         Supported: rand(n), pick(list, sep), v(attr), get(target/attr), add, sub, mul, div, math(expr).
+        Text is compiled once and cached (see softcode.py).
         """
         if not text or '[' not in text:
             return text
-            
-        def replacer(match):
-            content = match.group(1).strip()
-            if '(' not in content:
-                return f"[{content}]" # Not a function call
-            
-            try:
-                # Find the first '(' to separate function name
-                split_idx = content.find('(')
-                if split_idx == -1: return f"[{content}]"
-                
-                func_name = content[:split_idx].lower().strip()
-                args_str = content[split_idx+1:].strip()
-                
-                # Balancing logic: Find the closing paren that matches the first open paren
-                paren_depth = 1
-                closing_idx = -1
-                for i, char in enumerate(args_str):
-                    if char == '(': paren_depth += 1
-                    elif char == ')': paren_depth -= 1
-                    
-                    if paren_depth == 0:
-                        closing_idx = i
-                        break
-                
-                if closing_idx != -1:
-                    # Capture everything before the matching paren
-                    args_inside = args_str[:closing_idx]
-                    # The rest is ignored or part of a larger string
-                    args_str = args_inside
-                elif args_str.endswith(')'):
-                    # Fallback for simple cases if depth check fails
-                    args_str = args_str[:-1]
-                
-                # Smart split by comma (ignore commas inside nested parens)
-                args = []
-                curr = []
-                depth = 0
-                for c in args_str:
-                    if c == ',' and depth == 0:
-                        args.append("".join(curr).strip())
-                        curr = []
-                    else:
-                        if c == '(': depth += 1
-                        elif c == ')': depth -= 1
-                        curr.append(c)
-                if curr:
-                    args.append("".join(curr).strip())
-                
-                # Pre-evaluate arguments recursively (allows nested functions)
-                eval_args = []
-                for a in args:
-                    if '(' in a and ')' in a:
-                         # Wrap and recurse
-                         eval_args.append(self._evaluate_functions(agent_ref, f"[{a}]", context_ref))
-                    else:
-                         eval_args.append(a)
-                
-                args = eval_args
-                agent = self.db.get_agent(agent_ref)
-                ctx_obj = self.db.get(context_ref or agent_ref)
-                
-                # --- FUNCTION DISPATCH ---
-                if func_name == 'rand':
-                    n = int(args[0]) if args[0].isdigit() else 20
-                    return str(random.randint(0, n-1)) if n > 0 else "0"
-                elif func_name == 'pick':
-                    sep = args[1] if len(args) > 1 else '|'
-                    items = args[0].split(sep)
-                    return random.choice(items).strip() if items else ""
-                elif func_name == 'v':
-                    attr = args[0]
-                    return ctx_obj.attrs.get(attr, "") if ctx_obj else ""
-                elif func_name == 'get':
-                    target_attr = args[0]
-                    if '/' in target_attr:
-                        t_ref, t_attr = target_attr.split('/', 1)
-                        target = self.match_object(agent_ref, t_ref)
-                        if target:
-                            return str(target.attrs.get(t_attr, ""))
-                    return ""
-                
-                # Math Functions
-                elif func_name == 'add':
-                    res = float(args[0]) + float(args[1])
-                    return str(int(res)) if res.is_integer() else str(res)
-                elif func_name == 'sub':
-                    res = float(args[0]) - float(args[1])
-                    return str(int(res)) if res.is_integer() else str(res)
-                elif func_name == 'mul':
-                    res = float(args[0]) * float(args[1])
-                    return str(int(res)) if res.is_integer() else str(res)
-                elif func_name == 'div':
-                    b = float(args[1])
-                    if b == 0: return "#DIV/0!"
-                    res = float(args[0]) / b
-                    return str(int(res)) if res.is_integer() else str(res)
-                
-                elif func_name == 'math':
-                    # Safe evaluation of simple math expressions
-                    expr = args[0]
-                    # Sanitize: allow numbers and basic operators
-                    if re.match(r'^[0-9\.\+\-\*\/\(\)\s]+$', expr):
-                        try:
-                            # Use eval carefully on sanitized string
-                            res = eval(expr, {"__builtins__": None}, {})
-                            return str(int(res)) if isinstance(res, (int, float)) and hasattr(res, 'is_integer') and res.is_integer() else str(res)
-                        except:
-                            return "#MATH_ERR!"
-                    return "#NAN!"
-
-                # Date/Time
-                elif func_name in ['date', 'time', 'datetime']:
-                    if func_name == 'date': return datetime.now().strftime('%A, %B %d, %Y')
-                    if func_name == 'time': return datetime.now().strftime('%I:%M %p').lstrip('0')
-                    return datetime.now().strftime('%A, %B %d, %Y at %I:%M %p').replace(' 0', ' ')
-
-            except Exception:
-                return f"!!{func_name}_err!!"
-                
-            return f"[{content}]"
+        return softcode.evaluate(text, lambda name, args: self._call_function(agent_ref, context_ref, name, args))
+
+    def _call_function(self, agent_ref: str, context_ref: Optional[str], func_name: str, args: List[str]) -> Optional[str]:
+        """Run one softcode function on evaluated args. None means no such function."""
+        # --- FUNCTION DISPATCH ---
+        if func_name == 'rand':
+            n = int(args[0]) if args[0].isdigit() else 20
+            return str(random.randint(0, n-1)) if n > 0 else "0"
+        elif func_name == 'pick':
+            sep = args[1] if len(args) > 1 else '|'
+            items = args[0].split(sep)
+            return random.choice(items).strip() if items else ""
+        elif func_name == 'v':
+            attr = args[0]
+            ctx_obj = self.db.get(context_ref or agent_ref)
+            return ctx_obj.attrs.get(attr, "") if ctx_obj else ""
+        elif func_name == 'get':
+            target_attr = args[0]
+            if '/' in target_attr:
+                t_ref, t_attr = target_attr.split('/', 1)
+                target = self.match_object(agent_ref, t_ref)
+                if target:
+                    return str(target.attrs.get(t_attr, ""))
+            return ""
 
-        # Safe recursion depth
-        for _ in range(5):
-            new_text = re.sub(r'\[([^\[\]]+)\]', replacer, text)
-            if new_text == text:
-                break
-            text = new_text
-            
-        return text
+        # Math Functions
+        elif func_name == 'add':
+            res = float(args[0]) + float(args[1])
+            return str(int(res)) if res.is_integer() else str(res)
+        elif func_name == 'sub':
+            res = float(args[0]) - float(args[1])
+            return str(int(res)) if res.is_integer() else str(res)
+        elif func_name == 'mul':
+            res = float(args[0]) * float(args[1])
+            return str(int(res)) if res.is_integer() else str(res)
+        elif func_name == 'div':
+            b = float(args[1])
+            if b == 0: return "#DIV/0!"
+            res = float(args[0]) / b
+            return str(int(res)) if res.is_integer() else str(res)
+
+        elif func_name == 'math':
+            # Safe evaluation of simple math expressions
+            expr = args[0]
+            # Sanitize: allow numbers and basic operators
+            if re.match(r'^[0-9\.\+\-\*\/\(\)\s]+$', expr):
+                try:
+                    # Use eval carefully on sanitized string
+                    res = eval(expr, {"__builtins__": None}, {})
+                    return str(int(res)) if isinstance(res, (int, float)) and hasattr(res, 'is_integer') and res.is_integer() else str(res)
+                except:
+                    return "#MATH_ERR!"
+            return "#NAN!"
+
+        # Date/Time
+        elif func_name in ['date', 'time', 'datetime']:
+            if func_name == 'date': return datetime.now().strftime('%A, %B %d, %Y')
+            if func_name == 'time': return datetime.now().strftime('%I:%M %p').lstrip('0')
+            return datetime.now().strftime('%A, %B %d, %Y at %I:%M %p').replace(' 0', ' ')
+
+        return None
 
-    def _substitute_placeholders(self, agent_ref: str, text: str, trigger_override: str = None) -> str:
+    def _substitute_placeholders(self, agent_ref: str, text: str, trigger_override: str = None,
+                                 captures: Optional[List[str]] = None) -> str:
         """
         Substitute MUSH-style placeholders and functions in text.
-        %n - trigger name, %! - actor name, %l - location name, %# - trigger dbref
+        %n - trigger name, %! - actor name, %l - location name, %# - trigger dbref,
+        %0-%9 - pattern captures, %r - newline, %t - tab
         [func(args)] - function evaluation
+        Codes are substituted in one pass (see softcode.compile_placeholders),
+        looking up only what the text uses.
         """
         if not text: return ""
+        if '%' not in text and '[' not in text: return text
         
         # Determine actor and trigger
         actor = self.db.get(agent_ref)
-        trigger_ref = trigger_override or self._current_trigger or agent_ref
-        trigger = self.db.get(trigger_ref)
-        
         if not actor: return text
-        
-        # Basic substitutions
-        text = text.replace('%!', actor.name)
-        text = text.replace('%n', trigger.name if trigger else "Someone")
-        text = text.replace('%#', trigger_ref)
-        
-        location = self.db.get(actor.location)
-        text = text.replace('%l', location.name if location else "Nowhere")
+        trigger_ref = trigger_override or _TRIGGER.get() or agent_ref
+        
+        template, codes = softcode.compile_placeholders(text) if '%' in text else (text, ())
+        if codes:
+            values = []
+            for code in codes:
+                if code == 'n':
+                    trigger = self.db.get(trigger_ref)
+                    values.append(trigger.name if trigger else "Someone")
+                elif code == '!':
+                    values.append(actor.name)
+                elif code == '#':
+                    values.append(trigger_ref)
+                elif code == 'l':
+                    location = self.db.get(actor.location)
+                    values.append(location.name if location else "Nowhere")
+                elif code in 'rR':
+                    values.append("\n")
+                elif code in 'tT':
+                    values.append("\t")
+                elif captures is None:
+                    values.append('%' + code)  # Not from a pattern: positional codes stay as written
+                else:
+                    i = int(code)
+                    values.append(captures[i] if i < len(captures) else "")
+            text = template.format(*values)
         
         # Evaluate functions
         return self._evaluate_functions(agent_ref, text, trigger_ref)
@@ -1055,7 +1373,7 @@ class MashEngine:
                     'vr_intent': vr_intent
                 }
                 
-                new_desc = self.ai.evolve_room(context)
+                new_desc = self.ai.evolve_room(context, on_text=self._stream_sink(agent_ref))
                 if new_desc:
                     # Capture any embedded [vr_desc] / [vr_title] commands
                     self.capture_robot_intent(agent_ref, new_desc)
@@ -1081,17 +1399,10 @@ class MashEngine:
         
         # List other contents
         # Filter Offline Players and Add Metadata
-        import time
         now = time.time()
         
         raw_others = [a for a in self.db.get_room_contents(loc.dbref) if a.dbref != agent_ref]
-        visible = []
-        for o in raw_others:
-            if o.type == 'agent' and not getattr(o, 'autonomous', False):
-                 last = getattr(o, 'last_interaction', 0)
-                 # elapsed = now - last
-                 if (now - last) > 300: continue
-            visible.append(o)
+        visible = [o for o in raw_others if o.type != 'agent' or self.presence.is_online(o, now)]
 
         if visible:
             lines.append("")
@@ -1161,7 +1472,7 @@ class MashEngine:
                 }
                 
                 # Use AI to describe what the player sees
-                imagined_desc = self.ai.evolve_room(context)
+                imagined_desc = self.ai.evolve_room(context, on_text=self._stream_sink(agent.dbref))
                 if imagined_desc:
                     # Capture any embedded [vr_desc] / [vr_title] commands
                     self.capture_robot_intent(agent.dbref, imagined_desc)
@@ -1448,16 +1759,8 @@ class MashEngine:
             
         # Move to inventory
         agent.inventory.append(target.dbref)
-        # Update target location
-        target.location = agent_ref
-        if agent.location in self.db._location_index:
-            if target.dbref in self.db._location_index[agent.location]:
-                self.db._location_index[agent.location].remove(target.dbref)
-        
-        # Add to agent's location index (for contents tracking)
-        if target.location not in self.db._location_index:
-            self.db._location_index[target.location] = []
-        self.db._location_index[target.location].append(target.dbref)
+        # Update target location (the database keeps the location index in step)
+        self.db.move_agent(target.dbref, agent_ref)
         
         return CommandResult(
             True, 
@@ -1486,17 +1789,7 @@ class MashEngine:
         # Move from inventory to room
         agent.inventory.remove(target.dbref)
         
-        # Remove from agent's location index
-        if target.location in self.db._location_index:
-            if target.dbref in self.db._location_index[target.location]:
-                self.db._location_index[target.location].remove(target.dbref)
-                
-        target.location = agent.location
-        
-        # Update indices
-        if target.location not in self.db._location_index:
-            self.db._location_index[target.location] = []
-        self.db._location_index[target.location].append(target.dbref)
+        self.db.move_agent(target.dbref, agent.location)
         
         return CommandResult(
             True, 
@@ -1799,17 +2092,7 @@ class MashEngine:
         item.owner = recipient.dbref 
         
         # Update Location & Index (Critical for lookups)
-        if item.location in self.db._location_index:
-            if item.dbref in self.db._location_index[item.location]:
-                self.db._location_index[item.location].remove(item.dbref)
-        
-        item.location = recipient.dbref
-        
-        if recipient.dbref not in self.db._location_index:
-            self.db._location_index[recipient.dbref] = []
-        self.db._location_index[recipient.dbref].append(item.dbref)
-
-        self.db.save(WORLD_FILE)
+        self.db.move_agent(item.dbref, recipient.dbref)
         
         return CommandResult(True, f"You gave {item.name} to {recipient.name}.", 
                              message_3p=f"{agent.name} gave {item.name} to {recipient.name}.")
@@ -1943,28 +2226,37 @@ Custom commands that trigger when someone types a specific phrase.
 Format: `&ATTR <obj>=$pattern:action`
 - Example (Greeter): `&GREET Statue=$hi:say Hello, %n!`
 - Example (Magic 8-Ball): `&SHAKE Ball=$shake:emit The ball says: [pick(Yes!|No.|Perhaps...)]`
+- Example (Vending Machine): `&BUY Machine=$buy *:emit The machine drops a %0 for %n.`
 
 **3. Listen Patterns (^)**
 Ambient triggers that react to speech or emotes in the room.
 Format: `&ATTR <obj>=^pattern:action`
 - Example (Watcher): `&WATCH Eyes=^waves:emit The eyes follow %n's movement.`
 - Example (Parrot): `&ECHO Parrot=^*:say %0!`
+Triggered actions run from the command queue, just after the speech that set them off.
 
 **4. Wildcards & Placeholders**
-- `%0`: The full text matched by the pattern.
+- `%0`-`%9`: What each `*` or `?` in the pattern matched, in order. With no wildcards, `%0` is the whole text.
 - `%n`: Name of the player who triggered it.
 - `%!`: Name of the object performing the action.
 - `%#`: DBRef of the trigger.
 - `%l`: Location Name.
+- `%r`, `%t`: Newline and tab.
 
-**5. Functions**
+**5. Delays & the Queue**
+- `@wait <seconds>=<command>`: Run a command later (works inside actions too).
+- `@ps`: See what you and your objects have queued.
+- `@halt [<object>]`: Stop queued commands. An object that queues too many at once is halted automatically.
+- Loops are cut off: a chain of triggered commands that repeats itself, runs more than 20 deep or sets off more than 200 commands is stopped, and wizards can review it with `@breaker`.
+
+**6. Functions**
 Inject logic into actions using `[function()]` syntax.
 - `rand(n)`: Random number from 0 to n-1.
 - `pick(list)`: Pick a random item from a `|` delimited list.
 - `v(attr)`: Get value of an attribute on the object itself.
 - `get(obj/attr)`: Get attribute value from another object.
 
-**6. Scripting Blocks ({ })**
+**7. Scripting Blocks ({ })**
 You can paste multiple commands or execute complex scripts by wrapping them in Curly Braces `{ }`. Inside a block, commands can be separated by newlines or semicolons `;`.
 - Example: 
 ```
@@ -1986,8 +2278,8 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
             ('building', 'Creating and configuring objects (@create, @dig, @set, @ai_ok, @search_ok)'),
             ('ownership', 'Permissions and locks (@lock, @chown, examine)'),
             ('functions', 'Inline functions for softcode ([rand], [pick], [v], [get])'),
-            ('placeholders', 'Dynamic substitution codes (%n, %!, %l, %#)'),
-            ('system', 'System commands (@who, @deep_research, help)'),
+            ('placeholders', 'Dynamic substitution codes (%n, %!, %l, %#, %0-%9, %r, %t)'),
+            ('system', 'System commands (@who, @wait, @ps, @halt, @deep_research, help)'),
             ('softcode', 'Guide to programmable triggers ($ and ^ patterns)'),
         ]
         
@@ -2023,7 +2315,7 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
         if category == 'Admin':
             cmds = [
                 "  `@who` — List all connected players",
-                "  `@dump` — Save world state to disk",
+                "  `@dump [json|binary]` — Save world state to disk (a format also exports a full copy)",
                 "  `@reload` — Reload world from disk (discards unsaved changes)",
                 "  `@boot <player>` — Disconnect a player (wizard only)",
             ]
@@ -2807,31 +3099,46 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
         smart_objs = [obj for obj in self.db.get_room_contents(room_ref) 
                      if (obj.ai_ok or obj.robot) and obj.dbref != actor_ref]
         
-        results = []
+        # Special logic for Robots: If everyone left, they might want to follow or go home
+        is_empty = len([a for a in self.db.get_room_contents(room_ref) if a.type == 'agent' and not a.robot]) == 0
+        
+        # We explicitly mention if the player is now GONE from the room
+        event_prefix = ""
+        if "has left" in last_action or "PRESENCE_DEPARTURE" in last_action:
+            event_prefix = "[PLAYER LEAVING] "
+        
+        # 1. Ask every object at once. Contexts are built up front, so each one
+        #    reacts to the same room state.
+        pending = []
         for obj in smart_objs:
-            # Special logic for Robots: If everyone left, they might want to follow or go home
-            is_empty = len([a for a in self.db.get_room_contents(room_ref) if a.type == 'agent' and not a.robot]) == 0
-            
             # Get AI context for this object's reaction
             ctx = self.get_ai_context(actor_ref, obj.dbref, 'reaction')
             
             # Inject Conversation Urgency into Context for AI Prompt
             ctx['conversation_depth'] = turns_remaining
             
-            # Ask the AI for a response to the specific 'last_action'
-            # We explicitly mention if the player is now GONE from the room
-            event_prefix = ""
-            if "has left" in last_action or "PRESENCE_DEPARTURE" in last_action:
-                event_prefix = "[PLAYER LEAVING] "
+            search_mode = 'grounding' if getattr(obj, 'search_ok', False) else None
+            # Robots get full agency (Narrative + Commands); objects only add atmosphere
+            ask = self.ai.get_reactive_action if obj.robot else self.ai.get_atmospheric_flavor
+            pending.append((obj, self._reaction_pool.submit(ask, ctx, f"{event_prefix}{last_action}", search_mode=search_mode)))
+        
+        # 2. Apply the answers in room order, so history and robot commands
+        #    come out the same however the calls finished.
+        deadline = time.monotonic() + REACTION_TIMEOUT
+        results = []
+        for obj, future in pending:
+            try:
+                ai_output = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                future.cancel()
+                print(f"[MASH] Reaction from {obj.name} ({obj.dbref}) timed out")
+                continue
+            except Exception as e:
+                print(f"[MASH] Reaction from {obj.name} ({obj.dbref}) failed: {e}")
+                continue
             
             # --- BRANCH: Robot (Agency) OR Object (Atmosphere) ---
             if obj.robot:
-                search_mode = None
-                if getattr(obj, 'search_ok', False): search_mode = 'grounding'
-                
-                # 1. Robots get full agency (Narrative + Commands)
-                ai_output = self.ai.get_reactive_action(ctx, f"{event_prefix}{last_action}", search_mode=search_mode)
-                
                 # If AI returned [idle], skip
                 if '[idle]' in ai_output.lower():
                     # If room is empty and robot is alone, they might decide to go home autonomously
@@ -2860,13 +3167,8 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
                     'intent_messages': intent_msgs
                 })
             else:
-                # 2. Passive Objects (Atmosphere Only, No Commands)
-                # Check for search grounding on objects (e.g., Magic 8-Ball as Oracle)
-                obj_search_mode = None
-                if getattr(obj, 'search_ok', False): obj_search_mode = 'grounding'
-                
-                atmosphere = self.ai.get_atmospheric_flavor(ctx, f"{event_prefix}{last_action}", search_mode=obj_search_mode)
-                
+                # Passive Objects (Atmosphere Only, No Commands)
+                atmosphere = ai_output
                 if atmosphere and '[idle]' not in atmosphere.lower():
                     clean_flavor = re.sub(r'\[.*?\]', '', atmosphere).strip()
                     if clean_flavor:
@@ -3157,11 +3459,7 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
             return CommandResult(False, f"You don't own **{target.name}**.")
             
         old_name = target.name
-        target.name = new_name
-        
-        # Re-index if name changed
-        if old_name.lower() != new_name.lower():
-            self.db.rebuild_indices()
+        target.name = new_name  # Name and exit indices follow via the database change hook
             
         return CommandResult(
             True, 
@@ -3280,18 +3578,15 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
         return CommandResult(True, report, context={'category': 'System'})
 
     def _cmd_purge_buffers(self, agent_ref: str, args: str) -> CommandResult:
-        """Wizard only: Clear all agent message buffers."""
+        """Wizard only: Clear all room event logs."""
         agent = self.db.get_agent(agent_ref)
         if not agent: return CommandResult(False, "You don't exist!")
         if not agent.wizard: return CommandResult(False, "Permission denied.")
         
-        count = 0
-        for obj in self.db.objects.values():
-            if obj.type == 'agent' and hasattr(obj, 'message_buffer') and obj.message_buffer:
-                obj.message_buffer = []
-                count += 1
+        with self.db._lock:
+            count = self.db.events.clear()
         
-        return CommandResult(True, f"Purged message buffers for {count} agents. Ghost threads severed.", context={'category': 'System'})
+        return CommandResult(True, f"Purged event logs for {count} rooms. Ghost threads severed.", context={'category': 'System'})
 
     def _cmd_destroy(self, agent_ref: str, args: str) -> CommandResult:
         """Permanently delete an object and get a token refund."""
@@ -3437,17 +3732,7 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
             agent.inventory.remove(item.dbref)
             target.inventory.append(item.dbref)
             
-            # Update Location Index logic
-            if item.location in self.db._location_index:
-                if item.dbref in self.db._location_index[item.location]:
-                    self.db._location_index[item.location].remove(item.dbref)
-            
-            item.location = target.dbref
-            
-            # Add to new location index
-            if target.dbref not in self.db._location_index:
-                self.db._location_index[target.dbref] = []
-            self.db._location_index[target.dbref].append(item.dbref)
+            self.db.move_agent(item.dbref, target.dbref)
             
             return CommandResult(
                 True,
@@ -3778,16 +4063,8 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
 
     def _cmd_who(self, agent_ref: str, args: str) -> CommandResult:
         """List connected agents."""
-        import time
-        now = time.time()
-        
         # For our singleton model, we list human agents active in the last 5 minutes
-        agents = []
-        for obj in self.db.objects.values():
-            if obj.type == 'agent' and not obj.autonomous:
-                last = getattr(obj, 'last_interaction', 0)
-                if (now - last) <= 300: # 5 minutes
-                    agents.append(obj)
+        agents = self.presence.online()
         
         if not agents:
             return CommandResult(True, "### 👥 Online Users\nNo active users.")
@@ -3803,6 +4080,110 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
             
         return CommandResult(True, msg)
 
+    # ─────────────────────────────────────────────────────────────
+    # Command Queue Commands
+    # ─────────────────────────────────────────────────────────────
+
+    def _owns_queue_entry(self, agent_ref: str, entry: QueueEntry) -> bool:
+        """An entry is yours if you or one of your objects runs it."""
+        if entry.executor == agent_ref:
+            return True
+        obj = self.db.get(entry.executor)
+        return bool(obj and obj.owner == agent_ref)
+
+    def _cmd_wait(self, agent_ref: str, args: str) -> CommandResult:
+        """Queue a command to run after a delay."""
+        if '=' not in args:
+            return CommandResult(False, "Usage: `@wait <seconds>=<command>`")
+        secs, command = args.split('=', 1)
+        command = command.strip()
+        try:
+            delay = float(secs.strip())
+        except ValueError:
+            return CommandResult(False, f"'{secs.strip()}' isn't a number of seconds.")
+        if delay < 0 or not command:
+            return CommandResult(False, "Usage: `@wait <seconds>=<command>`")
+
+        pid = self.queue_command(agent_ref, command, _TRIGGER.get() or agent_ref, delay)
+        if pid is None:
+            return CommandResult(False, "⛔ Too many queued commands. Your queue has been halted.")
+        return CommandResult(True, f"⏳ Queued (pid {pid}), runs in {delay:g}s.")
+
+    def _cmd_ps(self, agent_ref: str, args: str) -> CommandResult:
+        """List queued commands."""
+        agent = self.db.get_agent(agent_ref)
+        if not agent: return CommandResult(False, "You don't exist!")
+
+        entries = self.queue.entries()
+        if not getattr(agent, 'wizard', False):
+            entries = [e for e in entries if self._owns_queue_entry(agent_ref, e)]
+        if not entries:
+            return CommandResult(True, "### ⏱️ Queue\nNothing queued.")
+
+        now = time.time()
+        lines = [f"### ⏱️ Queue ({len(entries)})"]
+        for e in entries[:50]:
+            obj = self.db.get(e.executor)
+            who = f"{obj.name} ({e.executor})" if obj else e.executor
+            when = f"in {max(0.0, e.due - now):.1f}s" if e.due else "next tick"
+            lines.append(f"- `{e.pid}` **{who}** [{when}]: `{e.command[:80]}`")
+        if len(entries) > 50:
+            lines.append(f"- ...and {len(entries) - 50} more")
+        return CommandResult(True, "\n".join(lines))
+
+    def _cmd_halt(self, agent_ref: str, args: str) -> CommandResult:
+        """Clear queued commands for yourself and your objects, or for one object."""
+        if not args.strip():
+            count = self.queue.halt(lambda e: self._owns_queue_entry(agent_ref, e))
+            return CommandResult(True, f"🛑 Halted {count} queued command(s).")
+
+        target = self.match_object(agent_ref, args.strip())
+        if not target:
+            return CommandResult(False, f"I don't see '{args.strip()}' here.")
+        if not self.can_modify(agent_ref, target):
+            return CommandResult(False, "Permission denied.")
+        count = self.queue.halt(lambda e: e.executor == target.dbref)
+        return CommandResult(True, f"🛑 Halted {count} queued command(s) for **{target.name}**.")
+
+    def _cmd_halt_all(self, agent_ref: str, args: str) -> CommandResult:
+        """Wizard only: clear the whole command queue."""
+        agent = self.db.get_agent(agent_ref)
+        if not agent: return CommandResult(False, "You don't exist!")
+        if not agent.wizard: return CommandResult(False, "Permission denied.")
+        count = self.queue.halt(lambda e: True)
+        return CommandResult(True, f"🛑 Halted all {count} queued command(s).")
+
+    def _cmd_breaker(self, agent_ref: str, args: str) -> CommandResult:
+        """Wizard only: report objects whose chains tripped the circuit breaker."""
+        agent = self.db.get_agent(agent_ref)
+        if not agent: return CommandResult(False, "You don't exist!")
+        if not agent.wizard: return CommandResult(False, "Permission denied.")
+
+        def label(ref: str) -> str:
+            obj = self.db.get(ref)
+            return f"{obj.name} ({ref})" if obj else ref
+
+        breaker = self.breaker
+        lines = ["### ⚡ Circuit Breaker",
+                 f"Limits: {breaker.max_depth} deep, {breaker.max_commands} commands per chain."]
+        if not breaker.trips:
+            lines.append("No chains have been stopped.")
+            return CommandResult(True, "\n".join(lines))
+
+        lines.append("\n**Offending objects:**")
+        worst = sorted(breaker.offenders.items(), key=lambda kv: -kv[1])[:20]
+        for ref, count in worst:
+            obj = self.db.get(ref)
+            owner = f", owned by {label(obj.owner)}" if obj and obj.owner else ""
+            lines.append(f"- **{label(ref)}**{owner}: {count} chain(s)")
+
+        lines.append("\n**Recent chains:**")
+        for trip in list(breaker.trips)[-10:][::-1]:
+            when = datetime.fromtimestamp(trip.when).strftime('%H:%M:%S')
+            lines.append(f"- {when} #{trip.chain} `{trip.command[:60]}` by {label(trip.origin)}, "
+                         f"stopped at {label(trip.executor)}: {trip.reason}")
+        return CommandResult(True, "\n".join(lines))
+
 
     # ─────────────────────────────────────────────────────────────
     # Math & Date/Time Commands
@@ -3941,7 +4322,9 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
         db = self.db
         
         # We need to find the agent globally, not just nearby
-        target_ref = db._name_index.get(args.lower().strip())
+        named = db.find_by_name(args)
+        agents = [o for o in named if o.type == 'agent']
+        target_ref = (agents or named)[0].dbref if named else None
         if not target_ref:
             # Try DBRef lookup
             if args.startswith('#') and args in db.objects:
@@ -3995,48 +4378,44 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
         """
         Check for idle autonomous agents and send them home.
         Returns a list of messages describing what happened.
+        Only robots whose idle deadline has passed are examined.
         """
-        import time
         now = time.time()
         db = self.db
         messages = []
         
-        # Scan all autonomous agents
-        for obj in db.objects.values():
-            if obj.type == 'agent' and obj.autonomous:
-                # Must have a home
-                if not obj.home: continue
-                
-                # Must not be already at home
-                if obj.location == obj.home: continue
-                
-                # Check interaction time
-                last = getattr(obj, 'last_interaction', 0.0)
-                if (now - last) > timeout_seconds:
-                    
-                    # Logic: Only go home if ALONE in the room (ignoring other bots?)
-                    # Or maybe just if no PLAYERS are there?
-                    # Let's say: If no players are present.
-                    contents = db.get_room_contents(obj.location)
-                    has_player = any(o.type == 'agent' and not o.autonomous for o in contents)
-                    
-                    if not has_player:
-                        # Go home!
-                        old_loc = obj.location
-                        old_room = db.get(old_loc)
-                        home_room = db.get(obj.home)
-                        home_name = home_room.name if home_room else "Home"
-                        
-                        self._announce_departure(obj.dbref, old_loc, f"wanders off towards home.")
-                        db.move_agent(obj.dbref, obj.home)
-                        self._announce_arrival(obj.dbref, obj.home, f"arrives from **{old_room.name if old_room else 'somewhere'}**.")
-                        
-                        # Reset interaction to avoid immediate re-check loop (though location change helps)
-                        obj.last_interaction = now
-                        
-                        msg = f"[Idle] Sent **{obj.name}** from {old_room.name if old_room else '???'} to {home_name}."
-                        messages.append(msg)
-                        print(msg)
+        for obj in self.presence.idle_robots(timeout_seconds, now):
+            # Must have a home, and not be already at home
+            if not obj.home or obj.location == obj.home:
+                self.presence.defer(obj, timeout_seconds, now=now)
+                continue
+            
+            # Logic: Only go home if ALONE in the room (ignoring other bots?)
+            # Or maybe just if no PLAYERS are there?
+            # Let's say: If no players are present.
+            contents = db.get_room_contents(obj.location)
+            has_player = any(o.type == 'agent' and not o.autonomous for o in contents)
+            if has_player:
+                self.presence.defer(obj, timeout_seconds, now=now)
+                continue
+            
+            # Go home!
+            old_loc = obj.location
+            old_room = db.get(old_loc)
+            home_room = db.get(obj.home)
+            home_name = home_room.name if home_room else "Home"
+            
+            self._announce_departure(obj.dbref, old_loc, f"wanders off towards home.")
+            db.move_agent(obj.dbref, obj.home)
+            self._announce_arrival(obj.dbref, obj.home, f"arrives from **{old_room.name if old_room else 'somewhere'}**.")
+            
+            # Reset interaction to avoid immediate re-check loop (though location change helps)
+            obj.last_interaction = now
+            self.presence.touch(obj, now)
+            
+            msg = f"[Idle] Sent **{obj.name}** from {old_room.name if old_room else '???'} to {home_name}."
+            messages.append(msg)
+            print(msg)
                         
         return messages
 
@@ -4155,9 +4534,7 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
         # Logic: Check if args starts with the name of an agent I own (or me)
         # Sort owned agents by name length desc to match longest first
         owned_agents = [agent]
-        for obj in self.db.objects.values():
-            if obj.type == 'agent' and getattr(obj, 'owner', '') == agent_ref and obj.dbref != agent_ref:
-                owned_agents.append(obj)
+        owned_agents.extend(o for o in self.db.query(type='agent', owner=agent_ref) if o.dbref != agent_ref)
         
         # Sort by name length desc to match "Lexi Bot" before "Lexi"
         owned_agents.sort(key=lambda x: len(x.name), reverse=True)
@@ -4368,14 +4745,83 @@ You can paste multiple commands or execute complex scripts by wrapping them in C
             return CommandResult(False, f"No VR state to clear in **{room.name}**.")
 
 
+    def start_idle_checks(self, interval: float = 30.0, timeout_seconds: int = 300) -> None:
+        """Run check_idle_agents every `interval` seconds on a daemon thread."""
+        if self._idle_thread and self._idle_thread.is_alive():
+            return
+        self._idle_stop.clear()
+        self._idle_thread = threading.Thread(
+            target=self._idle_loop, args=(interval, timeout_seconds),
+            name="mash-idle", daemon=True)
+        self._idle_thread.start()
+
+    def stop_idle_checks(self) -> None:
+        self._idle_stop.set()
+
+    def _idle_loop(self, interval: float, timeout_seconds: int) -> None:
+        while not self._idle_stop.wait(interval):
+            try:
+                self.check_idle_agents(timeout_seconds=timeout_seconds)
+            except Exception as e:
+                print(f"[MASH] Idle check failed: {e}")
+
+    def queue_command(self, executor: str, command: str, enactor: Optional[str] = None,
+                      delay: float = 0.0) -> Optional[int]:
+        """
+        Run `command` as `executor` from the command queue, after `delay`
+        seconds. Returns the queue pid, or None if the executor went over
+        its quota and was halted.
+        """
+        # Queued commands stay in the chain that queued them, timed or not, so a
+        # ping-pong through @wait still trips the breaker. Only a @wait typed
+        # directly by a player (the root of its chain) fires as a fresh chain.
+        link = _CHAIN.get()
+        if delay > 0 and link is not None and link.depth == 0:
+            link = None
+        pid = self.queue.add(executor, command, enactor, delay, link)
+        if pid is None:
+            print(f"[MASH] Runaway: {executor} went over its queue quota ({self.queue.quota}) and was halted")
+            return None
+        if not (self._queue_thread and self._queue_thread.is_alive()):
+            self._queue_stop.clear()
+            self._queue_thread = threading.Thread(target=self._queue_loop, name="mash-queue", daemon=True)
+            self._queue_thread.start()
+        self._queue_wake.set()
+        return pid
+
+    def run_queue(self, now: Optional[float] = None) -> int:
+        """Run one tick of the command queue. Returns how many commands ran."""
+        batch = self.queue.take(now)
+        for entry in batch:
+            try:
+                self.process_command(entry.executor, entry.command, entry.enactor, chain=entry.link)
+            except Exception as e:
+                print(f"[MASH] Queued command {entry.pid} ({entry.executor}: {entry.command[:60]}) failed: {e}")
+        return len(batch)
+
+    def stop_queue(self) -> None:
+        self._queue_stop.set()
+        self._queue_wake.set()
+
+    def _queue_loop(self) -> None:
+        while not self._queue_stop.is_set():
+            self._queue_wake.clear()
+            self.run_queue()
+            delay = self.queue.next_delay()
+            if delay == 0:
+                # Tick budget spent with work left over: let everyone else run first
+                self._queue_stop.wait(QUEUE_TICK)
+            else:
+                self._queue_wake.wait(delay)  # None sleeps until something is queued
+
     # Update interaction timestamp on command processing
     def update_interaction(self, agent_ref: str):
-        """Update last_interaction timestamp for agent."""
-        import time
+        """Update last_interaction timestamp for agent (and the presence tracker)."""
         now = time.time()
         agent = self.db.get_agent(agent_ref)
         if agent:
              agent.last_interaction = now
+             self.presence.touch(agent, now)
              # Removed bystander updates to allow idle detection to work correctly for 'offline' players
 
 
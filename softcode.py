@@ -0,0 +1,158 @@
+"""
+MASH Softcode Compiler
+======================
+Parses [func(args)] text once into a small tree and caches it by text, so
+evaluating a name or description is a walk over prebuilt nodes instead of
+regex passes and character scans.
+
+Semantics match the original evaluator exactly: each pass rewrites every
+innermost [..] group, nested arguments are evaluated as their own [arg],
+and passes repeat (up to MAX_PASSES) while the text keeps changing, so
+functions that return bracketed text are expanded on the next pass.
+
+Placeholder codes (%n, %0 and so on) are tokenized and cached the same
+way, into a format template that substitutes them all in one pass.
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple, Union
+
+MAX_PASSES = 5  # Safe recursion depth
+CACHE_SIZE = 4096  # Distinct texts kept compiled
+
+_GROUP = re.compile(r'\[([^\[\]]+)\]')
+_CODE = re.compile(r'%([0-9!n#lrRtT])')  # Placeholder codes; anything else after % is left alone
+
+# Calls a function by (lowercased) name with evaluated arguments.
+# Returns None for unknown functions; exceptions become !!name_err!!.
+FunctionCall = Callable[[str, List[str]], Optional[str]]
+
+
+class Call:
+    """One [..] group. `args` is None for a group that is not a function call."""
+    __slots__ = ('name', 'args', 'source')
+
+    def __init__(self, name: str, args: Optional[List[Tuple[bool, str]]], source: str):
+        self.name = name
+        self.args = args  # (nested, text): nested args are evaluated as "[text]"
+        self.source = source  # What the group evaluates to if nothing else applies
+
+    def run(self, call: FunctionCall) -> str:
+        if self.args is None:
+            return self.source
+        try:
+            args = [evaluate(text, call) if nested else text for nested, text in self.args]
+            result = call(self.name, args)
+        except Exception:
+            return f"!!{self.name}_err!!"
+        return self.source if result is None else result
+
+
+class Program:
+    """Compiled text: literal strings and Calls, in order."""
+    __slots__ = ('parts', 'static')
+
+    def __init__(self, parts: List[Union[str, Call]]):
+        self.parts = parts
+        self.static = all(type(p) is str for p in parts)
+
+    def run(self, call: FunctionCall) -> str:
+        if self.static:
+            return "".join(self.parts)
+        return "".join(p if type(p) is str else p.run(call) for p in self.parts)
+
+
+def _split_args(args_str: str) -> List[str]:
+    """Split by comma, ignoring commas inside nested parens."""
+    args = []
+    curr = []
+    depth = 0
+    for c in args_str:
+        if c == ',' and depth == 0:
+            args.append("".join(curr).strip())
+            curr = []
+        else:
+            if c == '(': depth += 1
+            elif c == ')': depth -= 1
+            curr.append(c)
+    if curr:
+        args.append("".join(curr).strip())
+    return args
+
+
+def _compile_group(content: str) -> Call:
+    content = content.strip()
+    if '(' not in content:
+        return Call("", None, f"[{content}]")  # Not a function call
+
+    # Find the first '(' to separate function name
+    split_idx = content.find('(')
+    func_name = content[:split_idx].lower().strip()
+    args_str = content[split_idx+1:].strip()
+
+    # Balancing logic: Find the closing paren that matches the first open paren
+    paren_depth = 1
+    closing_idx = -1
+    for i, char in enumerate(args_str):
+        if char == '(': paren_depth += 1
+        elif char == ')': paren_depth -= 1
+        if paren_depth == 0:
+            closing_idx = i
+            break
+
+    if closing_idx != -1:
+        # Anything after the matching paren is ignored
+        args_str = args_str[:closing_idx]
+    elif args_str.endswith(')'):
+        # Fallback for simple cases if depth check fails
+        args_str = args_str[:-1]
+
+    # Arguments that look like calls are evaluated on their own (nested functions)
+    args = []
+    for a in _split_args(args_str):
+        nested = '(' in a and ')' in a
+        args.append((nested, f"[{a}]" if nested else a))
+    return Call(func_name, args, f"[{content}]")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_softcode(text: str) -> Program:
+    """One evaluation pass over `text`, prebuilt."""
+    parts: List[Union[str, Call]] = []
+    pos = 0
+    for m in _GROUP.finditer(text):
+        if m.start() > pos:
+            parts.append(text[pos:m.start()])
+        parts.append(_compile_group(m.group(1)))
+        pos = m.end()
+    if pos < len(text):
+        parts.append(text[pos:])
+    return Program(parts)
+
+
+def evaluate(text: str, call: FunctionCall) -> str:
+    """Evaluate every [func(args)] in text, calling `call` for each function."""
+    if not text or '[' not in text:
+        return text
+    for _ in range(MAX_PASSES):
+        new_text = compile_softcode(text).run(call)
+        if new_text == text:
+            break
+        text = new_text
+    return text
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_placeholders(text: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Tokenized text as a str.format template with one positional field per
+    placeholder, and the distinct codes present ("n" for %n) in field order.
+    """
+    parts = _CODE.split(text)
+    codes = tuple(dict.fromkeys(parts[1::2]))
+    fields = {code: f"{{{i}}}" for i, code in enumerate(codes)}
+    template = "".join(fields[part] if i % 2 else part.replace('{', '{{').replace('}', '}}')
+                       for i, part in enumerate(parts))
+    return template, codes
+
@@ -0,0 +1,538 @@
+"""
+MASH SQLite Database Module
+===========================
+Drop-in alternative to WorldDatabase that keeps the world in SQLite.
+Each GameObject is one row (custom attrs live in a side table); objects are
+loaded lazily through an in-memory LRU and written back transactionally on
+commit(), so startup does not parse the whole world and worlds may exceed RAM.
+
+Indexed reads see pending changes without committing them: they are
+written into an open transaction on the same connection, which only
+commit() (once per command, see MashEngine.process_command) makes durable.
+
+Migrate an existing world:  python sqlite_database.py world.json world.db
+"""
+
+import json
+import sqlite3
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+from database import WorldDatabase, GameObject, ExitTable, FIELD_DEFAULTS
+
+
+# Columns pulled out of the JSON blob so they can be indexed
+ROW_FIELDS = ('type', 'name', 'location', 'source', 'owner')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    dbref    TEXT PRIMARY KEY,
+    type     TEXT NOT NULL,
+    name     TEXT NOT NULL,
+    lname    TEXT NOT NULL,
+    location TEXT NOT NULL DEFAULT '',
+    source   TEXT NOT NULL DEFAULT '',
+    owner    TEXT NOT NULL DEFAULT '',
+    loc_seq  INTEGER NOT NULL DEFAULT 0,
+    created  INTEGER NOT NULL DEFAULT 0,
+    data     TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS objects_location ON objects(location, loc_seq);
+CREATE INDEX IF NOT EXISTS objects_created ON objects(created);
+CREATE INDEX IF NOT EXISTS objects_lname ON objects(lname);
+CREATE INDEX IF NOT EXISTS objects_source ON objects(source);
+CREATE INDEX IF NOT EXISTS objects_type ON objects(type);
+CREATE INDEX IF NOT EXISTS objects_owner ON objects(owner);
+CREATE TABLE IF NOT EXISTS attrs (
+    dbref TEXT NOT NULL,
+    name  TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (dbref, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# ─────────────────────────────────────────────────────────────────
+# Lazy Object Store
+# ─────────────────────────────────────────────────────────────────
+
+class LazyObjectStore(MutableMapping):
+    """
+    Mapping of dbref -> GameObject backed by SQLite.
+    Recently used objects stay in an LRU; dirty objects are pinned until flushed.
+    A weak identity map guarantees one live instance per dbref.
+    """
+
+    def __init__(self, db: 'SqliteWorldDatabase', cache_size: int):
+        self._db = db
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, GameObject]' = OrderedDict()
+        self._live = weakref.WeakValueDictionary()
+
+    def __getitem__(self, dbref: str) -> GameObject:
+        obj = self._cache.get(dbref)
+        if obj is not None:
+            self._cache.move_to_end(dbref)
+            return obj
+        if dbref in self._db._deleted:
+            raise KeyError(dbref)
+        obj = self._live.get(dbref)
+        if obj is None:
+            obj = self._db._read_object(dbref)
+            if obj is None:
+                raise KeyError(dbref)
+        self._remember(obj)
+        return obj
+
+    def __setitem__(self, dbref: str, obj: GameObject) -> None:
+        self._db._deleted.discard(dbref)
+        self._db._dirty.add(dbref)
+        self._remember(obj)
+
+    def __delitem__(self, dbref: str) -> None:
+        if dbref not in self:
+            raise KeyError(dbref)
+        self._cache.pop(dbref, None)
+        self._live.pop(dbref, None)
+        self._db._dirty.discard(dbref)
+        self._db._deleted.add(dbref)
+
+    def __contains__(self, dbref: object) -> bool:
+        if dbref in self._cache:
+            return True
+        if dbref in self._db._deleted:
+            return False
+        return self._db._row_exists(dbref)
+
+    def __iter__(self):
+        self._db._flush()
+        return iter(self._db._all_dbrefs())
+
+    def __len__(self) -> int:
+        self._db._flush()
+        return self._db._count()
+
+    def touch(self, obj: GameObject) -> None:
+        """Make sure a (possibly evicted) instance that was just edited is cached."""
+        if self._cache.get(obj.dbref) is not obj:
+            self._remember(obj)
+
+    def clear_cache(self) -> None:
+        for obj in self._cache.values():
+            obj._attach(None)
+        self._cache.clear()
+        self._live = weakref.WeakValueDictionary()
+
+    def _remember(self, obj: GameObject) -> None:
+        self._cache[obj.dbref] = obj
+        self._cache.move_to_end(obj.dbref)
+        self._live[obj.dbref] = obj
+        if len(self._cache) > self.cache_size:
+            self._evict()
+
+    def _evict(self) -> None:
+        dirty = self._db._dirty
+        if len(dirty) >= self.cache_size:
+            self._db._flush()
+        for dbref in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if dbref not in dirty:
+                del self._cache[dbref]
+
+
+class SqlIndexView:
+    """
+    Read-only stand-in for the in-memory index dicts of WorldDatabase.
+    get() and `in` run against the SQL indexes. Item access and writes
+    raise TypeError: the indexed columns are derived from the objects
+    themselves when they are flushed, so any code still maintaining an
+    index by hand is a bug to surface, not to ignore.
+    """
+
+    def __init__(self, db: 'SqliteWorldDatabase', column: str, single: bool = False):
+        self._db = db
+        self._column = column
+        self._single = single
+
+    def get(self, key: str, default: Any = None) -> Any:
+        refs = self._db._refs_where(self._column, key)
+        if not refs:
+            return default
+        return refs[-1] if self._single else refs
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key) is not None
+
+    def _unsupported(self, *args, **kwargs):
+        raise TypeError(f"SQL index on '{self._column}' is read-only; use get()")
+
+    __getitem__ = __setitem__ = __delitem__ = setdefault = clear = _unsupported
+
+
+class SqlFlagView(SqlIndexView):
+    """SqlIndexView for the flag index: flags stay in the JSON data column."""
+
+    def __init__(self, db: 'SqliteWorldDatabase'):
+        super().__init__(db, 'data')
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._db._refs_flagged(key) or default
+
+    def _unsupported(self, *args, **kwargs):
+        raise TypeError("SQL flag index is read-only; use get()")
+
+    __getitem__ = __setitem__ = __delitem__ = setdefault = clear = _unsupported
+
+
+# ─────────────────────────────────────────────────────────────────
+# SQLite World Database
+# ─────────────────────────────────────────────────────────────────
+
+class SqliteWorldDatabase(WorldDatabase):
+    """
+    WorldDatabase persisted in SQLite.
+
+    Mutations are tracked through the same dirty-object hooks as the JSON
+    store. Queries (and cache pressure) write them into an open transaction
+    so SQL sees them; commit() ends that transaction. save() and
+    save_delta() are aliases for commit() so existing callers keep working.
+    """
+
+    def __init__(self, path: Path, cache_size: int = 4096):
+        super().__init__()
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        upgrade_schema(self._conn)
+        self._conn.executescript(SCHEMA)
+
+        self.objects = LazyObjectStore(self, cache_size)
+        self._name_index = SqlIndexView(self, 'lname', single=True)
+        self._type_index = SqlIndexView(self, 'type')
+        self._location_index = SqlIndexView(self, 'location')
+        self._owner_index = SqlIndexView(self, 'owner')
+        self._flag_index = SqlFlagView(self)
+        self._loc_seq: Dict[str, int] = {}  # dbref -> ordering key for pending moves
+        self._next_loc_seq = self._conn.execute("SELECT COALESCE(MAX(loc_seq), 0) FROM objects").fetchone()[0] + 1
+        self._created: Dict[str, int] = {}  # dbref -> creation order for objects not flushed yet
+        self._next_created = self._conn.execute("SELECT COALESCE(MAX(created), 0) FROM objects").fetchone()[0] + 1
+        self._read_meta()
+
+    def rebuild_indices(self) -> None:
+        """Indexes live in SQLite and are maintained by SQLite itself."""
+        pass
+
+    def _index_object(self, dbref: str, obj: GameObject) -> None:
+        pass
+
+    def _reindex(self, obj: GameObject, field_name: str, old: Any) -> None:
+        pass
+
+    def _unindex_name(self, dbref: str, name: str) -> None:
+        pass
+
+    def _unindex_location(self, dbref: str, loc: Optional[str]) -> None:
+        pass
+
+    def _unindex_type(self, dbref: str, obj_type: str) -> None:
+        pass
+
+    def _unindex_owner(self, dbref: str, owner: Optional[str]) -> None:
+        pass
+
+    def _unindex_flags(self, dbref: str) -> None:
+        pass
+
+    # ─────────────────────────────────────────────────────────────
+    # File I/O
+    # ─────────────────────────────────────────────────────────────
+
+    def load(self, path: Optional[Path] = None):
+        """Discard uncommitted changes and re-read from the database file."""
+        with self._lock:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            self._dirty.clear()
+            self._deleted.clear()
+            self._loc_seq.clear()
+            self._created.clear()
+            self.objects.clear_cache()
+            self._read_meta()
+
+    def save(self, path: Optional[Path] = None, binary: Optional[bool] = None, wait: bool = True) -> None:
+        """Commit all pending changes (the path is ignored; commits are already incremental)."""
+        self.commit()
+
+    def save_delta(self, path: Optional[Path] = None, compact_after: int = 0, wait: bool = True) -> int:
+        """Commit pending changes. Returns the number of records written."""
+        with self._lock:
+            pending = len(self._dirty) + len(self._deleted)
+            self.commit()
+            return pending
+
+    def commit(self, path: Optional[Path] = None) -> None:
+        """Write every dirty/deleted object and the allocator state, then commit the open transaction."""
+        with self._lock:
+            self._flush(force_meta=True)
+            self._conn.execute("COMMIT")
+
+    def enable_journal(self, path: Path, checkpoint_interval: float = 600.0) -> None:
+        """SQLite runs in WAL mode already; nothing to do."""
+        pass
+
+    def checkpoint(self) -> bool:
+        with self._lock:
+            if self._conn.in_transaction:
+                return False  # A command is mid-way; the next commit comes first
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return True
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+
+    # ─────────────────────────────────────────────────────────────
+    # Queries
+    # ─────────────────────────────────────────────────────────────
+
+    def get_room_contents(self, room_ref: str) -> List[GameObject]:
+        """Get all agents/objects in a room, in arrival order."""
+        with self._lock:
+            return [self.objects[ref] for ref in self._refs_where('location', room_ref) if ref in self.objects]
+
+    def find_by_name(self, name: str, location: Optional[str] = None) -> List[GameObject]:
+        """All objects with this exact (case-insensitive) name, optionally only those at `location`."""
+        with self._lock:
+            objs = [self.objects[ref] for ref in self._refs_where('lname', name.lower().strip()) if ref in self.objects]
+        if location is not None:
+            objs = [o for o in objs if o.location == location]
+        return objs
+
+    def match_name(self, location: str, text: str) -> Optional[GameObject]:
+        """First object (in arrival order) at `location` whose name contains `text`."""
+        text = text.lower().strip()
+        if not location or not text:
+            return None
+        with self._lock:
+            self._flush()
+            row = self._conn.execute(
+                "SELECT dbref FROM objects WHERE location = ? AND instr(lname, ?) > 0 ORDER BY loc_seq LIMIT 1",
+                (location, text)).fetchone()
+            return self.objects.get(row[0]) if row else None
+
+    def _exit_table(self, room: GameObject) -> ExitTable:
+        """Build the room's ExitTable from its exit list plus the SQL source index (not cached)."""
+        refs = {}
+        for ref in room.exits:
+            refs[ref if ref.startswith('#') else f"#{ref}"] = None
+        refs.update(dict.fromkeys(self._refs_where('source', room.dbref)))
+        exits = [e for e in (self.objects.get(r) for r in refs) if e and e.type == 'exit']
+        return ExitTable(exits)
+
+    # ─────────────────────────────────────────────────────────────
+    # Change Tracking
+    # ─────────────────────────────────────────────────────────────
+
+    def _object_changed(self, obj: GameObject, field_name: str, old: Any,
+                        edit: Optional[tuple] = None) -> None:
+        with self._lock:
+            if field_name == 'location':
+                self._loc_seq[obj.dbref] = self._next_loc_seq
+                self._next_loc_seq += 1
+            self.objects.touch(obj)
+            super()._object_changed(obj, field_name, old, edit)
+
+    def create_object(self, obj_type: str, name: str, **kwargs) -> GameObject:
+        with self._lock:
+            obj = super().create_object(obj_type, name, **kwargs)
+            self._created[obj.dbref] = self._next_created
+            self._next_created += 1
+            if obj.location:
+                self._loc_seq[obj.dbref] = self._next_loc_seq
+                self._next_loc_seq += 1
+            return obj
+
+    # ─────────────────────────────────────────────────────────────
+    # Row Mapping
+    # ─────────────────────────────────────────────────────────────
+
+    def _read_object(self, dbref: str) -> Optional[GameObject]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT type, name, location, source, owner, data FROM objects WHERE dbref = ?",
+                (dbref,)).fetchone()
+            if row is None:
+                return None
+            attrs = dict(self._conn.execute(
+                "SELECT name, value FROM attrs WHERE dbref = ?", (dbref,)).fetchall())
+        obj = row_to_object(dbref, row, attrs)
+        obj._attach(self)
+        return obj
+
+    def _row_exists(self, dbref: object) -> bool:
+        with self._lock:
+            if dbref in self._dirty:
+                return True
+            return self._conn.execute("SELECT 1 FROM objects WHERE dbref = ?", (dbref,)).fetchone() is not None
+
+    def _refs_where(self, column: str, value: str) -> List[str]:
+        with self._lock:
+            self._flush()
+            order = "loc_seq" if column == 'location' else "created"
+            rows = self._conn.execute(
+                f"SELECT dbref FROM objects WHERE {column} = ? ORDER BY {order}", (value,)).fetchall()
+            return [r[0] for r in rows]
+
+    def _refs_flagged(self, flag: str) -> List[str]:
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT dbref FROM objects WHERE json_extract(data, ?) ORDER BY created", (f"$.{flag}",)).fetchall()
+            return [r[0] for r in rows]
+
+    def _all_dbrefs(self) -> List[str]:
+        with self._lock:
+            self._flush()
+            return [r[0] for r in self._conn.execute("SELECT dbref FROM objects ORDER BY created")]
+
+    def _count(self) -> int:
+        with self._lock:
+            self._flush()
+            return self._conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+    def _flush(self, force_meta: bool = False) -> None:
+        """
+        Write pending changes into the open transaction, starting one if
+        needed (caller may or may not hold the lock). Nothing is committed:
+        later reads on this connection see the rows, commit() makes them
+        durable. A failed flush is undone on its own, leaving earlier ones.
+        """
+        with self._lock:
+            if not (self._dirty or self._deleted or force_meta):
+                return
+            conn = self._conn
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            cache, live = self.objects._cache, self.objects._live
+            dirty = [cache.get(ref) or live.get(ref) for ref in self._dirty]
+            if None in dirty:
+                lost = sorted(ref for ref, obj in zip(self._dirty, dirty) if obj is None)
+                raise RuntimeError(f"Dirty objects missing from the cache: {', '.join(lost)}")
+            deleted = list(self._deleted)
+            conn.execute("SAVEPOINT flush")
+            try:
+                for ref in deleted:
+                    conn.execute("DELETE FROM objects WHERE dbref = ?", (ref,))
+                    conn.execute("DELETE FROM attrs WHERE dbref = ?", (ref,))
+                for obj in dirty:
+                    write_object(conn, obj, self._loc_seq.get(obj.dbref), self._created.get(obj.dbref))
+                write_meta(conn, self._meta_for_save())
+                conn.execute("RELEASE flush")
+            except Exception:
+                conn.execute("ROLLBACK TO flush")
+                conn.execute("RELEASE flush")
+                raise
+            self._dirty.clear()
+            self._deleted.clear()
+            self._loc_seq.clear()
+            self._created.clear()
+
+    def _read_meta(self) -> None:
+        rows = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        if 'meta' in rows:
+            self._restore_meta(json.loads(rows['meta']), legacy_next=0)
+
+
+def row_to_object(dbref: str, row: tuple, attrs: Dict[str, str]) -> GameObject:
+    """Rebuild a GameObject from its row and attrs."""
+    obj_type, name, location, source, owner, data = row
+    fields = {k: v for k, v in json.loads(data).items() if k in FIELD_DEFAULTS}
+    return GameObject(dbref=dbref, type=obj_type, name=name, location=location,
+                      source=source, owner=owner, attrs=attrs, **fields)
+
+
+def write_object(conn: sqlite3.Connection, obj: GameObject, loc_seq: Optional[int] = None,
+                 created: Optional[int] = None) -> None:
+    """Upsert one object row and replace its attrs (loc_seq/created only change when given)."""
+    data = obj.to_dict()
+    attrs = data.pop('attrs', {})
+    row = [data.pop(k, "") for k in ROW_FIELDS]
+    conn.execute(
+        "INSERT INTO objects (dbref, type, name, lname, location, source, owner, loc_seq, created, data) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(dbref) DO UPDATE SET type=excluded.type, name=excluded.name, lname=excluded.lname, "
+        "location=excluded.location, source=excluded.source, owner=excluded.owner, data=excluded.data"
+        + (", loc_seq=excluded.loc_seq" if loc_seq is not None else "")
+        + (", created=excluded.created" if created is not None else ""),
+        (obj.dbref, row[0], row[1], row[1].lower(), row[2], row[3], row[4], loc_seq or 0, created or 0,
+         json.dumps(data, separators=(',', ':'))))
+    conn.execute("DELETE FROM attrs WHERE dbref = ?", (obj.dbref,))
+    if attrs:
+        conn.executemany("INSERT INTO attrs (dbref, name, value) VALUES (?, ?, ?)",
+                         [(obj.dbref, k, str(v)) for k, v in attrs.items()])
+
+
+def upgrade_schema(conn: sqlite3.Connection) -> None:
+    """Add columns that databases written by older versions lack."""
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(objects)")]
+    if columns and 'created' not in columns:
+        # Rows were inserted in creation order; rowid is the best record of it
+        conn.execute("ALTER TABLE objects ADD COLUMN created INTEGER NOT NULL DEFAULT 0")
+        conn.execute("UPDATE objects SET created = rowid")
+
+
+def write_meta(conn: sqlite3.Connection, meta: Dict[str, Any]) -> None:
+    """Store world meta (including the dbref allocator state)."""
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('meta', ?)", (json.dumps(meta),))
+
+
+# ─────────────────────────────────────────────────────────────────
+# Migration
+# ─────────────────────────────────────────────────────────────────
+
+def migrate_json_world(json_path: Path, sqlite_path: Path) -> int:
+    """Copy a world.json (plus any delta/journal tail) into a SQLite database."""
+    source = WorldDatabase()
+    source.load(json_path)
+
+    conn = sqlite3.connect(str(sqlite_path), isolation_level=None)
+    conn.executescript(SCHEMA)
+    conn.execute("BEGIN")
+    try:
+        conn.execute("DELETE FROM objects")
+        conn.execute("DELETE FROM attrs")
+        # Location order in the JSON world is the index insertion order,
+        # and objects order is creation order
+        for seq, (dbref, obj) in enumerate(source.objects.items(), start=1):
+            write_object(conn, obj, seq, seq)
+        write_meta(conn, source._meta_for_save())
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return len(source.objects)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Convert a MASH world.json into a SQLite database.")
+    parser.add_argument("json_path", help="Existing world.json")
+    parser.add_argument("sqlite_path", help="SQLite file to create or overwrite")
+    args = parser.parse_args()
+
+    start = time.time()
+    count = migrate_json_world(Path(args.json_path), Path(args.sqlite_path))
+    print(f"[MASH] Migrated {count} objects to {args.sqlite_path} in {time.time() - start:.2f}s")
@@ -0,0 +1,318 @@
+"""
+MASH Telnet Server
+==================
+Headless, line-oriented front end for classic MUSH clients (telnet,
+TinyFugue, Mudlet). One asyncio process hosts the WorldDatabase and the
+MashEngine directly. Commands go through process_command on a worker pool,
+followed by the same AI reaction rounds as the app, and room announcements
+are pushed to each socket as they happen instead of waiting for the
+player's next command.
+
+    python telnet_server.py [--port 7567] [--world world.json | --sqlite world.db]
+
+Then `telnet localhost 7567` and `connect <name> <password>` (or `create`).
+The server owns its copy of the world: don't point it and the Streamlit app
+at the same world file at the same time.
+"""
+
+import argparse
+import asyncio
+import functools
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from database import WorldDatabase, GameObject
+from sqlite_database import SqliteWorldDatabase
+from mash_engine import MashEngine
+from accounts import check_login, create_player
+
+
+# ─────────────────────────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────────────────────────
+
+DEFAULT_PORT = 7567  # For a nostalgic MUSH feel
+WORLD_FILE = Path(__file__).parent / "world.json"
+SAVE_INTERVAL = 5 * 60  # Write changed objects every 5 minutes
+CHECKPOINT_INTERVAL = 10 * 60  # Compact the journal into a full snapshot every 10 minutes
+IDLE_CHECK_INTERVAL = 30  # Send idle robots home on this timer (seconds)
+MAX_LINE = 8192  # Longest accepted input line (bytes)
+
+WELCOME = (
+    "Welcome to MASH - Multi-Agent Semantic Hallucination.\n"
+    "  connect <name> <password>   Log in to an existing character\n"
+    "  create <name> <password>    Create a new character\n"
+    "  QUIT                        Disconnect"
+)
+
+# Telnet option negotiation (IAC sequences) that clients mix into input
+_TELNET_IAC = re.compile(rb'\xff\xfa.*?\xff\xf0|\xff[\xfb-\xfe].|\xff[\xf0-\xfa]', re.S)
+
+
+def _strip_telnet(data: bytes) -> bytes:
+    return _TELNET_IAC.sub(b'', data.replace(b'\xff\xff', b'\xff'))
+
+
+def to_plain(text: str) -> bytes:
+    """Engine output (light markdown) as CRLF-terminated lines for a terminal."""
+    text = text.replace("**", "").replace("🌐\n", "")
+    return (text.replace("\r\n", "\n").replace("\n", "\r\n") + "\r\n").encode('utf-8')
+
+
+# ─────────────────────────────────────────────────────────────────
+# Connections
+# ─────────────────────────────────────────────────────────────────
+
+class TelnetSession:
+    """One connected client: login, then commands in and announcements out."""
+
+    def __init__(self, server: 'TelnetServer', reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.server = server
+        self.db = server.db
+        self.reader = reader
+        self.writer = writer
+        self.player: Optional[GameObject] = None
+        self._cursor = 0
+        self._woken = asyncio.Event()
+
+    async def run(self) -> None:
+        try:
+            await self.send(WELCOME)
+            login = await self._login()
+            if login:
+                await self._play(*login)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass  # Client went away or sent garbage; just drop it
+        finally:
+            self.writer.close()
+
+    async def send(self, text: str) -> None:
+        # Backpressure: a slow client holds up only its own session
+        self.writer.write(to_plain(text))
+        await self.writer.drain()
+
+    async def _readline(self) -> Optional[str]:
+        line = await self.reader.readline()
+        if not line:
+            return None
+        return _strip_telnet(line).decode('utf-8', 'replace').strip()
+
+    async def _login(self) -> Optional[Tuple[GameObject, bool]]:
+        while True:
+            line = await self._readline()
+            if line is None:
+                return None
+            verb, _, rest = line.partition(' ')
+            verb = verb.lower()
+            if verb == 'quit':
+                return None
+            if verb not in ('connect', 'create'):
+                await self.send(WELCOME)
+                continue
+            # Names may contain spaces; the password is the last word
+            name, _, password = rest.strip().rpartition(' ')
+            if verb == 'connect':
+                player, error = await self.server.call(check_login, self.db, name, password)
+            else:
+                player, error = await self.server.call(create_player, self.db, name, password)
+            if error:
+                await self.send(error)
+                continue
+            return player, verb == 'create'
+
+    async def _play(self, player: GameObject, created: bool) -> None:
+        self.player = player
+        engine = self.server.engine
+        loop = asyncio.get_running_loop()
+        self._cursor = self.db.event_seq
+        token = self.db.add_listener(player.dbref, lambda: loop.call_soon_threadsafe(self._woken.set))
+        pusher = asyncio.create_task(self._push())
+        pusher.add_done_callback(self._push_done)
+        self.server.sessions.add(self)
+        try:
+            if created:
+                wiz_msg = " You are the first to arrive, and have been granted Wizard powers." if player.wizard else ""
+                await self.send(f"Welcome to MASH, {player.name}!{wiz_msg}")
+                await self.server.call(engine._announce_arrival, player.dbref, player.location, "has connected.")
+            else:
+                wiz_msg = " You have Wizard powers." if player.wizard else ""
+                await self.send(f"Welcome back, {player.name}!{wiz_msg}")
+            result = await self.server.call(engine.process_command, player.dbref, "look")
+            await self.send(result.message)
+
+            while True:
+                line = await self._readline()
+                if line is None or line.lower() == 'quit':
+                    break
+                if not line:
+                    continue
+                result = await self.server.call(engine.process_command, player.dbref, line)
+                if result.message:
+                    await self.send(result.message)
+                if result.success and engine.ai:
+                    await self._react(engine, line, result.context or {})
+        finally:
+            self.server.sessions.discard(self)
+            self.db.remove_listener(token)
+            pusher.cancel()
+            await asyncio.gather(pusher, return_exceptions=True)  # Failures were handled by _push_done
+            player = self.db.get_agent(player.dbref)
+            if player:
+                await self.server.call(engine._announce_departure, player.dbref, player.location,
+                                       "has disconnected.")
+
+    async def _react(self, engine: MashEngine, text: str, context: Dict[str, Any]) -> None:
+        """Same order as the app: departure reactions in the old room, then the current room."""
+        player = self.db.get_agent(self.player.dbref)
+        if not player:
+            return
+        rounds = []
+        old_loc = (context.get('from_room') or {}).get('dbref')
+        if old_loc and old_loc != player.location:
+            rounds.append((old_loc, f"PRESENCE_DEPARTURE {player.name}"))
+        rounds.append((player.location, text))
+        for room, action in rounds:
+            try:
+                reactions = await self.server.call(engine.trigger_room_reactions, room, player.dbref, action)
+            except Exception as e:
+                print(f"[MASH] Reactions failed in {room}: {e}")
+                continue
+            for r in reactions:
+                if r.get('narrative'):
+                    await self.send(f"✨ {r['narrative']}")
+                for msg in r.get('intent_messages') or []:
+                    if msg:
+                        await self.send(msg)
+
+    async def _push(self) -> None:
+        """Deliver announcements whenever the database wakes this session."""
+        while True:
+            await self._woken.wait()
+            self._woken.clear()
+            self._cursor, msgs = await self.server.call(self.db.read_messages, self.player.dbref, self._cursor)
+            for msg in msgs:
+                await self.send(msg)
+
+    def _push_done(self, task: asyncio.Task) -> None:
+        """A pusher that stops on its own leaves the client deaf: log it and drop the client."""
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and not isinstance(error, ConnectionError):
+            name = self.player.name if self.player else "?"
+            print(f"[MASH] Announcements to {name} failed: {error}")
+        self.writer.close()  # The reader sees EOF and _play winds down
+
+
+# ─────────────────────────────────────────────────────────────────
+# Server
+# ─────────────────────────────────────────────────────────────────
+
+class TelnetServer:
+    """
+    Accepts telnet connections for one in-process world. Engine and database
+    calls run on a thread pool so the event loop never waits on the world
+    lock or an AI call.
+    """
+
+    def __init__(self, db: WorldDatabase, engine: MashEngine, workers: int = 32):
+        self.db = db
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mash-telnet")
+        self.sessions: set = set()
+
+    async def call(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(fn, *args))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await TelnetSession(self, reader, writer).run()
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self._handle, host, port, limit=MAX_LINE)
+        addr = server.sockets[0].getsockname()
+        print(f"[MASH] Telnet server listening on {addr[0]}:{addr[1]}")
+        return server
+
+    async def autosave(self, path: Optional[Path], interval: float = SAVE_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.call(self.db.save_delta, path)
+            except Exception as e:
+                print(f"[MASH] Auto-save failed: {e}")
+
+
+def open_world(world: Path, sqlite_path: Optional[Path] = None, journal: bool = True) -> WorldDatabase:
+    """Open the world the way the Streamlit app does (see get_shared_database)."""
+    if sqlite_path:
+        db = SqliteWorldDatabase(sqlite_path)
+        print(f"[MASH] Opened SQLite world: {db.meta.get('name')} ({sqlite_path.name})")
+    elif world.exists():
+        db = WorldDatabase()
+        db.load(world, background=True, verbose=True)
+        print(f"[MASH] Loading world: {db.meta.get('name')} (first room ready)")
+    else:
+        db = WorldDatabase()
+        print("[MASH] No world file found, starting with empty world")
+
+    if not db.objects:
+        print("[MASH] Initializing minimal world with Room #0")
+        db.create_object(
+            'room',
+            'The Arrival',
+            desc="You stand in a shimmering void of potential. A new world begins here."
+        )
+    if journal and not sqlite_path:
+        db.enable_journal(world, checkpoint_interval=CHECKPOINT_INTERVAL)
+    return db
+
+
+def load_ai_engine() -> Optional[Any]:
+    try:
+        from dotenv import load_dotenv
+        from ai_layer import AIEngine
+        load_dotenv()
+        return AIEngine()
+    except Exception as e:
+        print(f"[MASH] AI Engine not initialized: {e}")
+        return None
+
+
+async def serve(args: argparse.Namespace) -> None:
+    db = open_world(args.world, args.sqlite, journal=not args.no_journal)
+    engine = MashEngine(db, ai_engine=None if args.no_ai else load_ai_engine())
+    engine.start_idle_checks(IDLE_CHECK_INTERVAL, timeout_seconds=300)
+    server = TelnetServer(db, engine, workers=args.workers)
+    listener = await server.start(args.host, args.port)
+    saver = asyncio.create_task(server.autosave(None if args.sqlite else args.world))
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        saver.cancel()
+        engine.stop_idle_checks()
+        print("[MASH] Saving world before shutdown")
+        db.save_delta(None if args.sqlite else args.world)
+        db.close_journal()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--world", type=Path, default=WORLD_FILE, help="world.json or a .mashb snapshot")
+    parser.add_argument("--sqlite", type=Path, default=None, help="Serve a SQLite world instead")
+    parser.add_argument("--workers", type=int, default=32, help="Threads running engine commands")
+    parser.add_argument("--no-ai", action="store_true", help="Run without the Gemini AI layer")
+    parser.add_argument("--no-journal", action="store_true", help="Rely on periodic saves only")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
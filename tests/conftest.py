@@ -0,0 +1,37 @@
+"""Shared fixtures for the MASH test suite."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import WorldDatabase
+
+
+def world_state(db: WorldDatabase) -> dict:
+    """Every object as saved, for comparing two copies of a world."""
+    return {dbref: obj.to_dict() for dbref, obj in db.objects.items()}
+
+
+def named(db: WorldDatabase, name: str):
+    return next(obj for obj in db.objects.values() if obj.name == name)
+
+
+def reopen(path) -> WorldDatabase:
+    """A fresh database loaded the way a restarted server loads it."""
+    db = WorldDatabase()
+    db.load(str(path))
+    db.wait_loaded()
+    return db
+
+
+@pytest.fixture
+def world() -> WorldDatabase:
+    """A room with an agent and an object in it."""
+    db = WorldDatabase()
+    room = db.create_object('room', 'Lobby', desc="A plain lobby.")
+    db.create_object('agent', 'Alice', location=room.dbref, autonomous=False)
+    db.create_object('object', 'Lamp', location=room.dbref)
+    return db
@@ -0,0 +1,68 @@
+"""Accounts shared by the front ends: creating characters and logging in."""
+
+import threading
+
+from accounts import check_login, count_players, create_player, find_player
+from database import WorldDatabase
+from mash_engine import STARTING_TOKENS
+
+
+def _world():
+    db = WorldDatabase()
+    db.create_object('room', 'The Arrival')
+    return db
+
+
+def test_first_player_is_a_wizard_and_the_rest_get_tokens():
+    db = _world()
+    first, error = create_player(db, "  Alice ", "secret", desc="Tall.")
+    assert error == "" and first.name == "Alice" and first.desc == "Tall."
+    assert first.wizard and first.owner == first.dbref and first.location == '#0'
+    second, _ = create_player(db, "Bob", "hunter2")
+    assert not second.wizard and second.tokens == STARTING_TOKENS
+    assert second.desc == "A mysterious traveler."
+    assert count_players(db) == 2
+
+
+def test_creation_is_validated():
+    db = _world()
+    assert create_player(db, " ", "secret")[1] == "Please enter a character name!"
+    assert "at least 2" in create_player(db, "A", "secret")[1]
+    assert create_player(db, "Alice", "")[1] == "Please choose a password!"
+    assert "at least 4" in create_player(db, "Alice", "abc")[1]
+    create_player(db, "Alice", "secret")
+    player, error = create_player(db, "ALICE", "other")
+    assert player is None and "already exists" in error
+
+
+def test_login():
+    db = _world()
+    alice, _ = create_player(db, "Alice", "secret")
+    assert check_login(db, "alice", "secret") == (alice, "")
+    assert check_login(db, "Alice", "wrong") == (None, "Incorrect password!")
+    assert "not found" in check_login(db, "Carol", "secret")[1]
+    assert check_login(db, "", "secret")[1] == "Please enter your character name!"
+    assert check_login(db, "Alice", "")[1] == "Please enter your password!"
+    alice.password_hash = ""
+    assert "no password" in check_login(db, "Alice", "secret")[1]
+
+
+def test_robots_are_not_players():
+    db = _world()
+    db.create_object('agent', 'Robo', autonomous=True)
+    assert find_player(db, "Robo") is None
+    assert create_player(db, "Robo", "secret")[1] == ""  # The name is free for a player
+    assert count_players(db) == 1
+
+
+def test_racing_creations_make_one_character():
+    db = _world()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(create_player(db, "Alice", "secret")))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(1 for player, _ in results if player) == 1
+    assert len(db.find_by_name("Alice")) == 1
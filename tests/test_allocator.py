@@ -0,0 +1,65 @@
+"""Dbref recycling: lowest free id first, never one in use, and the state survives a save."""
+
+import json
+
+from conftest import reopen
+
+from database import DbrefAllocator, WorldDatabase
+
+
+def test_lowest_released_id_comes_back_first():
+    allocator = DbrefAllocator()
+    taken = set()
+    for _ in range(5):
+        taken.add(allocator.allocate(taken.__contains__))
+    assert taken == {0, 1, 2, 3, 4}
+    for dbid in (3, 1, 3):  # Releasing twice is harmless
+        allocator.release(dbid)
+        taken.discard(dbid)
+    assert allocator.free == [1, 3]
+    assert allocator.allocate(taken.__contains__) == 1
+    assert allocator.allocate(taken.__contains__) == 3
+    assert allocator.allocate(taken.__contains__) == 5
+
+
+def test_ids_in_use_are_skipped():
+    allocator = DbrefAllocator(next_id=2, free=[0, 1])
+    in_use = {0, 2, 3}.__contains__  # Say a journal replay recreated #0
+    assert allocator.allocate(in_use) == 1
+    assert allocator.allocate(in_use) == 4
+    assert allocator.free == []
+
+
+def test_claim_takes_an_id_out_of_circulation():
+    allocator = DbrefAllocator(next_id=3, free=[1, 2])
+    allocator.claim(2)
+    allocator.claim(7)
+    assert allocator.free == [1]
+    assert allocator.next_id == 8
+    state = allocator.state()
+    assert DbrefAllocator.from_state(state).state() == state == {'next': 8, 'free': [1]}
+
+
+def test_destroyed_dbrefs_are_reused_after_a_reload(tmp_path):
+    db = WorldDatabase()
+    refs = [db.create_object('object', f"Thing {i}").dbref for i in range(4)]
+    db.destroy_object(refs[2])
+    db.destroy_object(refs[1])
+    path = tmp_path / "world.json"
+    db.save(path)
+    assert json.load(open(path))['meta']['allocator'] == {'next': 4, 'free': [1, 2]}
+
+    loaded = reopen(path)
+    assert loaded.create_object('object', "New").dbref == refs[1]
+    assert loaded.create_object('object', "Newer").dbref == refs[2]
+    assert loaded.create_object('object', "Newest").dbref == '#4'
+
+
+def test_legacy_meta_keys_still_load(tmp_path):
+    path = tmp_path / "world.json"
+    path.write_text(json.dumps({'meta': {'name': "Old"}, 'next_dbref': 6, 'free_dbrefs': [2],
+                                'objects': {'#0': {'type': 'room', 'name': "Lobby"}}}))
+    db = reopen(path)
+    assert db.meta == {'name': "Old"}
+    assert db.create_object('object', "A").dbref == '#2'
+    assert db.create_object('object', "B").dbref == '#6'
@@ -0,0 +1,101 @@
+"""Background saves: coalesced requests, each caller's own error, nothing lost on failure."""
+
+import threading
+
+import database
+from conftest import named, reopen, world_state
+
+
+def test_snapshot_is_taken_before_the_write(world, tmp_path, monkeypatch):
+    path = tmp_path / "world.json"
+    writing, release = threading.Event(), threading.Event()
+    write = database._write_snapshot
+
+    def held(*args):
+        writing.set()
+        release.wait(5)
+        return write(*args)
+    monkeypatch.setattr(database, '_write_snapshot', held)
+
+    world.save(path, wait=False)
+    assert writing.wait(5)
+    alice, lamp = named(world, 'Alice'), named(world, 'Lamp')
+    alice.desc = "After the snapshot."  # Not blocked by the write
+    alice.inventory.append(lamp.dbref)
+    world.destroy_object(lamp.dbref)
+    world.create_object('object', 'Vase')
+    release.set()
+    world.wait_saved()
+    saved = reopen(path)
+    assert named(saved, 'Alice').desc == ""
+    assert named(saved, 'Alice').inventory == []
+    assert named(saved, 'Lamp').dbref == lamp.dbref
+    assert 'Vase' not in [obj.name for obj in saved.objects.values()]
+    assert world._captures == []
+
+
+def test_failed_save_keeps_changes_dirty(world, tmp_path):
+    path = tmp_path / "world.json"
+    world.save(path)
+    alice = named(world, 'Alice')
+    alice.desc = "Unsaved."
+    try:
+        world.save(tmp_path / "missing" / "world.json")
+    except OSError:
+        pass
+    else:
+        raise AssertionError("saving into a missing directory should fail")
+    assert alice.dbref in world._dirty
+
+    assert world.save_delta(path) >= 1
+    assert world_state(reopen(path)) == world_state(world)
+
+
+def test_coalesced_round_reports_errors_per_path(world, tmp_path, monkeypatch):
+    good, bad = tmp_path / "good.json", tmp_path / "missing" / "bad.json"
+    writing, release = threading.Event(), threading.Event()
+    write = database._write_snapshot
+
+    def held(*args):
+        writing.set()
+        release.wait(5)
+        return write(*args)
+    monkeypatch.setattr(database, '_write_snapshot', held)
+
+    results = {}
+    def save(key, path):
+        try:
+            world.save(path)
+            results[key] = None
+        except Exception as e:
+            results[key] = e
+
+    first = threading.Thread(target=save, args=('first', good))
+    first.start()
+    assert writing.wait(5)
+    # These two arrive while the first is being written, so they share one round
+    others = [threading.Thread(target=save, args=(key, path)) for key, path in (('good', good), ('bad', bad))]
+    for t in others:
+        t.start()
+    release.set()
+    for t in [first] + others:
+        t.join(10)
+
+    assert results['first'] is None and results['good'] is None
+    assert isinstance(results['bad'], OSError)
+    assert not world._save_errors
+
+
+def test_waiting_save_under_the_lock_is_refused(world, tmp_path):
+    path = tmp_path / "world.json"
+    with world._lock:
+        try:
+            world.save(path)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("save(wait=True) under the lock should be refused")
+        world.save(path, wait=False)  # Fine: nothing waits on the saver
+    world.wait_saved()
+    assert not world._lock.held()
+    assert named(reopen(path), 'Alice')
@@ -0,0 +1,44 @@
+"""Binary snapshots load back to exactly the world that was saved."""
+
+from conftest import named, reopen, world_state
+
+from database import ThingObject, convert_world
+
+
+def _varied(world):
+    alice = named(world, 'Alice')
+    alice.attrs.update({'GREET': "$hi:say Hello, %n!", 'EMPTY': "", 'UNI': "café ☕"})
+    alice.inventory.extend(['#1', '#2'])
+    alice.tokens = -3
+    alice.wizard = True
+    alice.last_interaction = 1234.5
+    named(world, 'Lamp').listening = True
+    room = world.create_object('room', 'Annex', vr_ok=True)
+    world.create_object('exit', 'North;n', source=room.dbref, destination=named(world, 'Lobby').dbref)
+    return world
+
+
+def test_round_trip(world, tmp_path):
+    _varied(world)
+    path = tmp_path / "world.mashb"
+    world.save(path)
+    loaded = reopen(path)
+    assert world_state(loaded) == world_state(world)
+    assert type(named(loaded, 'Lamp')) is ThingObject  # Slotted, with 'listening' in a slot
+
+
+def test_binary_flag_overrides_extension(world, tmp_path):
+    _varied(world)
+    path = tmp_path / "world.json"
+    world.save_binary(path)
+    assert open(path, 'rb').read(1) != b'{'
+    assert world_state(reopen(path)) == world_state(world)
+
+
+def test_convert_both_ways(world, tmp_path):
+    _varied(world)
+    source = tmp_path / "world.json"
+    world.save(source)
+    assert convert_world(source, tmp_path / "world.mashb") == len(world.objects)
+    assert convert_world(tmp_path / "world.mashb", tmp_path / "back.json") == len(world.objects)
+    assert world_state(reopen(tmp_path / "back.json")) == world_state(world)
@@ -0,0 +1,127 @@
+"""The circuit breaker: cycles, runaway depth and fan-out stop a chain exactly once."""
+
+import time
+
+import pytest
+
+from conftest import named
+
+from database import WorldDatabase
+from mash_engine import CircuitBreaker, MashEngine
+
+
+def _descend(breaker, steps):
+    """Enter each (executor, command) one level below the last; returns the final (link, reason)."""
+    link, reason = None, None
+    for step in steps:
+        link, reason = breaker.enter(*step, link)
+        if link is None:
+            break
+    return link, reason
+
+
+def test_root_commands_start_new_chains():
+    breaker = CircuitBreaker()
+    a, _ = breaker.enter('#1', "look", None)
+    b, _ = breaker.enter('#1', "look", None)
+    assert a.depth == 0 and a.chain is not b.chain
+
+
+def test_cycle_trips():
+    breaker = CircuitBreaker()
+    link, reason = _descend(breaker, [('#1', "say ping"), ('#5', "say ping"), ('#6', "say ping"), ('#5', "say ping")])
+    assert link is None and reason.startswith("cycle")
+    trip = breaker.trips[-1]
+    assert (trip.origin, trip.executor, trip.objects) == ('#1', '#5', ['#5', '#6'])
+    assert breaker.offenders == {'#5': 1, '#6': 1}
+
+
+def test_depth_trips():
+    breaker = CircuitBreaker(max_depth=3)
+    link, _ = _descend(breaker, [('#1', "go")] + [('#5', f"say {i}") for i in range(3)])
+    assert link.depth == 3
+    link, reason = breaker.enter('#5', "say deeper", link)
+    assert link is None and "deeper than 3" in reason
+
+
+def test_fan_out_trips():
+    breaker = CircuitBreaker(max_commands=4)
+    root, _ = breaker.enter('#1', "say hi", None)
+    results = [breaker.enter(f'#{i}', "say hi back", root) for i in range(10, 15)]
+    assert all(link for link, _ in results[:4])
+    assert results[4][0] is None and "more than 4" in results[4][1]
+
+
+def test_aborted_chain_stops_quietly():
+    breaker = CircuitBreaker(max_commands=1)
+    root, _ = breaker.enter('#1', "say hi", None)
+    breaker.enter('#2', "a", root)
+    assert breaker.enter('#3', "b", root)[0] is None
+    assert breaker.enter('#4', "c", root) == (None, None)
+    assert len(breaker.trips) == 1
+
+
+@pytest.fixture
+def game():
+    db = WorldDatabase()
+    room = db.create_object('room', 'Hall')
+    alice = db.create_object('agent', 'Alice', location=room.dbref, autonomous=False)
+    wizard = db.create_object('agent', 'Merlin', location=room.dbref, autonomous=False)
+    wizard.wizard = True
+    for name in ('Ping', 'Pong'):
+        obj = db.create_object('object', name, location=room.dbref, owner=alice.dbref)
+        obj.listening = True
+    engine = MashEngine(db)
+    yield db, engine
+    engine.stop_queue()
+
+
+def _settle(engine, timeout=5.0):
+    """Wait until the queue thread has nothing left to run, including what the last batch queued."""
+    deadline = time.time() + timeout
+    while True:
+        while engine.queue.next_delay() is not None:
+            assert time.time() < deadline, "queue never drained"
+            time.sleep(0.01)
+        time.sleep(0.05)  # A batch already taken may still queue more
+        if engine.queue.next_delay() is None:
+            return
+
+
+def test_listen_ping_pong_trips_once(game):
+    db, engine = game
+    named(db, 'Ping').attrs['E'] = "^*:say %0"
+    named(db, 'Pong').attrs['E'] = "^*:say %0"
+    engine.process_command(named(db, 'Alice').dbref, "say ping")
+    _settle(engine)
+    assert len(engine.breaker.trips) == 1
+    assert set(engine.breaker.trips[0].objects) <= {named(db, 'Ping').dbref, named(db, 'Pong').dbref}
+
+
+def test_timed_wait_ping_pong_still_trips(game):
+    db, engine = game
+    named(db, 'Ping').attrs['E'] = "^*ping*:@wait 0.01=say pong"
+    named(db, 'Pong').attrs['E'] = "^*pong*:@wait 0.01=say ping"
+    engine.process_command(named(db, 'Alice').dbref, "say ping")
+    _settle(engine)
+    assert len(engine.breaker.trips) == 1
+    assert len(engine.queue) == 0
+
+
+def test_synchronous_recursion_trips(game):
+    db, engine = game
+    spinner = db.create_object('agent', 'Spinner', location=named(db, 'Alice').location, autonomous=False)
+    spinner.listening = True
+    spinner.attrs['S'] = "$spin:spin"
+    result = engine.process_command(named(db, 'Alice').dbref, "spin")
+    assert "Circuit breaker" in result.message
+    assert "Spinner" in engine.process_command(named(db, 'Merlin').dbref, "@breaker").message
+    assert not engine.process_command(named(db, 'Alice').dbref, "@breaker").success
+
+
+def test_player_wait_starts_a_fresh_chain(game):
+    db, engine = game
+    alice = named(db, 'Alice')
+    engine.process_command(alice.dbref, "@wait 0.01=say hello")
+    _settle(engine)
+    assert not engine.breaker.trips
@@ -0,0 +1,53 @@
+"""Dirty tracking and save_delta: only changed objects are written, and reload folds them in."""
+
+import os
+
+from conftest import named, reopen, world_state
+
+
+def test_delta_then_reload(world, tmp_path):
+    path = tmp_path / "world.json"
+    assert world.save_delta(path) == len(world.objects)  # No snapshot yet: full save
+    assert world.save_delta(path) == 0
+
+    alice = named(world, 'Alice')
+    alice.desc = "Changed."
+    alice.attrs['NOTE'] = "hi"
+    key = world.create_object('object', 'Key', location=alice.dbref)
+    world.destroy_object(named(world, 'Lamp').dbref)
+    assert world.save_delta(path) == 3  # Alice and Key written, Lamp deleted
+    assert os.path.exists(str(path) + ".delta")
+
+    key.name = "Brass Key"
+    assert world.save_delta(path) == 1
+
+    replayed = reopen(path)
+    assert world_state(replayed) == world_state(world)
+    assert named(replayed, 'Brass Key').location == alice.dbref
+
+
+def test_compaction_rewrites_the_snapshot(world, tmp_path):
+    path = tmp_path / "world.json"
+    world.save(path)
+    alice = named(world, 'Alice')
+    for i in range(3):
+        alice.tokens = i
+        world.save_delta(path, compact_after=2)
+    # The third call compacted: a full snapshot and no sidecar
+    assert not os.path.exists(str(path) + ".delta")
+    assert world_state(reopen(path)) == world_state(world)
+
+
+def test_stale_delta_is_ignored(world, tmp_path):
+    path = tmp_path / "world.json"
+    world.save(path)
+    named(world, 'Alice').desc = "From the delta."
+    world.save_delta(path)
+    delta = open(str(path) + ".delta", encoding='utf-8').read()
+
+    named(world, 'Alice').desc = "From the snapshot."
+    world.save(path)
+    with open(str(path) + ".delta", 'w', encoding='utf-8') as f:
+        f.write(delta)  # Left behind by a crash; written against the old snapshot
+
+    assert named(reopen(path), 'Alice').desc == "From the snapshot."
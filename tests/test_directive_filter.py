@@ -0,0 +1,46 @@
+"""DirectiveFilter: streamed VR text shows as it arrives, directives never do."""
+
+import pytest
+
+pytest.importorskip("google.genai")  # ai_layer needs the SDK to import
+
+from ai_layer import DirectiveFilter, _shielded
+
+
+TEXT = ("The fog lifts. [vr_title The Drowned Bell] Waves [sic] break "
+        "[VR_DESC A bell tolls under water.] on the rocks.[scene_change] Done [x")
+SHOWN = "The fog lifts.  Waves [sic] break  on the rocks. Done [x"
+
+
+def _stream(chunks):
+    f = DirectiveFilter()
+    return "".join(f.feed(chunk) for chunk in chunks) + f.flush()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13, len(TEXT)])
+def test_directives_are_cut_at_any_chunking(size):
+    assert _stream([TEXT[i:i + size] for i in range(0, len(TEXT), size)]) == SHOWN
+
+
+def test_only_a_possible_directive_is_held_back():
+    f = DirectiveFilter()
+    assert f.feed("Look: [vr_") == "Look: "  # Could still become a directive
+    assert f.feed("desc Mist.] ok [b") == " ok [b"  # "[b" can't be one
+    assert f.feed("[scene") == ""
+    assert f.feed("ry]") == "[scenery]"
+    assert f.feed("[vr_title unfinished") == ""
+    assert f.flush() == "[vr_title unfinished"  # The end of the stream releases it
+    assert f.flush() == ""
+
+
+def test_a_failing_sink_is_dropped_for_the_rest_of_the_stream():
+    seen = []
+
+    def sink(text):
+        seen.append(text)
+        if len(seen) == 2:
+            raise ConnectionError("client went away")
+    send = _shielded(sink)
+    for text in ("a", "", "b", "c"):
+        send(text)
+    assert seen == ["a", "b"]
@@ -0,0 +1,58 @@
+"""RoomEventLog: per-room rings read through each reader's own cursor."""
+
+from database import RoomEventLog, WorldDatabase
+
+
+def test_cursors_see_each_message_once():
+    log = RoomEventLog()
+    log.post('#1', "one")
+    cursor = log.seq
+    log.post('#1', "two")
+    log.post('#2', "elsewhere")
+    log.post('#1', "three", exclude='#9')
+    assert log.read('#9', '#1', 0) == ["one", "two"]  # Own actions are excluded
+    assert log.read('#8', '#1', cursor) == ["two", "three"]
+    assert log.read('#8', '#1', log.seq) == []
+    assert log.recent('#1', since=cursor) == ["two", "three"]
+
+
+def test_moving_neither_loses_nor_backfills():
+    log = RoomEventLog()
+    log.post('#1', "before arriving")
+    log.moved('#9', '#1', '#2')
+    log.post('#1', "after leaving")
+    log.post('#2', "in the new room")
+    log.moved('#9', '#2', '#1')
+    log.post('#1', "back again")
+    # Read once, after all of it: only what happened where #9 was at the time
+    assert log.read('#9', '#1', 0) == ["before arriving", "in the new room", "back again"]
+
+
+def test_rings_are_bounded_and_forgettable():
+    log = RoomEventLog(capacity=3, trail_length=2)
+    for i in range(5):
+        log.post('#1', f"m{i}")
+    assert log.recent('#1') == ["m2", "m3", "m4"]
+    log.forget('#1')
+    assert log.recent('#1') == []
+    for room in ('#2', '#3', '#4'):
+        log.moved('#9', '#1', room)
+    assert len(log._trails['#9']) == 2
+    log.post('#4', "latest")
+    assert log.clear() == 1 and log.recent('#4') == [] and log.seq == 6
+
+
+def test_read_messages_follows_the_agent():
+    db = WorldDatabase()
+    hall = db.create_object('room', 'Hall')
+    yard = db.create_object('room', 'Yard')
+    alice = db.create_object('agent', 'Alice', location=hall.dbref)
+    start = db.event_seq
+    db.room_announce(hall.dbref, "Bells ring.")
+    alice.location = yard.dbref
+    db.room_announce(hall.dbref, "The hall empties.")
+    db.room_announce(yard.dbref, "Birds sing.")
+    cursor, messages = db.read_messages(alice.dbref, start)
+    assert messages == ["Bells ring.", "Birds sing."]
+    assert db.read_messages(alice.dbref, cursor) == (cursor, [])
+    assert db.read_messages('#404', 0) == (db.event_seq, [])
@@ -0,0 +1,48 @@
+"""Exit lookup: ExitTable resolution order and the per-room tables built from the source index."""
+
+from database import ExitTable, GameObject, WorldDatabase
+
+
+def _exit(dbref, name, *aliases):
+    return GameObject(dbref, 'exit', name, aliases=list(aliases))
+
+
+def test_exact_name_then_alias_then_prefix_then_substring():
+    table = ExitTable([_exit('#1', "North Gate", "n"), _exit('#2', "n", "up"),
+                       _exit('#3', "Northwest", "nw"), _exit('#4', "Cellar Door", "down")])
+    assert table.find("n") == '#2'  # An exact name beats an alias
+    assert table.find("up") == '#2'
+    assert table.find("nw") == '#3'
+    assert table.find("north") == '#1'  # Two prefixes: room order breaks the tie
+    assert table.find("door") == '#4'
+    assert table.find("west") == '#3'
+    assert table.find("sideways") is None
+
+
+def test_match_takes_the_earliest_prefix_of_a_name_or_alias():
+    table = ExitTable([_exit('#1', "Cellar Door", "down"), _exit('#2', "Downstairs")])
+    assert table.match("down") == '#1'  # Alias prefix on an earlier exit
+    assert table.match("stair") == '#2'
+    assert table.match("x") is None
+
+
+def test_exits_found_through_their_source_and_kept_current():
+    db = WorldDatabase()
+    hall = db.create_object('room', 'Hall')
+    yard = db.create_object('room', 'Yard')
+    listed = db.create_object('exit', 'Out', source=hall.dbref, destination=yard.dbref, aliases=['o'])
+    hall.exits.append(listed.dbref)
+    # Not in hall.exits: only the source index knows about it
+    back = db.create_object('exit', 'Cellar', source=hall.dbref, aliases=['down'])
+    assert db.find_exit_by_name(hall.dbref, " O ") == listed
+    assert db.find_exit_by_name(hall.dbref, "DOWN") == back
+    assert db.find_exit_by_name(hall.dbref.lstrip('#'), "cel") == back
+
+    back.name = "Trapdoor"  # Tables are rebuilt after any change
+    assert db.find_exit_by_name(hall.dbref, "trap") == back
+    back.source = yard.dbref
+    assert db.find_exit_by_name(hall.dbref, "trap") is None
+    assert db.find_exit_by_name(yard.dbref, "trap") == back
+    db.destroy_object(back.dbref)
+    assert db.find_exit_by_name(yard.dbref, "trap") is None
+    assert db.match_exit(hall.dbref, "ou") == listed
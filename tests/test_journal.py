@@ -0,0 +1,101 @@
+"""Write-ahead journal: what a crash after commit() leaves recoverable."""
+
+import json
+
+from conftest import named, reopen, world_state
+
+from database import WorldDatabase
+
+
+def _journaled(world, tmp_path, name="world.json"):
+    path = tmp_path / name
+    world.save(path)
+    world.enable_journal(path, checkpoint_interval=0)
+    return path
+
+
+def test_replay_after_crash(world, tmp_path):
+    path = _journaled(world, tmp_path)
+    alice = named(world, 'Alice')
+    alice.desc = "Tall."
+    alice.tokens = 7
+    world.create_object('object', 'Key', location=alice.dbref)
+    lamp = named(world, 'Lamp')
+    world.destroy_object(lamp.dbref)
+    world.commit()
+
+    # No save, no close_journal: the process just stops here
+    assert world_state(reopen(path)) == world_state(world)
+
+
+def test_load_banners_only_when_verbose(world, tmp_path, capsys):
+    path = _journaled(world, tmp_path)
+    named(world, 'Alice').desc = "Tall."
+    world.commit()
+    capsys.readouterr()
+    reopen(path)
+    assert capsys.readouterr().out == ""
+    db = WorldDatabase()
+    db.load(str(path), verbose=True)
+    out = capsys.readouterr().out
+    assert "Replayed 1 journal entries" in out and "objects/sec" in out
+
+
+def test_container_edits_journal_one_key_or_item(world, tmp_path):
+    path = _journaled(world, tmp_path)
+    alice = named(world, 'Alice')
+    alice.attrs['MOOD'] = "calm"
+    alice.attrs['HAT'] = "red"
+    del alice.attrs['MOOD']
+    alice.attrs.setdefault('SHOES', "none")
+    alice.attrs.pop('GONE', None)
+    alice.inventory.append('#90')
+    alice.inventory.append('#91')
+    alice.inventory.remove('#90')
+    world.commit()
+
+    records = [json.loads(line) for line in open(str(path) + ".journal", encoding='utf-8')]
+    assert [r['o'] for r in records] == ['put', 'put', 'pop', 'put', 'pop', 'add', 'add', 'rem']
+    assert records[1] == {'s': records[1]['s'], 'o': 'put', 'r': alice.dbref, 'f': 'attrs', 'k': 'HAT', 'v': "red"}
+
+    replayed = reopen(path)
+    assert replayed.objects[alice.dbref].attrs == {'HAT': "red", 'SHOES': "none"}
+    assert replayed.objects[alice.dbref].inventory == ['#91']
+    assert world_state(replayed) == world_state(world)
+
+
+def test_whole_container_edits_still_replay(world, tmp_path):
+    path = _journaled(world, tmp_path, "world.mashb")
+    alice = named(world, 'Alice')
+    alice.inventory.extend(['#3', '#1', '#2'])
+    alice.inventory.sort()
+    alice.attrs.update({'A': "1", 'B': "2"})
+    alice.attrs['A'] = "one"
+    world.commit()
+    assert world_state(reopen(path)) == world_state(world)
+
+
+def test_torn_tail_is_ignored(world, tmp_path):
+    path = _journaled(world, tmp_path)
+    alice = named(world, 'Alice')
+    alice.desc = "Kept."
+    world.commit()
+    expected = world_state(world)
+    with open(str(path) + ".journal", 'a', encoding='utf-8') as f:
+        f.write('{"s": 99, "o": "set", "r": "' + alice.dbref + '", "f": "desc", "v": "Lo')
+
+    assert world_state(reopen(path)) == expected
+
+
+def test_checkpoint_skips_covered_entries(world, tmp_path):
+    path = _journaled(world, tmp_path)
+    alice = named(world, 'Alice')
+    alice.attrs['N'] = "1"
+    world.commit()
+    assert world.checkpoint()
+    alice.attrs['N'] = "2"
+    world.commit()
+
+    replayed = reopen(path)
+    assert replayed.objects[alice.dbref].attrs['N'] == "2"
+    assert world_state(replayed) == world_state(world)
@@ -0,0 +1,42 @@
+"""Announcement listeners: the database wakes exactly the sessions an announcement reaches."""
+
+from database import WorldDatabase
+
+
+def _rooms():
+    db = WorldDatabase()
+    hall = db.create_object('room', 'Hall')
+    yard = db.create_object('room', 'Yard')
+    alice = db.create_object('agent', 'Alice', location=hall.dbref)
+    bob = db.create_object('agent', 'Bob', location=yard.dbref)
+    return db, hall, yard, alice, bob
+
+
+def test_wakes_follow_the_agent():
+    db, hall, yard, alice, bob = _rooms()
+    woken = []
+    db.add_listener(alice.dbref, lambda: woken.append('alice'))
+    db.add_listener(bob.dbref, lambda: woken.append('bob'))
+    db.room_announce(hall.dbref, "Bells ring.")
+    db.room_announce(hall.dbref, "Alice waves.", exclude=alice.dbref)
+    assert woken == ['alice']
+    alice.location = yard.dbref
+    db.room_announce(yard.dbref, "Birds sing.")
+    assert sorted(woken[1:]) == ['alice', 'bob']
+
+
+def test_removed_and_failing_listeners():
+    db, hall, yard, alice, bob = _rooms()
+    woken = []
+
+    def broken():
+        raise RuntimeError("session gone")
+    db.add_listener(alice.dbref, broken)
+    second = db.add_listener(alice.dbref, lambda: woken.append(1))
+    db.room_announce(hall.dbref, "Bells ring.")  # One bad session doesn't stop the rest
+    assert woken == [1]
+    db.remove_listener(second)
+    db.room_announce(hall.dbref, "Again.")
+    assert woken == [1]
+    db.remove_listener(second)  # Twice is harmless
+    assert alice.dbref in db._listeners
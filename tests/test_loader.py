@@ -0,0 +1,92 @@
+"""The streaming loader: JsonStream parsing, the early first room, parallel builds, failures."""
+
+import io
+import json
+import threading
+
+import pytest
+
+import database
+from conftest import world_state
+
+from database import JsonStream, WorldDatabase
+
+
+def test_stream_matches_json_load_at_any_chunk_size():
+    doc = {'meta': {'name': "W", 'note': "a } and a { in a string"},
+           'objects': {'#0': {'type': 'room', 'name': "Lobby", 'tokens': 123456789, 'x': -1.5e3},
+                       '#1': {'type': 'object', 'name': "Ünïcode ☕", 'attrs': {'A': "[b]"}}},
+           'empty': {}}
+    text = json.dumps(doc, indent=2)
+    for chunk_size in (1, 2, 7, 64, 1 << 20):
+        stream = JsonStream(io.StringIO(text), chunk_size)
+        parsed = {}
+        for key in stream.keys():
+            parsed[key] = dict(stream.items()) if key in ('objects', 'empty') else stream.value()
+        assert parsed == doc
+
+
+def test_malformed_files_are_refused():
+    with pytest.raises(ValueError):
+        list(JsonStream(io.StringIO('["not", "an", "object"]')).keys())
+    with pytest.raises(ValueError):
+        list(JsonStream(io.StringIO('{"a": 1 "b": 2}'), 4).items())
+
+
+def _saved_world(tmp_path, things=50):
+    db = WorldDatabase()
+    room = db.create_object('room', 'Lobby')
+    for i in range(things):
+        db.create_object('object', f"Thing {i}", location=room.dbref)
+    path = tmp_path / "world.json"
+    db.save(path)
+    return db, path
+
+
+def test_first_room_is_live_before_the_rest(tmp_path, monkeypatch):
+    saved, path = _saved_world(tmp_path)
+    release = threading.Event()
+    build = database.JsonWorldReader.build
+
+    def slow(batch, tail):
+        if not any(data.get('type') == 'room' for _, data in batch):
+            release.wait(5)
+        return build(batch, tail)
+    monkeypatch.setattr(database.JsonWorldReader, 'build', staticmethod(slow))
+
+    db = WorldDatabase()
+    db.load(str(path), background=True, batch_size=10)
+    assert db.loading
+    assert [obj.name for obj in db.objects.values()] == ['Lobby']
+    early = db.create_object('object', 'Early bird', location='#0')
+    assert early.dbref not in saved.objects  # The allocator state came first
+    release.set()
+    db.wait_loaded()
+    assert not db.loading
+    assert list(db.objects)[-1] == early.dbref  # Created during the load: goes last
+    state = world_state(db)
+    assert state.pop(early.dbref)['name'] == "Early bird"
+    assert state == world_state(saved)
+    assert len(db.get_room_contents('#0')) == 51
+
+
+def test_parallel_builds_give_the_same_world(tmp_path):
+    saved, path = _saved_world(tmp_path, things=500)
+    db = WorldDatabase()
+    db.load(str(path), workers=4, batch_size=64)
+    assert list(db.objects) == list(saved.objects)
+    assert world_state(db) == world_state(saved)
+    assert db.load_stats['objects'] == 501
+
+
+def test_a_failed_load_is_raised_and_never_saved_over(tmp_path):
+    _, path = _saved_world(tmp_path)
+    text = path.read_text()
+    path.write_text(text[:len(text) // 2])  # Truncated mid-object
+    db = WorldDatabase()
+    db.load(str(path), background=True)
+    with pytest.raises(RuntimeError, match="World load failed"):
+        db.wait_loaded()
+    with pytest.raises(RuntimeError):
+        db.save(path)
+    assert path.read_text() == text[:len(text) // 2]
@@ -0,0 +1,51 @@
+"""The location index: room contents in arrival order, kept current on every move."""
+
+from database import WorldDatabase
+
+
+def _contents(db, room):
+    return [obj.name for obj in db.get_room_contents(room.dbref)]
+
+
+def test_contents_follow_moves_in_arrival_order():
+    db = WorldDatabase()
+    hall = db.create_object('room', 'Hall')
+    yard = db.create_object('room', 'Yard')
+    alice = db.create_object('agent', 'Alice', location=hall.dbref)
+    db.create_object('object', 'Lamp', location=hall.dbref)
+    bob = db.create_object('agent', 'Bob', location=hall.dbref)
+    assert _contents(db, hall) == ['Alice', 'Lamp', 'Bob']
+
+    assert db.move_agent(alice.dbref, yard.dbref)
+    bob.location = yard.dbref
+    assert _contents(db, hall) == ['Lamp']
+    assert _contents(db, yard) == ['Alice', 'Bob']
+    assert db.move_agent(alice.dbref, hall.dbref)  # Back again: arrives last
+    assert _contents(db, hall) == ['Lamp', 'Alice']
+    assert not db.move_agent(alice.dbref, '#404')
+    assert _contents(db, hall) == ['Lamp', 'Alice']
+
+
+def test_emptied_and_destroyed_entries_leave_the_index():
+    db = WorldDatabase()
+    hall = db.create_object('room', 'Hall')
+    lamp = db.create_object('object', 'Lamp', location=hall.dbref)
+    lamp.location = ""
+    assert hall.dbref not in db._location_index
+    lamp.location = hall.dbref
+    db.destroy_object(lamp.dbref)
+    assert _contents(db, hall) == []
+    assert hall.dbref not in db._location_index
+
+
+def test_rebuild_matches_incremental_upkeep():
+    db = WorldDatabase()
+    rooms = [db.create_object('room', f"Room {i}") for i in range(3)]
+    things = [db.create_object('object', f"Thing {i}", location=rooms[i % 3].dbref) for i in range(9)]
+    for i, thing in enumerate(things[::2]):
+        thing.location = rooms[(i + 1) % 3].dbref
+    kept = {room: _contents(db, room) for room in rooms}
+    db.rebuild_indices()
+    # A rebuild knows creation order only, so compare membership
+    assert {room: sorted(_contents(db, room)) for room in rooms} == \
+        {room: sorted(names) for room, names in kept.items()}
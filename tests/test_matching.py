@@ -0,0 +1,61 @@
+"""Name matching: the multi-valued exact-name index and NgramIndex partial matches."""
+
+from database import GRAM_INDEX_MIN, NgramIndex, WorldDatabase
+
+
+def test_ngram_search_picks_the_earliest_arrival():
+    index = NgramIndex()
+    index.add('#1', "brass lamp")
+    index.add('#2', "lamp post")
+    index.add('#3', "oil lamp")
+    assert index.search("lamp") == '#1'
+    assert index.search("post") == '#2'
+    assert index.search("l") == '#1'  # Too short for a gram: scanned
+    assert index.search("lamps") is None
+    index.rename('#1', "brass bell")  # Keeps its place in line
+    assert index.search("lamp") == '#2'
+    assert index.search("b") == '#1'
+    index.remove('#2')
+    assert index.search("lamp") == '#3'
+    assert index.search("post") is None
+    index.add('#2', "lamp post")  # Arrives again, now last
+    assert index.search("lamp") == '#3'
+
+
+def test_ngram_search_verifies_candidates():
+    index = NgramIndex()
+    index.add('#1', "abxab")  # Has every gram of "abab" but not the substring
+    assert index.search("abab") is None
+    index.add('#2', "xababx")
+    assert index.search("abab") == '#2'
+
+
+def test_find_by_name_returns_every_holder_of_a_name():
+    db = WorldDatabase()
+    room = db.create_object('room', 'Lobby')
+    first = db.create_object('object', 'Coin', location=room.dbref)
+    second = db.create_object('object', 'coin')
+    assert db.find_by_name("  COIN ") == [first, second]
+    assert db.find_by_name("coin", location=room.dbref) == [first]
+    second.name = "Token"
+    assert db.find_by_name("coin") == [first]
+    assert db.find_by_name("token") == [second]
+    db.destroy_object(first.dbref)
+    assert db.find_by_name("coin") == []
+
+
+def test_match_name_is_the_same_in_quiet_and_crowded_rooms():
+    db = WorldDatabase()
+    room = db.create_object('room', 'Market')
+    stall = db.create_object('object', 'Fruit Stall', location=room.dbref)
+    assert db.match_name(room.dbref, "stall") == stall  # Scanned
+    for i in range(GRAM_INDEX_MIN):
+        db.create_object('object', f"Crate {i}", location=room.dbref)
+    crowd = db.create_object('object', 'Stall Keeper', location=room.dbref)
+    assert db.match_name(room.dbref, "stall") == stall  # Indexed, same winner
+    assert db.match_name(room.dbref, "KEEP") == crowd
+    stall.name = "Fruit Cart"  # The index follows renames...
+    assert db.match_name(room.dbref, "stall") == crowd
+    crowd.location = ""  # ...and departures
+    assert db.match_name(room.dbref, "stall") is None
+    assert db.match_name(room.dbref, "crate 3").name == "Crate 3"
@@ -0,0 +1,59 @@
+"""Slotted GameObjects: per-type classes, sparse overflow fields, tracked containers."""
+
+import pytest
+
+from database import (AgentObject, ExitObject, GameObject, RoomObject, ThingObject,
+                      WorldDatabase)
+
+
+def test_type_picks_the_slotted_class():
+    assert type(GameObject('#1', 'room', "Lobby")) is RoomObject
+    assert type(GameObject('#2', 'exit', "North")) is ExitObject
+    assert type(GameObject('#3', 'agent', "Alice")) is AgentObject
+    assert type(GameObject('#4', 'object', "Lamp")) is ThingObject
+    assert type(GameObject('#5', 'vehicle', "Cart")) is GameObject
+
+
+def test_unset_fields_read_as_defaults_and_cost_nothing():
+    lamp = GameObject('#1', 'object', "Lamp")
+    assert lamp.desc == "" and lamp.tokens == 0 and lamp.wizard is False
+    assert lamp._extra is None
+    assert lamp.to_dict() == {'type': 'object', 'name': "Lamp"}
+    with pytest.raises(AttributeError):
+        lamp.no_such_field
+
+
+def test_overflow_stays_sparse():
+    lamp = GameObject('#1', 'object', "Lamp", olfactory="Smoky.")
+    assert lamp._extra == {'olfactory': "Smoky."}
+    lamp.olfactory = ""  # Back to the default
+    assert lamp._extra == {}
+    lamp.listening = True  # A ThingObject slot, not overflow
+    assert lamp._extra == {} and lamp.to_dict()['listening'] is True
+
+
+def test_unknown_fields_are_refused_but_stale_ones_are_dropped_on_load():
+    with pytest.raises(TypeError):
+        GameObject('#1', 'object', "Lamp", research_ok=True)
+    lamp = GameObject.from_dict('#1', {'type': 'object', 'name': "Lamp", 'research_ok': True})
+    assert lamp.to_dict() == {'type': 'object', 'name': "Lamp"}
+
+
+def test_dict_round_trip_for_every_class():
+    for obj_type, fields in [('room', {'exits': ['#2'], 'vr_ok': True}),
+                             ('exit', {'source': '#1', 'aliases': ['n']}),
+                             ('agent', {'inventory': ['#4'], 'tokens': 5, 'memo': "Hi."}),
+                             ('object', {'home': '#1', 'attrs': {'A': "1"}})]:
+        obj = GameObject('#9', obj_type, "Thing", **fields)
+        assert GameObject.from_dict('#9', obj.to_dict()).to_dict() == obj.to_dict()
+
+
+def test_materialized_defaults_report_in_place_edits():
+    db = WorldDatabase()
+    alice = db.create_object('agent', 'Alice')
+    db._dirty.clear()
+    alice.inventory.append('#7')  # Created on first access, then edited in place
+    alice.attrs['MOOD'] = "calm"
+    assert alice.dbref in db._dirty
+    assert alice.to_dict()['inventory'] == ['#7']
+    assert alice.to_dict()['attrs'] == {'MOOD': "calm"}
@@ -0,0 +1,60 @@
+"""Single-pass placeholder substitution: %-codes, pattern captures and literal text."""
+
+import pytest
+
+from conftest import named
+
+import softcode
+from database import WorldDatabase
+from mash_engine import MashEngine
+
+
+def test_compile_placeholders_escapes_braces():
+    template, codes = softcode.compile_placeholders("{x} %n and %0, %n again {}")
+    assert codes == ('n', '0')
+    assert template.format("Alice", "cake") == "{x} Alice and cake, Alice again {}"
+
+
+def test_compile_placeholders_without_codes():
+    assert softcode.compile_placeholders("100% {sure}") == ("100% {{sure}}", ())
+
+
+@pytest.fixture
+def game():
+    db = WorldDatabase()
+    room = db.create_object('room', 'Hall')
+    db.create_object('agent', 'Alice', location=room.dbref, autonomous=False)
+    db.create_object('object', 'Box', location=room.dbref)
+    return db, MashEngine(db)
+
+
+def _sub(game, text, captures=None):
+    db, engine = game
+    return engine._substitute_placeholders(named(db, 'Box').dbref, text, named(db, 'Alice').dbref, captures)
+
+
+def test_codes(game):
+    db, _ = game
+    alice = named(db, 'Alice').dbref
+    assert _sub(game, "%n pokes %! in the %l (%#)") == f"Alice pokes Box in the Hall ({alice})"
+    assert _sub(game, "a%rb%Rc%td%Te") == "a\nb\nc\td\te"
+
+
+def test_captures(game):
+    assert _sub(game, "%1 then %0, %0 again", ["x", "y"]) == "y then x, x again"
+    assert _sub(game, "missing: [%5]", ["x"]) == "missing: []"
+
+
+def test_positional_codes_stay_literal_without_captures(game):
+    assert _sub(game, "%0 and %9 for %n") == "%0 and %9 for Alice"
+
+
+def test_literal_text_survives(game):
+    assert _sub(game, "{0} {name} %n {}") == "{0} {name} Alice {}"
+    assert _sub(game, "{plain}") == "{plain}"
+    assert _sub(game, "100% sure") == "100% sure"
+    assert _sub(game, "") == ""
+
+
+def test_functions_run_after_substitution(game):
+    assert _sub(game, "[add(%0,%1)] for %n", ["2", "3"]) == "5 for Alice"
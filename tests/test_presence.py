@@ -0,0 +1,53 @@
+"""PresenceTracker: who is online and which robots have idled out, without rescans."""
+
+from database import WorldDatabase
+from mash_engine import PresenceTracker
+
+
+def _world():
+    db = WorldDatabase()
+    room = db.create_object('room', 'Lobby')
+    alice = db.create_object('agent', 'Alice', location=room.dbref, last_interaction=900.0)
+    bob = db.create_object('agent', 'Bob', location=room.dbref)
+    robot = db.create_object('agent', 'Robot', location=room.dbref, autonomous=True,
+                             last_interaction=500.0)
+    return db, alice, bob, robot
+
+
+def test_online_players_most_recent_first():
+    db, alice, bob, robot = _world()
+    presence = PresenceTracker(db, window=100)
+    assert presence.online(now=950) == [alice]  # Seeded from last_interaction
+    presence.touch(bob, now=960)
+    assert presence.online(now=970) == [bob, alice]
+    presence.touch(alice, now=980)
+    assert presence.online(now=990) == [alice, bob]
+    assert presence.online(now=1070) == [alice]  # Bob's window ran out
+    assert presence.is_online(alice, now=1070) and not presence.is_online(bob, now=1070)
+    assert presence.is_online(robot, now=10 ** 9)  # Robots are always present
+
+
+def test_idle_robots_are_handed_out_once():
+    db, alice, bob, robot = _world()
+    presence = PresenceTracker(db)
+    assert presence.idle_robots(timeout=600, now=1000) == []
+    assert presence.idle_robots(timeout=600, now=1200) == [robot]
+    assert presence.idle_robots(timeout=600, now=1300) == []  # Out until touched or deferred
+    presence.defer(robot, timeout=600, delay=60, now=1300)
+    assert presence.idle_robots(timeout=600, now=1350) == []
+    assert presence.idle_robots(timeout=600, now=1361) == [robot]
+    presence.touch(robot, now=1400)
+    presence.touch(robot, now=1500)  # Only the latest touch counts
+    assert presence.idle_robots(timeout=600, now=2050) == []
+    assert presence.idle_robots(timeout=600, now=2101) == [robot]
+
+
+def test_destroyed_and_converted_agents_drop_out():
+    db, alice, bob, robot = _world()
+    presence = PresenceTracker(db, window=100)
+    presence.touch(bob, now=950)
+    db.destroy_object(bob.dbref)
+    assert presence.online(now=960) == [alice]
+    alice.autonomous = True  # Now a robot: never listed as a player
+    presence.touch(alice, now=960)
+    assert presence.online(now=970) == []
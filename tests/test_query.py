@@ -0,0 +1,52 @@
+"""The owner, type and flag indexes behind WorldDatabase.query."""
+
+import pytest
+
+from database import WorldDatabase
+
+
+def _names(objs):
+    return [obj.name for obj in objs]
+
+
+@pytest.fixture
+def estate():
+    db = WorldDatabase()
+    room = db.create_object('room', 'Manor', enter_ok=True)
+    alice = db.create_object('agent', 'Alice', location=room.dbref, wizard=True)
+    db.create_object('agent', 'Robot', location=room.dbref, autonomous=True, owner=alice.dbref)
+    db.create_object('object', 'Key', owner=alice.dbref, enter_ok=True)
+    db.create_object('object', 'Cup', owner=alice.dbref)
+    db.create_object('object', 'Rock')
+    return db
+
+
+def test_criteria_combine(estate):
+    alice = estate.find_by_name('Alice')[0].dbref
+    assert _names(estate.query(type='object')) == ['Key', 'Cup', 'Rock']
+    assert _names(estate.query(owner=alice)) == ['Robot', 'Key', 'Cup']
+    assert _names(estate.query(type='object', owner=alice)) == ['Key', 'Cup']
+    assert _names(estate.query(flag='enter_ok')) == ['Manor', 'Key']
+    assert _names(estate.query(type='agent', flag='!autonomous')) == ['Alice']
+    assert _names(estate.query(flag=['wizard', '!autonomous'])) == ['Alice']
+    assert _names(estate.query(type='exit')) == []
+    assert len(estate.query()) == len(estate.objects)
+
+
+def test_unknown_flags_are_refused(estate):
+    with pytest.raises(ValueError):
+        estate.query(flag='dark')
+
+
+def test_indexes_follow_changes(estate):
+    alice = estate.find_by_name('Alice')[0].dbref
+    key, rock = estate.find_by_name('Key')[0], estate.find_by_name('Rock')[0]
+    rock.owner = alice
+    key.owner = ""
+    key.enter_ok = False
+    assert _names(estate.query(type='object', owner=alice)) == ['Cup', 'Rock']
+    assert _names(estate.query(flag='enter_ok')) == ['Manor']
+    estate.destroy_object(rock.dbref)
+    assert _names(estate.query(owner=alice)) == ['Robot', 'Cup']
+    estate.rebuild_indices()
+    assert _names(estate.query(owner=alice)) == ['Robot', 'Cup']
@@ -0,0 +1,154 @@
+"""The deferred command queue: tick budget, @wait timing, quota and @halt."""
+
+import threading
+
+import pytest
+
+from conftest import named
+
+from database import WorldDatabase
+from mash_engine import CommandQueue, CommandResult, MashEngine
+
+
+def test_ready_commands_run_in_order_within_the_budget():
+    queue = CommandQueue(quota=10, budget=2)
+    for command in ("a", "b", "c"):
+        queue.add('#1', command, now=0)
+    assert [e.command for e in queue.take(now=0)] == ["a", "b"]
+    assert queue.next_delay(now=0) == 0.0
+    assert [e.command for e in queue.take(now=0)] == ["c"]
+    assert queue.next_delay(now=0) is None
+
+
+def test_waits_run_when_due():
+    queue = CommandQueue()
+    queue.add('#1', "later", delay=5, now=100)
+    queue.add('#1', "sooner", delay=2, now=100)
+    assert queue.take(now=101) == []
+    assert queue.next_delay(now=101) == 1
+    assert [e.command for e in queue.take(now=102)] == ["sooner"]
+    assert [e.command for e in queue.take(now=105)] == ["later"]
+
+
+def test_quota_halts_a_runaway():
+    queue = CommandQueue(quota=3)
+    other = queue.add('#2', "fine", now=0)
+    assert all(queue.add('#1', f"spin {i}", now=0) for i in range(3))
+    assert queue.add('#1', "one too many", now=0) is None
+    # Everything the runaway had queued is gone; other objects keep theirs
+    assert [e.pid for e in queue.entries()] == [other]
+    assert queue.add('#1', "fresh start", now=0) is not None
+
+
+def test_halted_entries_never_run():
+    queue = CommandQueue()
+    queue.add('#1', "keep", now=0)
+    queue.add('#2', "drop", now=0)
+    queue.add('#2', "drop later", delay=1, now=0)
+    assert queue.halt(lambda e: e.executor == '#2') == 2
+    assert [e.command for e in queue.take(now=5)] == ["keep"]
+    assert queue.next_delay(now=5) is None
+
+
+@pytest.fixture
+def game():
+    db = WorldDatabase()
+    room = db.create_object('room', 'Hall')
+    alice = db.create_object('agent', 'Alice', location=room.dbref, autonomous=False)
+    bob = db.create_object('agent', 'Bob', location=room.dbref, autonomous=False)
+    wizard = db.create_object('agent', 'Merlin', location=room.dbref, autonomous=False)
+    wizard.wizard = True
+    db.create_object('object', 'Clock', location=room.dbref, owner=alice.dbref)
+    engine = MashEngine(db)
+    yield db, engine
+    engine.stop_queue()
+
+
+def test_wait_queues_and_halt_clears(game):
+    db, engine = game
+    alice, bob, wizard = named(db, 'Alice'), named(db, 'Bob'), named(db, 'Merlin')
+    assert engine.process_command(alice.dbref, "@wait 600=say one").success
+    assert engine.process_command(bob.dbref, "@wait 600=say two").success
+    assert "say one" in engine.process_command(alice.dbref, "@ps").message
+    assert "say two" not in engine.process_command(alice.dbref, "@ps").message
+    assert "say two" in engine.process_command(wizard.dbref, "@ps").message
+
+    assert "Halted 1" in engine.process_command(alice.dbref, "@halt").message
+    assert [e.executor for e in engine.queue.entries()] == [bob.dbref]
+    assert not engine.process_command(alice.dbref, "@halt/all").success
+    assert "Halted all 1" in engine.process_command(wizard.dbref, "@halt/all").message
+    assert len(engine.queue) == 0
+
+
+def test_halt_one_object(game):
+    db, engine = game
+    alice, clock = named(db, 'Alice'), named(db, 'Clock')
+    engine.queue_command(clock.dbref, "say tick", alice.dbref, delay=600)
+    engine.queue_command(alice.dbref, "say mine", alice.dbref, delay=600)
+    assert "for **Clock**" in engine.process_command(alice.dbref, "@halt clock").message
+    assert [e.executor for e in engine.queue.entries()] == [alice.dbref]
+    assert not engine.process_command(named(db, 'Bob').dbref, "@halt alice").success
+
+
+def test_enactor_belongs_to_each_command(game):
+    db, engine = game
+    alice, bob, clock = named(db, 'Alice'), named(db, 'Bob'), named(db, 'Clock')
+    entered, release, seen = threading.Event(), threading.Event(), []
+
+    def hold(agent_ref, args):
+        entered.set()
+        release.wait(5)
+        seen.append(engine._substitute_placeholders(agent_ref, "%#"))
+        return CommandResult(True, "")
+    engine.register_command('hold', hold)
+
+    # Alice's command is still running when Bob sets off one of his own on another thread
+    worker = threading.Thread(target=engine.process_command, args=(clock.dbref, "hold", alice.dbref))
+    worker.start()
+    assert entered.wait(5)
+    engine.process_command(clock.dbref, "@wait 600=say later", bob.dbref)
+    release.set()
+    worker.join(5)
+
+    assert seen == [alice.dbref]
+    assert [e.enactor for e in engine.queue.entries()] == [bob.dbref]
+
+
+def test_wait_rejects_bad_input(game):
+    db, engine = game
+    alice = named(db, 'Alice')
+    assert not engine.process_command(alice.dbref, "@wait soon=say hi").success
+    assert not engine.process_command(alice.dbref, "@wait 5").success
+    assert not engine.process_command(alice.dbref, "@wait -1=say hi").success
+    assert len(engine.queue) == 0
+
+
+def test_queued_commands_run_on_the_tick(game):
+    db, engine = game
+    engine.stop_queue()
+    alice = named(db, 'Alice')
+    cursor = db.event_seq
+    engine.queue.add(alice.dbref, "say from the queue", alice.dbref)
+    assert engine.run_queue() == 1
+    _, messages = db.read_messages(named(db, 'Bob').dbref, cursor)
+    assert any("from the queue" in m for m in messages), messages
+
+
+def test_each_command_commits_once(game, monkeypatch):
+    db, engine = game
+    engine.stop_queue()
+    alice, clock = named(db, 'Alice'), named(db, 'Clock')
+    commits = []
+    monkeypatch.setattr(db, 'commit', lambda *args: commits.append(args))
+
+    clock.listening = True
+    clock.attrs['CHIME'] = "$chime:say Bong"
+    engine.process_command(alice.dbref, "chime")  # Runs Clock's command inside Alice's
+    assert len(commits) == 1
+
+    link, _ = engine.breaker.enter(alice.dbref, "say hi", None)
+    engine.queue.add(alice.dbref, "say from a timer", alice.dbref)
+    engine.queue.add(clock.dbref, "say heard it", alice.dbref, link=link)
+    commits.clear()
+    assert engine.run_queue() == 2
+    assert len(commits) == 2
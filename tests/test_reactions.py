@@ -0,0 +1,71 @@
+"""Room reactions: every smart object is asked at once, answers applied in room order."""
+
+import threading
+import time
+
+import mash_engine
+from database import WorldDatabase
+from mash_engine import MashEngine
+
+
+class SlowAI:
+    """Answers after a per-object delay; later objects in the room answer first."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get_atmospheric_flavor(self, ctx, action, search_mode=None):
+        name = ctx['name']
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            delay = self.delays.get(name, 0)
+            if delay is None:
+                raise RuntimeError("model unavailable")
+            time.sleep(delay)
+            return f"{name} stirs at '{action}'."
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def _context(engine):
+    return lambda actor, target, kind: {'name': engine.db.get(target).name}
+
+
+def _room(ai):
+    db = WorldDatabase()
+    room = db.create_object('room', 'Parlour')
+    alice = db.create_object('agent', 'Alice', location=room.dbref)
+    for name in ai.delays:
+        db.create_object('object', name, location=room.dbref, ai_ok=True)
+    db.create_object('object', 'Chair', location=room.dbref)  # Not ai_ok: never asked
+    engine = MashEngine(db, None)
+    engine.ai = ai
+    engine.get_ai_context = _context(engine)
+    return engine, room, alice
+
+
+def test_objects_are_asked_concurrently_and_answered_in_room_order():
+    ai = SlowAI({'Clock': 0.3, 'Mirror': 0.2, 'Vase': 0.1})
+    engine, room, alice = _room(ai)
+    started = time.monotonic()
+    results = engine.trigger_room_reactions(room.dbref, alice.dbref, "sneezes")
+    assert time.monotonic() - started < 0.55
+    assert ai.peak == 3
+    assert [r['name'] for r in results] == ['Clock', 'Mirror', 'Vase']
+    assert results[0]['narrative'] == "Clock stirs at 'sneezes'."
+
+
+def test_failed_and_slow_objects_are_skipped(monkeypatch):
+    monkeypatch.setattr(mash_engine, 'REACTION_TIMEOUT', 0.3)
+    ai = SlowAI({'Clock': None, 'Mirror': 1.0, 'Vase': 0})
+    engine, room, alice = _room(ai)
+    started = time.monotonic()
+    results = engine.trigger_room_reactions(room.dbref, alice.dbref, "sneezes")
+    assert time.monotonic() - started < 0.8  # One deadline for the whole room
+    assert [r['name'] for r in results] == ['Vase']
@@ -0,0 +1,52 @@
+"""Compiled softcode: [func(args)] parsed once, evaluated like the original pass-based evaluator."""
+
+import softcode
+from softcode import compile_softcode, evaluate
+
+
+def _functions(log=None):
+    table = {
+        'add': lambda args: str(sum(int(a) for a in args)),
+        'upper': lambda args: args[0].upper(),
+        'defer': lambda args: f"[upper({args[0]})]",  # Expanded on the next pass
+        'again': lambda args: "[again()]+",  # Never settles
+        'boom': lambda args: 1 / 0,
+    }
+
+    def call(name, args):
+        if log is not None:
+            log.append((name, args))
+        fn = table.get(name)
+        return fn(args) if fn else None
+    return call
+
+
+def test_calls_nest_and_unknowns_stay_as_written():
+    call = _functions()
+    assert evaluate("Sum: [add(1,2,3)]!", call) == "Sum: 6!"
+    assert evaluate("[add(1,[add(2,3)])]", call) == "6"
+    assert evaluate("[ADD(1, add(2,3))]", call) == "6"
+    assert evaluate("[upper(a, b)] [nope(1)] [plain]", call) == "A [nope(1)] [plain]"
+    assert evaluate("[boom()]", call) == "!!boom_err!!"
+    assert evaluate("no brackets", call) == "no brackets"
+    assert evaluate("", call) == ""
+
+
+def test_results_with_brackets_expand_on_later_passes():
+    log = []
+    call = _functions(log)
+    assert evaluate("[defer(hi)]", call) == "HI"
+    assert evaluate("[again()]", call) == "[again()]" + "+" * softcode.MAX_PASSES
+    assert log.count(('again', [])) == softcode.MAX_PASSES
+
+
+def test_programs_are_compiled_once_per_text():
+    compile_softcode.cache_clear()
+    log = []
+    call = _functions(log)
+    for _ in range(3):
+        assert evaluate("[add(1,2)] and [add(3,4)]", call) == "3 and 7"
+    assert compile_softcode.cache_info().misses == 2  # The text, then its (static) result
+    assert len(log) == 6  # Compiled once, but called on every evaluation
+    assert compile_softcode("3 and 7").static
+    assert not compile_softcode("[add(1)]").static
@@ -0,0 +1,86 @@
+"""The SQLite backend: same answers as the in-memory world, and they survive a reopen."""
+
+import sqlite3
+
+from database import WorldDatabase
+from sqlite_database import SqliteWorldDatabase
+
+
+def _build(db: WorldDatabase) -> None:
+    """The same world in either backend; many objects per commit so flush order matters."""
+    room = db.create_object('room', 'Lobby')
+    wizard = db.create_object('agent', 'Wizard', location=room.dbref, wizard=True)
+    for i in range(40):
+        db.create_object('object', f"Pebble {i}", location=room.dbref, owner=wizard.dbref,
+                         enter_ok=(i % 3 == 0))
+    db.destroy_object('#5')
+    db.create_object('object', "Late pebble", location=room.dbref, owner=wizard.dbref)
+    db.commit()
+
+
+def _answers(db: WorldDatabase) -> dict:
+    wizard = db.find_by_name('Wizard')[0].dbref
+    return {
+        'all': list(db.objects),
+        'type': [o.dbref for o in db.query(type='object')],
+        'owner': [o.dbref for o in db.query(owner=wizard)],
+        'flag': [o.dbref for o in db.query(type='object', flag='enter_ok')],
+        'not flag': [o.dbref for o in db.query(type='object', flag='!enter_ok')],
+        'contents': [o.dbref for o in db.get_room_contents('#0')],
+    }
+
+
+def test_queries_match_the_in_memory_world(tmp_path):
+    memory = WorldDatabase()
+    _build(memory)
+    sql = SqliteWorldDatabase(tmp_path / "world.db")
+    _build(sql)
+    assert _answers(sql) == _answers(memory)
+
+
+def test_round_trip_through_reopen(tmp_path):
+    path = tmp_path / "world.db"
+    db = SqliteWorldDatabase(path)
+    _build(db)
+    expected = _answers(db)
+    pebble = db.find_by_name('Pebble 7')[0]
+    pebble.desc = "Smooth."
+    pebble.attrs['weight'] = "1"
+    db.commit()
+    db.close()
+
+    reopened = SqliteWorldDatabase(path)
+    assert _answers(reopened) == expected
+    pebble = reopened.find_by_name('Pebble 7')[0]
+    assert pebble.desc == "Smooth." and pebble.attrs == {'weight': "1"}
+    assert reopened.create_object('object', "Newest").dbref not in expected['all']
+    reopened.close()
+
+
+def test_uncommitted_changes_are_dropped_on_load(tmp_path):
+    db = SqliteWorldDatabase(tmp_path / "world.db")
+    _build(db)
+    db.find_by_name('Pebble 1')[0].name = "Renamed"
+    db.create_object('object', "Unsaved")
+    db.load()
+    assert db.find_by_name('Pebble 1') and not db.find_by_name('Unsaved')
+    db.close()
+
+
+def test_older_databases_keep_their_row_order(tmp_path):
+    path = tmp_path / "world.db"
+    db = SqliteWorldDatabase(path)
+    _build(db)
+    db.close()
+    # Back to the schema older versions wrote, which ordered by rowid
+    conn = sqlite3.connect(str(path))
+    conn.execute("DROP INDEX objects_created")
+    conn.execute("ALTER TABLE objects DROP COLUMN created")
+    rows = [r[0] for r in conn.execute("SELECT dbref FROM objects ORDER BY rowid")]
+    conn.commit()
+    conn.close()
+
+    reopened = SqliteWorldDatabase(path)
+    newest = reopened.create_object('object', "Newest").dbref
+    assert list(reopened.objects) == rows + [newest]
+    reopened.close()
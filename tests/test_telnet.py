@@ -0,0 +1,68 @@
+"""The telnet front end: login, pushed announcements, and a pusher that fails."""
+
+import asyncio
+
+from database import WorldDatabase
+from mash_engine import MashEngine
+from telnet_server import TelnetServer
+
+
+async def _connect(port: int, login: str):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(login.encode() + b"\r\n")
+    await writer.drain()
+    return reader, writer
+
+
+async def _read_until(reader: asyncio.StreamReader, text: str) -> str:
+    seen = b""
+    while text.encode() not in seen:
+        chunk = await asyncio.wait_for(reader.read(4096), 5)
+        if not chunk:
+            break
+        seen += chunk
+    return seen.decode()
+
+
+def _serve(scenario) -> None:
+    async def main():
+        db = WorldDatabase()
+        db.create_object('room', 'Lobby')
+        server = TelnetServer(db, MashEngine(db, None), workers=4)
+        listener = await server.start('127.0.0.1', 0)
+        try:
+            await scenario(db, listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            server.executor.shutdown(wait=False)
+    asyncio.run(main())
+
+
+def test_announcements_are_pushed_without_a_command():
+    async def scenario(db, port):
+        alice, alice_w = await _connect(port, "create Alice secret1")
+        await _read_until(alice, "Lobby")
+        bob, bob_w = await _connect(port, "create Bob secret2")
+        await _read_until(bob, "Lobby")
+        bob_w.write(b"say hello\r\n")
+        await bob_w.drain()
+        assert "hello" in await _read_until(alice, "hello")
+        alice_w.close()
+        bob_w.close()
+    _serve(scenario)
+
+
+def test_failed_pusher_drops_the_client(capsys):
+    async def scenario(db, port):
+        reader, writer = await _connect(port, "create Alice secret1")
+        await _read_until(reader, "Lobby")
+
+        def broken(*args):
+            raise RuntimeError("event log unreadable")
+        db.read_messages = broken
+        db.room_announce(db.find_by_name('Lobby')[0].dbref, "The lights flicker.")
+        await _read_until(reader, "never sent")  # Returns at EOF
+        assert reader.at_eof()
+        writer.close()
+    _serve(scenario)
+    assert "Announcements to Alice failed: event log unreadable" in capsys.readouterr().out
@@ -0,0 +1,107 @@
+"""Precompiled $-command and ^-listen tables: which trigger fires, in what order, with what captures."""
+
+import pytest
+
+from conftest import named
+
+from database import TriggerTable, WorldDatabase
+from mash_engine import MashEngine
+
+
+@pytest.fixture
+def room():
+    db = WorldDatabase()
+    room = db.create_object('room', 'Hall')
+    room.listening = True
+    room.attrs['DOOR'] = "$open *:say The hall opens %0."
+    first = db.create_object('object', 'Bell', location=room.dbref)
+    first.listening = True
+    first.attrs['RING'] = "$ring ?ell:say Ding %0"
+    first.attrs['ANY'] = "$open door:say Bell wins?"
+    first.attrs['HEAR'] = "^*hello*:say Bell heard %0|%1"
+    second = db.create_object('object', 'Parrot', location=room.dbref)
+    second.listening = True
+    second.attrs['HEAR'] = "^hello *:say Parrot heard %0"
+    second.attrs['SET'] = "$set {x} *:say Set to %0"
+    second.attrs['PICK'] = "$pick [ab]*:say Picked %0"
+    deaf = db.create_object('object', 'Statue', location=room.dbref)
+    deaf.attrs['HEAR'] = "^*:say never"  # Not listening
+    return db, room
+
+
+def test_first_command_follows_room_order(room):
+    db, hall = room
+    table = db.trigger_table(hall.dbref)
+    # The room's own pattern comes before its contents, even for a more exact match
+    assert table.first_command("open door").obj == hall.dbref
+    assert table.first_command("ring bell").obj == named(db, 'Bell').dbref
+    assert table.first_command("ring bells") is None
+    assert table.first_command("dance") is None
+
+
+def test_listeners_in_order(room):
+    db, hall = room
+    table = db.trigger_table(hall.dbref)
+    heard = table.listeners("hello there")
+    assert [t.obj for t in heard] == [named(db, 'Bell').dbref, named(db, 'Parrot').dbref]
+    assert [t.obj for t in table.listeners("well hello")] == [named(db, 'Bell').dbref]
+    assert table.listeners("goodbye") == []
+
+
+def test_captures(room):
+    db, hall = room
+    table = db.trigger_table(hall.dbref)
+    assert table.first_command("ring bell").captures("Ring Bell") == ["B"]
+    heard = table.listeners("oh hello you")
+    assert heard[0].captures("Oh Hello You") == ["Oh ", " You"]
+    assert table.first_command("set {x} 42").captures("set {x} 42") == ["42"]
+    assert table.first_command("set x 42") is None  # Braces are literal, not a format field
+    assert table.first_command("pick apple").captures("pick apple") == ["pple"]
+    assert table.first_command("pick cherry") is None
+
+
+def test_consecutive_stars_are_one_capture():
+    db = WorldDatabase()
+    hall = db.create_object('room', 'Hall')
+    hall.listening = True
+    hall.attrs['X'] = "$go **:say %0"
+    assert db.trigger_table(hall.dbref).first_command("go north").captures("go North") == ["North"]
+
+
+def test_table_is_rebuilt_after_changes(room):
+    db, hall = room
+    table = db.trigger_table(hall.dbref)
+    assert db.trigger_table(hall.dbref) is table
+    bell = named(db, 'Bell')
+    bell.attrs['RING'] = "$chime:say Chime"
+    assert db.trigger_table(hall.dbref) is not table
+    assert db.trigger_table(hall.dbref).first_command("chime").obj == bell.dbref
+
+    bell.listening = False
+    assert db.trigger_table(hall.dbref).first_command("chime") is None
+    bell.listening = True
+    bell.location = db.create_object('room', 'Elsewhere').dbref
+    assert db.trigger_table(hall.dbref).first_command("chime") is None
+
+
+def test_table_from_objects_skips_missing():
+    db = WorldDatabase()
+    thing = db.create_object('object', 'Box')
+    thing.listening = True
+    thing.attrs['A'] = "$shake:say rattle"
+    thing.attrs['B'] = "no colon here"
+    thing.attrs['C'] = 42
+    table = TriggerTable([None, thing])
+    assert [t.pattern for t in table.commands] == ["shake"]
+    assert table.listens == []
+
+
+def test_engine_runs_the_first_command_with_captures(room):
+    db, hall = room
+    alice = db.create_object('agent', 'Alice', location=hall.dbref, autonomous=False)
+    engine = MashEngine(db)
+    cursor = db.event_seq
+    engine.process_command(alice.dbref, "set {x} Forty Two")
+    engine.run_queue()
+    _, messages = db.read_messages(alice.dbref, cursor)
+    assert any("Set to Forty Two" in m for m in messages), messages